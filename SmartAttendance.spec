@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('frontend', 'frontend'), ('serviceAccountKey.json', '.'), ('.env', '.')],
-    hiddenimports=['flask_cors'],
+    hiddenimports=['flask_cors', 'face_recognition', 'cv2', 'numpy', 'PIL.Image'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -1,5 +1,6 @@
 import os
-from flask import Flask, send_from_directory, session
+from backend.utils.startup_timeline import mark, timeline
+from flask import Flask, session, jsonify
 import firebase_admin
 from firebase_admin import credentials, firestore
 import logging
@@ -14,57 +15,164 @@ from backend.routes.admin_routes import init_admin_routes
 from backend.routes.student_routes import init_student_routes
 from backend.routes.admin_system_route import init_admin_system_routes
 from backend.routes.teacher_routes import init_teacher_routes
+from backend.utils.face_index import run_duplicate_scan
+from backend.utils.scheduler import schedule_daily
+from backend.utils.warmup import start_warmup, warmup_status
+from backend.utils.compression import init_compression
+from backend.utils.datastore_tracking import DEFAULT_READ_BUDGET, TrackedClient, init_datastore_tracking
+from backend.utils.metrics import init_metrics
+from backend.utils.timing import init_timing
+from backend.utils.profiling import init_profiling
+from backend.utils.shared_versions import init_shared_versions
+from backend.utils.static_assets import StaticAssets
+mark('imports')
+
 # --- Basic App Configuration ---
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # This path is correct based on your 'tree' output
-FRONTEND_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend')
-
-app = Flask(__name__, static_folder=FRONTEND_FOLDER, static_url_path='')
-
-# --- Load the Secret Key from the .env file ---
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY') # <-- Loads secret key from .env file
-if not app.config['SECRET_KEY']:
-    raise ValueError("No SECRET_KEY set for Flask application. Please set it in your .env file.")
-
-# --- Firebase Initialization ---
-try:
-    cred_path = os.path.join(os.path.dirname(__file__), 'serviceAccountKey.json')
-    cred = credentials.Certificate(cred_path)
-    firebase_admin.initialize_app(cred)
-    db = firestore.client()
-    logger.info("Firebase connection successful.")
-except Exception as e:
-    logger.error(f"Error initializing Firebase: {e}")
-    db = None
-
-# --- Register Blueprints (API Routes) ---
-if db:
-    init_login_routes(app, db)
-    init_admin_routes(app, db)
-    init_student_routes(app, db)
-    init_admin_system_routes(app, db)
-    init_teacher_routes(app, db)
-    logger.info("All API routes registered successfully.")
-else:
-    logger.error("Database not initialized. API routes will not be available.")
-
-# --- Page Serving Routes ---
-
-@app.route('/')
-def serve_root():
-    """Serves the main landing page."""
-    return send_from_directory(FRONTEND_FOLDER, 'index.html') # <-- Serves index.html as the landing page
-
-@app.route('/<path:filename>')
-def serve_page(filename):
-    """Serves other HTML pages like admin_dashboard.html, etc."""
-    if ".." in filename or filename.startswith("/"):
-        return "Not Found", 404
-    return send_from_directory(FRONTEND_FOLDER, filename)
+FRONTEND_FOLDER = os.path.join(BASE_DIR, 'frontend')
+
+
+class Config:
+    """Settings read from the environment (.env). Pass overrides to create_app."""
+    SECRET_KEY = os.getenv('SECRET_KEY') # <-- Loads secret key from .env file
+    FIREBASE_CREDENTIALS = os.getenv('FIREBASE_CREDENTIALS', os.path.join(BASE_DIR, 'serviceAccountKey.json'))
+    FRONTEND_FOLDER = FRONTEND_FOLDER
+    # Warmup and the nightly face scan. Prefork servers turn this off at import
+    # and start the jobs in each worker after the fork (see gunicorn.conf.py).
+    START_BACKGROUND_JOBS = os.getenv('START_BACKGROUND_JOBS', '1') == '1'
+    WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', '1') == '1'
+    FACE_SCAN_HOUR = int(os.getenv('FACE_SCAN_HOUR', 2))
+    # Workers sharing this directory run daily jobs once between them
+    JOB_LOCK_DIR = os.getenv('JOB_LOCK_DIR', os.path.join(BASE_DIR, 'data', 'jobs'))
+    # Per-request datastore read accounting (backend/utils/datastore_tracking.py)
+    DATASTORE_TRACKING = os.getenv('DATASTORE_TRACKING', '1') == '1'
+    DATASTORE_READ_BUDGET = int(os.getenv('DATASTORE_READ_BUDGET', DEFAULT_READ_BUDGET))
+    DATASTORE_BUDGET_STRICT = os.getenv('DATASTORE_BUDGET_STRICT', '0') == '1'
+    # Fraction of requests with stage timings that are also logged as JSON
+    TIMING_LOG_SAMPLE_RATE = float(os.getenv('TIMING_LOG_SAMPLE_RATE', 0))
+
+
+def init_firestore(cred_path):
+    """Returns a Firestore client, or None if Firebase can't be initialised."""
+    try:
+        try:
+            firebase_admin.get_app()
+        except ValueError:
+            firebase_admin.initialize_app(credentials.Certificate(cred_path))
+        client = firestore.client()
+        logger.info("Firebase connection successful.")
+        return client
+    except Exception as e:
+        logger.error(f"Error initializing Firebase: {e}")
+        return None
+
+
+def start_background_jobs(flask_app):
+    """Schedules the nightly face scan and starts warmup for this process."""
+    firestore_db = flask_app.extensions.get('firestore')
+    if firestore_db is None:
+        return
+    # Nightly all-pairs check for faces enrolled under more than one account
+    schedule_daily('face-duplicate-scan', flask_app.config['FACE_SCAN_HOUR'], 0,
+                   lambda: run_duplicate_scan(firestore_db), lock_dir=flask_app.config['JOB_LOCK_DIR'])
+
+    # Load face models, open the Firestore channel and prime caches in the background
+    if flask_app.config['WARMUP_ENABLED']:
+        start_warmup(firestore_db)
+
+
+def create_app(config=None, db=None):
+    """
+    Builds the Flask app. `config` is a dict or config object applied over
+    Config; `db` injects a Firestore-compatible client instead of connecting
+    with the service account key.
+
+    Route modules keep the datastore in module globals, so all apps created
+    in one process share the last datastore passed in.
+    """
+    # The frontend is served by serve_root/serve_page below, so Flask's own static route is disabled
+    flask_app = Flask(__name__, static_folder=None)
+    flask_app.config.from_object(Config)
+    if isinstance(config, dict):
+        flask_app.config.from_mapping(config)
+    elif config is not None:
+        flask_app.config.from_object(config)
+
+    # --- Load the Secret Key from the .env file ---
+    if not flask_app.config['SECRET_KEY']:
+        raise ValueError("No SECRET_KEY set for Flask application. Please set it in your .env file.")
+
+    static_assets = StaticAssets(flask_app.config['FRONTEND_FOLDER'])
+    init_metrics(flask_app)
+    init_timing(flask_app)
+    init_profiling(flask_app)
+    init_compression(flask_app)
+
+    # --- Firebase Initialization ---
+    if db is None:
+        db = init_firestore(flask_app.config['FIREBASE_CREDENTIALS'])
+    if db is not None and flask_app.config['DATASTORE_TRACKING']:
+        db = TrackedClient(db)
+        init_datastore_tracking(flask_app)
+    flask_app.extensions['firestore'] = db
+    mark('firebase_init')
+
+    # --- Register Blueprints (API Routes) ---
+    if db:
+        init_shared_versions(flask_app, db)
+        init_login_routes(flask_app, db)
+        init_admin_routes(flask_app, db)
+        init_student_routes(flask_app, db)
+        init_admin_system_routes(flask_app, db)
+        init_teacher_routes(flask_app, db)
+        logger.info("All API routes registered successfully.")
+        mark('routes_registered')
+        if flask_app.config['START_BACKGROUND_JOBS']:
+            start_background_jobs(flask_app)
+    else:
+        logger.error("Database not initialized. API routes will not be available.")
+
+    # --- Health Check ---
+
+    @flask_app.route('/api/health')
+    def health():
+        """Lightweight readiness probe. 'ready' turns true once warmup has finished."""
+        status = warmup_status()
+        return jsonify({
+            "status": "ok",
+            "database": db is not None,
+            "ready": status["ready"],
+            "warmup": status,
+            "timeline": timeline(),
+            "pid": os.getpid()
+        }), 200
+
+    # --- Page Serving Routes ---
+
+    @flask_app.route('/')
+    def serve_root():
+        """Serves the main landing page."""
+        return static_assets.response('index.html') # <-- Serves index.html as the landing page
+
+    @flask_app.route('/<path:filename>')
+    def serve_page(filename):
+        """Serves other HTML pages like admin_dashboard.html, etc."""
+        if ".." in filename or filename.startswith("/"):
+            return "Not Found", 404
+        return static_assets.response(filename)
+
+    return flask_app
+
+
+# Module-level app used by the desktop launcher, the tests and `python app.py`
+app = create_app()
+db = app.extensions['firestore']
 
 # --- Main Execution ---
 if __name__ == '__main__':
-    # You might need to install python-dotenv: pip install python-dotenv
-    app.run(host='127.0.0.1', port=5000, debug=True)
\ No newline at end of file
+    # Development server only; see wsgi.py for production
+    app.run(host='127.0.0.1', port=5000, debug=True)
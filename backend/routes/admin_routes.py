@@ -2,12 +2,11 @@ from flask import Blueprint, request, jsonify, session
 from firebase_admin import firestore
 import logging
 from datetime import datetime
-import face_recognition
-import numpy as np
-import base64
-import io
-from PIL import Image
 from functools import wraps
+from backend.utils.auth import invalidate_principal
+from backend.utils.face_index import face_index, run_duplicate_scan
+from backend.utils.face_pipeline import decode_image, encode_faces
+from backend.utils.response_cache import response_cache
 
 # Create blueprint
 admin_bp = Blueprint('admin', __name__)
@@ -199,6 +198,7 @@ def create_user():
         # Save to Firestore
         new_user_ref = users_ref.document()
         new_user_ref.set(user_data)
+        response_cache.invalidate('users')
         
         return jsonify({
             "message": "User created successfully",
@@ -241,6 +241,8 @@ def update_user(user_id):
                     update_data[field] = data[field]
         
         user_ref.update(update_data)
+        response_cache.invalidate('users')
+        invalidate_principal(user_id)
         
         return jsonify({"message": "User updated successfully"}), 200
         
@@ -260,6 +262,8 @@ def delete_user(user_id):
             return jsonify({"error": "User not found"}), 404
         
         user_ref.delete()
+        response_cache.invalidate('users')
+        invalidate_principal(user_id)
         
         return jsonify({"message": "User deleted successfully"}), 200
         
@@ -327,6 +331,7 @@ def create_timetable_entry():
         # Save to Firestore
         timetable_ref = db.collection('timetable').document()
         timetable_ref.set(timetable_data)
+        response_cache.invalidate('timetable')
         
         return jsonify({
             "message": "Timetable entry created successfully",
@@ -340,6 +345,7 @@ def create_timetable_entry():
 
 @admin_bp.route('/timetable/<branch_id>/<year>/<division>', methods=['GET'])
 @admin_login_required
+@response_cache.cached('timetable')
 def get_timetable(branch_id, year, division):
     """Get timetable for specific branch, year, and division"""
     try:
@@ -378,6 +384,7 @@ def delete_timetable_entry(timetable_id):
     """Delete a timetable entry"""
     try:
         db.collection('timetable').document(timetable_id).delete()
+        response_cache.invalidate('timetable')
         return jsonify({"message": "Timetable entry deleted successfully"}), 200
         
     except Exception as e:
@@ -443,6 +450,9 @@ def create_bulk_timetable():
                     'error': str(e)
                 })
         
+        if results['successful']:
+            response_cache.invalidate('timetable')
+        
         return jsonify(results), 201
         
     except Exception as e:
@@ -511,6 +521,7 @@ def check_timetable_clash(branch_id, year, division, day, lecture_number, room_n
 # --- Data Fetching Routes for Dropdowns ---
 @admin_bp.route('/branches', methods=['GET'])
 @admin_login_required
+@response_cache.cached('catalog')
 def get_branches():
     """Get all branches"""
     try:
@@ -531,6 +542,7 @@ def get_branches():
 
 @admin_bp.route('/teachers', methods=['GET'])
 @admin_login_required
+@response_cache.cached('users')
 def get_teachers():
     """Get all users with the role of Teacher"""
     try:
@@ -554,6 +566,7 @@ def get_teachers():
 
 @admin_bp.route('/courses', methods=['GET'])
 @admin_login_required
+@response_cache.cached('catalog')
 def get_courses():
     """Get all courses"""
     try:
@@ -574,6 +587,7 @@ def get_courses():
 
 @admin_bp.route('/rooms', methods=['GET'])
 @admin_login_required
+@response_cache.cached('catalog')
 def get_rooms():
     """Get all rooms"""
     try:
@@ -636,26 +650,28 @@ def register_face(user_id):
         if not user_doc.exists:
             return jsonify({"error": "User not found"}), 404
 
-        # Decode the Base64 image sent from the frontend
-        image_data_url = data['image']
-        header, encoded = image_data_url.split(",", 1)
-        image_bytes = base64.b64decode(encoded)
-
-        # Load the image into a format that face_recognition can read
-        image = Image.open(io.BytesIO(image_bytes))
-        image_np = np.array(image)
-
-        # Find all faces in the image. We expect only one.
-        face_locations = face_recognition.face_locations(image_np)
+        # Decode the Base64 image sent from the frontend, find all faces and
+        # generate their 128-point facial embedding vectors. We expect only one.
+        image_np = decode_image(data['image'])
+        _, face_locations, face_encodings = encode_faces(image_np, convert_to_bgr=False)
 
         if len(face_locations) == 0:
             return jsonify({"error": "No face was detected in the image. Please try again."}), 400
         if len(face_locations) > 1:
             return jsonify({"error": "Multiple faces were detected. Please ensure only one person is in the frame."}), 400
 
-        # Generate the 128-point facial embedding vector
-        face_encodings = face_recognition.face_encodings(image_np, face_locations)
         face_encoding = face_encodings[0].tolist() # Convert NumPy array to a Python list for Firestore
+        student_id = user_doc.to_dict().get('studentId')
+
+        # Reject faces that are already enrolled under another account
+        face_index.ensure_loaded(db)
+        duplicates = face_index.search(face_encoding, exclude_user_id=user_id)
+        if duplicates:
+            logger.warning(f"Duplicate face enrollment blocked for user {user_id}: matches {duplicates[0]['userId']} (distance {duplicates[0]['distance']:.4f})")
+            return jsonify({
+                "error": f"This face is already registered to another account ({duplicates[0]['studentId'] or duplicates[0]['userId']}).",
+                "duplicates": duplicates[:5]
+            }), 409
 
         # Save the encoding in a new 'face_encodings' collection
         # We use the user_id as the document ID for a direct 1-to-1 link
@@ -664,11 +680,24 @@ def register_face(user_id):
             'userId': user_id,
             'encoding': face_encoding,
             'createdAt': firestore.SERVER_TIMESTAMP,
-            'studentId': user_doc.to_dict().get('studentId') # Link to studentId for easier queries
+            'studentId': student_id # Link to studentId for easier queries
         })
+        face_index.upsert(user_id, user_id, student_id, face_encoding, db)
 
         return jsonify({"message": "Face registered successfully"}), 201
 
     except Exception as e:
         logger.error(f"Error registering face for user {user_id}: {str(e)}")
-        return jsonify({"error": "An internal error occurred while processing the image"}), 500
\ No newline at end of file
+        return jsonify({"error": "An internal error occurred while processing the image"}), 500
+
+
+@admin_bp.route('/face-duplicates', methods=['GET'])
+@admin_login_required
+def get_face_duplicates():
+    """Runs the full duplicate-face scan on demand and returns suspicious pairs."""
+    try:
+        pairs = run_duplicate_scan(db)
+        return jsonify({"pairs": pairs, "total": len(pairs)}), 200
+    except Exception as e:
+        logger.error(f"Error running duplicate face scan: {str(e)}")
+        return jsonify({"error": "Failed to run duplicate face scan"}), 500
@@ -1,8 +1,20 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, request, jsonify, session
 from firebase_admin import firestore
+import hmac
 import logging
+import os
+import time
+import tracemalloc
 from functools import wraps
 from datetime import datetime
+from backend.utils.auth import invalidate_principal
+from backend.utils.datastore_tracking import query_shapes
+from backend.utils.metrics import PROMETHEUS_CONTENT_TYPE, request_metrics
+from backend.utils.profiling import (
+    MAX_PROFILE_SECONDS, capture_lock, collapsed_stacks, memory_snapshot, pstats_bytes, pstats_text,
+    request_profiler, sample_stacks
+)
+from backend.utils.response_cache import response_cache
 
 # --- Blueprint Setup ---
 admin_system_bp = Blueprint('admin_system', __name__)
@@ -50,6 +62,8 @@ def update_admin_details():
         update_data['updatedAt'] = firestore.SERVER_TIMESTAMP
 
         db.collection('users').document(admin_id).update(update_data)
+        response_cache.invalidate('users')
+        invalidate_principal(admin_id)
         logger.info(f"Admin {admin_id} updated their details.")
         return jsonify({"message": "Your details have been updated successfully."}), 200
 
@@ -78,6 +92,8 @@ def change_admin_password():
         }
 
         db.collection('users').document(admin_id).update(update_data)
+        response_cache.invalidate('users')
+        invalidate_principal(admin_id)
         logger.info(f"Admin {admin_id} changed their password.")
         return jsonify({"message": "Password updated successfully."}), 200
 
@@ -126,6 +142,8 @@ def update_teacher_details(teacher_id):
         update_data['updatedAt'] = firestore.SERVER_TIMESTAMP
 
         db.collection('users').document(teacher_id).update(update_data)
+        response_cache.invalidate('users')
+        invalidate_principal(teacher_id)
         logger.info(f"Admin updated details for teacher {teacher_id}.")
         return jsonify({"message": "Teacher details updated successfully."}), 200
     except Exception as e:
@@ -157,6 +175,8 @@ def remove_teacher(teacher_id):
 
         # Delete the user
         db.collection('users').document(teacher_id).delete()
+        response_cache.invalidate('users')
+        invalidate_principal(teacher_id)
         logger.warning(f"Admin removed teacher {teacher_id} for reason: {reason}")
         return jsonify({"message": "Teacher removed successfully."}), 200
     except Exception as e:
@@ -242,6 +262,8 @@ def block_student_attendance(student_user_id):
             "updatedAt": firestore.SERVER_TIMESTAMP
         }
         db.collection('users').document(student_user_id).update(update_data)
+        response_cache.invalidate('users')
+        invalidate_principal(student_user_id)
         
         logger.warning(f"Admin blocked student {student_user_id} until {block_until} for reason: {reason}")
         return jsonify({"message": "Student attendance has been blocked."}), 200
@@ -275,6 +297,8 @@ def update_student_details(student_user_id):
         update_data['updatedAt'] = firestore.SERVER_TIMESTAMP
 
         db.collection('users').document(student_user_id).update(update_data)
+        response_cache.invalidate('users')
+        invalidate_principal(student_user_id)
         logger.info(f"Admin updated details for student {student_user_id}.")
         return jsonify({"message": "Student details updated successfully."}), 200
     except Exception as e:
@@ -299,6 +323,8 @@ def reset_student_password(student_user_id):
         }
         
         db.collection('users').document(student_user_id).update(update_data)
+        response_cache.invalidate('users')
+        invalidate_principal(student_user_id)
         logger.info(f"Admin reset password for student {student_user_id}.")
         return jsonify({"message": "Student password has been reset successfully."}), 200
     except Exception as e:
@@ -330,6 +356,8 @@ def remove_student(student_user_id):
 
         # Proceed with deleting the user document
         db.collection('users').document(student_user_id).delete()
+        response_cache.invalidate('users')
+        invalidate_principal(student_user_id)
         
         # You may also want to delete related data, like their face encoding and attendance records.
         # This can be done here or with a background Cloud Function.
@@ -340,4 +368,102 @@ def remove_student(student_user_id):
         logger.error(f"Error removing student {student_user_id}: {e}")
         return jsonify({"error": "Failed to remove student."}), 500
 # Add other student management endpoints (update, remove, reset password)
-# following the same patterns as the teacher endpoints.
\ No newline at end of file
+# following the same patterns as the teacher endpoints.
+
+
+# ==============================================================================
+# --- 4. MONITORING ENDPOINTS ---
+# ==============================================================================
+
+@admin_system_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Per-route latency, status and size metrics of the server (every worker
+    sharing METRICS_DIR) in Prometheus text format. Available to a logged-in admin, or to a scraper
+    sending 'Authorization: Bearer <METRICS_TOKEN>' when that is set.
+    """
+    token = os.getenv('METRICS_TOKEN')
+    bearer = request.headers.get('Authorization', '')
+    token_ok = bool(token) and hmac.compare_digest(bearer, f"Bearer {token}")
+    if not token_ok and ('user_id' not in session or session.get('role') != 'Admin'):
+        return jsonify({"error": "Authentication required. Please log in as an admin."}), 401
+    return Response(request_metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@admin_system_bp.route('/query-shapes', methods=['GET'])
+@admin_login_required
+def get_query_shapes():
+    """
+    Datastore query shapes seen by this server process, heaviest first, with
+    the composite indexes they need in firestore.indexes.json form.
+    """
+    return jsonify(query_shapes.report()), 200
+
+
+def _profile_download(body, extension, mimetype):
+    filename = f"profile-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.{extension}"
+    return Response(body, mimetype=mimetype, headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+
+@admin_system_bp.route('/profile/cpu', methods=['GET'])
+@admin_login_required
+def profile_cpu():
+    """
+    Profiles this server process for ?seconds= (1-60, default 10).
+    mode=sample (default) samples every thread's stack and downloads
+    collapsed stacks for a flame graph. mode=cprofile runs cProfile around
+    each request served in the window and downloads a pstats file
+    (format=text for the top functions as text).
+    """
+    seconds = min(max(request.args.get('seconds', 10, type=float), 1), MAX_PROFILE_SECONDS)
+    mode = request.args.get('mode', 'sample')
+    if mode not in ('sample', 'cprofile'):
+        return jsonify({"error": "mode must be 'sample' or 'cprofile'."}), 400
+    if not capture_lock.acquire(blocking=False):
+        return jsonify({"error": "A profile is already being captured."}), 409
+    try:
+        logger.warning(f"Admin {session.get('user_id')} started a {seconds:g}s {mode} CPU profile (pid {os.getpid()}).")
+        if mode == 'sample':
+            counts, _ = sample_stacks(seconds)
+            return _profile_download(collapsed_stacks(counts), 'collapsed', 'text/plain')
+
+        request_profiler.start()
+        try:
+            time.sleep(seconds)
+        finally:
+            stats = request_profiler.stop()
+        if stats is None:
+            return jsonify({"error": "No requests were handled during the profile window."}), 404
+        if request.args.get('format') == 'text':
+            return Response(pstats_text(stats), mimetype='text/plain')
+        return _profile_download(pstats_bytes(stats), 'prof', 'application/octet-stream')
+    except Exception as e:
+        logger.error(f"Error capturing CPU profile: {e}")
+        return jsonify({"error": "Failed to capture CPU profile."}), 500
+    finally:
+        capture_lock.release()
+
+
+@admin_system_bp.route('/profile/memory', methods=['GET'])
+@admin_login_required
+def profile_memory():
+    """
+    Growth of the top ?top= (default 25) allocation sites of this process
+    from tracemalloc over ?seconds= (up to 60, default 10). seconds=0 lists
+    what is allocated now, which needs the server started with
+    PYTHONTRACEMALLOC set.
+    """
+    seconds = min(max(request.args.get('seconds', 10, type=float), 0), MAX_PROFILE_SECONDS)
+    top = min(max(request.args.get('top', 25, type=int), 1), 200)
+    if not seconds and not tracemalloc.is_tracing():
+        return jsonify({"error": "seconds=0 needs the server started with PYTHONTRACEMALLOC set."}), 400
+    if not capture_lock.acquire(blocking=False):
+        return jsonify({"error": "A profile is already being captured."}), 409
+    try:
+        logger.warning(f"Admin {session.get('user_id')} took a memory snapshot (pid {os.getpid()}, window {seconds:g}s).")
+        return jsonify(memory_snapshot(seconds, top)), 200
+    except Exception as e:
+        logger.error(f"Error taking memory snapshot: {e}")
+        return jsonify({"error": "Failed to take memory snapshot."}), 500
+    finally:
+        capture_lock.release()
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify, session # Added session import
 from flask_cors import CORS, cross_origin
 from firebase_admin import firestore
 import logging
+from backend.utils.auth import store_principal
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -60,6 +61,7 @@ def login():
         def create_user_payload():
             session['user_id'] = user_doc.id
             session['role'] = user_data.get('role', 'Unknown')
+            store_principal(user_doc.id, user_data)
             logger.info(f"Session set for user: {email}, role: {session['role']}")
             return {
                 "uid": user_doc.id, "email": email,
@@ -126,6 +128,7 @@ def update_password():
             user_data = user_doc.to_dict()
             session['user_id'] = uid
             session['role'] = user_data.get('role')
+            store_principal(uid, user_data)
 
         return jsonify({"success": True, "message": "Password updated successfully"}), 200
             
@@ -1,15 +1,23 @@
 from flask import Blueprint, request, jsonify, session
 from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists
 import logging
-from datetime import datetime, timedelta
+import uuid
+from datetime import datetime, timedelta, timezone
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 from geopy.distance import geodesic
-import face_recognition
-import numpy as np
-import cv2
-import base64
-from io import BytesIO
-from PIL import Image
+import os
+from backend.utils.auth import current_principal
+from backend.utils.database import reference_cache
+from backend.utils.events import event_bus, lecture_channel
+from backend.utils.face_index import face_index
+from backend.utils.response_cache import response_cache
+from backend.utils.timetable_index import timetable_index
+from backend.utils.timing import checkpoint, collect_stages, record_parallel_stages
+from backend.utils.face_pipeline import (
+    MATCH_THRESHOLD, analyze_burst_frame, assess_liveness, decode_image, encode_faces, face_distance
+)
 
 # --------------------------------------------------------------------------
 # Blueprint Setup
@@ -18,6 +26,14 @@ student_bp = Blueprint('student', __name__)
 logger = logging.getLogger(__name__)
 db = None
 
+# Burst verification: frames are decoded, detected and encoded concurrently
+MIN_BURST_FRAMES = 2
+MAX_BURST_FRAMES = 8
+_burst_executor = ThreadPoolExecutor(max_workers=min(MAX_BURST_FRAMES, os.cpu_count() or 1), thread_name_prefix='face-burst')
+
+# How long a face verification can be used to mark attendance
+FACE_VERIFICATION_TTL = timedelta(minutes=5)
+
 def init_student_routes(flask_app, firestore_db):
     """Initializes the student routes and registers the blueprint."""
     global db
@@ -51,6 +67,29 @@ def normalize_bssid(bssid):
         return ""
     return bssid.replace(':', '').upper()
 
+def consume_face_verification(user_id, verification_id, verified_at):
+    """
+    Records a face verification as used, once. The record lives in Firestore
+    and create() fails if it already exists, so replaying an old session
+    cookie is rejected on every server process and after restarts. Records
+    only matter until the verification expires; a Firestore TTL policy on
+    expireAt can delete them.
+    """
+    try:
+        db.collection('face_verifications').document(verification_id).create({
+            "userId": user_id,
+            "verifiedAt": verified_at,
+            "consumedAt": firestore.SERVER_TIMESTAMP,
+            "expireAt": datetime.now(timezone.utc) + FACE_VERIFICATION_TTL
+        })
+    except AlreadyExists:
+        return False
+    return True
+
+def teacher_device_ids():
+    """Bluetooth device IDs of all teachers, from the reference cache."""
+    return [teacher['bluetoothDeviceId'] for teacher in reference_cache.get(db, 'teachers') if teacher.get('bluetoothDeviceId')]
+
 # --------------------------------------------------------------------------
 # API Routes
 # --------------------------------------------------------------------------
@@ -62,13 +101,10 @@ def get_dashboard_data():
     Fetches the logged-in student's details and a summary of their attendance.
     """
     try:
-        user_id = session['user_id']
-        student_doc = db.collection('users').document(user_id).get()
-        if not student_doc.exists:
+        principal = current_principal(db)
+        if principal is None:
             return jsonify({"error": "Student record not found"}), 404
-        
-        student_data = student_doc.to_dict()
-        student_id = student_data.get('studentId')
+        student_id = principal.studentId
         
         # Calculate attendance percentage
         attendance_ref = db.collection('attendance').where('studentId', '==', student_id)
@@ -81,7 +117,7 @@ def get_dashboard_data():
         percentage = (present_count / total_count * 100) if total_count > 0 else 100
         
         return jsonify({
-            "name": student_data.get('name'),
+            "name": principal.name,
             "studentId": student_id,
             "attendance": {
                 "percentage": round(percentage, 2),
@@ -96,19 +132,16 @@ def get_dashboard_data():
 
 @student_bp.route('/timetable', methods=['GET'])
 @student_login_required
+@response_cache.cached('timetable', 'users', per_user=True)
 def get_student_timetable():
     """
     Fetches the weekly timetable corresponding to the student's branch.
     """
     try:
-        user_id = session['user_id']
-        student_doc = db.collection('users').document(user_id).get()
-        
-        if not student_doc.exists:
+        principal = current_principal(db)
+        if principal is None:
             return jsonify({"error": "Student record not found"}), 404
-        
-        student_data = student_doc.to_dict()
-        branch_id = student_data.get('branchId')
+        branch_id = principal.branchId
         
         if not branch_id:
             return jsonify({"error": "Student branch not found"}), 404
@@ -144,15 +177,7 @@ def get_teacher_devices():
     for the desktop app to work properly
     """
     try:
-        teachers_ref = db.collection('users').where('role', '==', 'Teacher')
-        teachers = teachers_ref.stream()
-        
-        device_ids = []
-        for teacher in teachers:
-            teacher_data = teacher.to_dict()
-            if teacher_data.get('bluetoothDeviceId'):
-                device_ids.append(teacher_data['bluetoothDeviceId'])
-        
+        device_ids = teacher_device_ids()
         logger.info(f"Found {len(device_ids)} teacher Bluetooth devices: {device_ids}")
         return jsonify({"devices": device_ids}), 200
         
@@ -161,98 +186,123 @@ def get_teacher_devices():
         return jsonify({"error": "Failed to fetch teacher devices"}), 500
 
 
+def _analyze_frame_timed(image):
+    """analyze_burst_frame on a pool thread, with the stage times it collected there."""
+    with collect_stages() as stages:
+        frame = analyze_burst_frame(image)
+    return frame, stages
+
+
+def _verify_frames(images):
+    """
+    Analyses the frames concurrently while the stored encoding is fetched.
+    The student must match in a majority of frames and pass the motion/blink
+    liveness check, which needs at least two frames.
+    """
+    # Start analysing frames while the stored encoding is fetched
+    frame_futures = [_burst_executor.submit(_analyze_frame_timed, image) for image in images]
+    try:
+        principal = current_principal(db)
+        if principal is None:
+            return jsonify({"error": "Student record not found"}), 404
+        student_id = principal.studentId
+        checkpoint('profile')
+
+        face_encodings_list = list(db.collection('face_encodings').where('studentId', '==', student_id).limit(1).stream())
+        if not face_encodings_list:
+            return jsonify({"error": "No face encoding found for student"}), 404
+        stored_encoding = face_encodings_list[0].to_dict().get('encoding', [])
+        if not stored_encoding:
+            return jsonify({"error": "Invalid face encoding data"}), 400
+        checkpoint('stored-encoding')
+
+        results = [future.result() for future in frame_futures]
+        checkpoint('frames')
+    finally:
+        # Don't leave queued frames of a failed request on the shared pool
+        for future in frame_futures:
+            future.cancel()
+    frames = [frame for frame, _ in results]
+    # Per-stage time of the slowest frame, e.g. 'frame-detect'
+    record_parallel_stages([stages for _, stages in results], prefix='frame-')
+
+    if any(frame["faces"] > 1 for frame in frames):
+        return jsonify({"error": "Multiple faces detected. Please ensure only one person is in the frame."}), 400
+    usable = [frame for frame in frames if frame["encoding"] is not None]
+    if not usable:
+        return jsonify({"error": "No face detected in the image"}), 400
+
+    distances = [face_distance(stored_encoding, frame["encoding"]) for frame in usable]
+    matched_frames = sum(1 for distance in distances if distance < MATCH_THRESHOLD)
+    face_match = matched_frames * 2 > len(frames)
+    liveness = assess_liveness(frames)
+    verified = face_match and liveness["live"]
+    checkpoint('consensus')
+
+    logger.info(f"Face verification - Student: {student_id}, Frames: {len(frames)}, Matched: {matched_frames}, Live: {liveness['live']}, Verified: {verified}")
+
+    if verified:
+        # Store verification time in session for secure attendance marking.
+        # The id makes each verification single-use (see consume_face_verification).
+        session['face_verified_at'] = datetime.now().isoformat()
+        session['face_verification_id'] = uuid.uuid4().hex
+        message = "Face verified successfully"
+    elif not face_match:
+        message = "Face verification failed"
+    else:
+        message = "Liveness check failed. Please blink or move slightly and try again."
+
+    return jsonify({
+        "match": verified,
+        "faceMatch": face_match,
+        "liveness": liveness,
+        "framesAnalyzed": len(frames),
+        "matchedFrames": matched_frames,
+        "distance": sorted(distances)[len(distances) // 2],
+        "threshold": MATCH_THRESHOLD,
+        "message": message
+    }), 200
+
+
 @student_bp.route('/verify-face', methods=['POST'])
 @student_login_required
 def verify_face():
     """
-    Verify student's face against stored encodings
+    Checks one frame against the stored encoding, for clients that predate
+    /verify-face-burst. A single frame cannot pass the liveness check, so
+    this reports faceMatch but never verifies the student for attendance.
     """
     try:
-        user_id = session['user_id']
-        
-        # Get the image data from the request
         data = request.get_json()
         if not data or 'image' not in data:
             return jsonify({"error": "No image data provided"}), 400
-        
-        # Decode the base64 image
-        image_data = data['image'].split(',')[1]  # Remove data:image/jpeg;base64, prefix
-        image_bytes = base64.b64decode(image_data)
-        
-        # Convert to numpy array
-        image = Image.open(BytesIO(image_bytes))
-        image_np = np.array(image)
-        
-        # Convert RGB to BGR (OpenCV format)
-        image_bgr = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
-        
-        # Find face locations and encodings in the current frame
-        face_locations = face_recognition.face_locations(image_bgr)
-        face_encodings = face_recognition.face_encodings(image_bgr, face_locations)
-        
-        if not face_encodings:
-            return jsonify({"error": "No face detected in the image"}), 400
-        
-        if len(face_encodings) > 1:
-            return jsonify({"error": "Multiple faces detected. Please ensure only one person is in the frame."}), 400
-        
-        # Get the first face encoding (assuming one face per image)
-        current_face_encoding = face_encodings[0]
-        
-        # Get the student's stored face encoding from Firebase
-        student_doc = db.collection('users').document(user_id).get()
-        if not student_doc.exists:
-            return jsonify({"error": "Student record not found"}), 404
-        
-        student_data = student_doc.to_dict()
-        student_id = student_data.get('studentId')
-        
-        # Query face_encodings collection for this student
-        face_encoding_ref = db.collection('face_encodings').where('studentId', '==', student_id).limit(1).stream()
-        face_encodings_list = list(face_encoding_ref)
-        
-        if not face_encodings_list:
-            return jsonify({"error": "No face encoding found for student"}), 404
-        
-        # Get the stored encoding
-        stored_encoding_data = face_encodings_list[0].to_dict()
-        stored_encoding = stored_encoding_data.get('encoding', [])
-        
-        if not stored_encoding:
-            return jsonify({"error": "Invalid face encoding data"}), 400
-        
-        # Convert stored encoding to numpy array
-        stored_encoding_np = np.array(stored_encoding)
-        
-        # Compare faces
-        face_distance = face_recognition.face_distance([stored_encoding_np], current_face_encoding)[0]
-        face_match = face_distance < 0.6  # Threshold for match (adjust as needed)
-        
-        logger.info(f"Face verification - Student: {student_id}, Distance: {face_distance:.4f}, Match: {face_match}")
-        
-        if face_match:
-             # Store verification time in session for secure attendance marking
-            session['face_verified_at'] = datetime.now().isoformat()
-            
-            return jsonify({
-                "match": True,
-                "distance": float(face_distance),
-                "threshold": 0.6,
-                "message": "Face verified successfully"
-            }), 200
-        else:
-            return jsonify({
-                "match": False,
-                "distance": float(face_distance),
-                "threshold": 0.6,
-                "message": "Face verification failed"
-            }), 200
-        
+        return _verify_frames([data['image']])
     except Exception as e:
         logger.error(f"Error in face verification: {e}")
         return jsonify({"error": "Face verification failed due to server error"}), 500
 
 
+@student_bp.route('/verify-face-burst', methods=['POST'])
+@student_login_required
+def verify_face_burst():
+    """
+    Verifies a short burst of frames in one request.
+    Frames are analysed concurrently; the student must match in a majority of
+    frames and pass the motion/blink liveness check.
+    """
+    try:
+        data = request.get_json()
+        images = data.get('images') if data else None
+        if not images or not isinstance(images, list):
+            return jsonify({"error": "No image frames provided"}), 400
+        if not (MIN_BURST_FRAMES <= len(images) <= MAX_BURST_FRAMES):
+            return jsonify({"error": f"Send between {MIN_BURST_FRAMES} and {MAX_BURST_FRAMES} frames."}), 400
+        return _verify_frames(images)
+    except Exception as e:
+        logger.error(f"Error in burst face verification: {e}")
+        return jsonify({"error": "Face verification failed due to server error"}), 500
+
+
 @student_bp.route('/mark-attendance', methods=['POST'])
 @student_login_required
 def mark_attendance():
@@ -264,12 +314,11 @@ def mark_attendance():
         user_id = session['user_id']
         
         # Get student data
-        student_doc = db.collection('users').document(user_id).get()
-        if not student_doc.exists:
+        principal = current_principal(db)
+        if principal is None:
             return jsonify({"error": "Student record not found"}), 404
-        
-        student_data = student_doc.to_dict()
-        student_id = student_data.get('studentId')
+        student_id = principal.studentId
+        checkpoint('profile')
 
         # Validate required fields
         required_fields = ['lectureId', 'latitude', 'longitude']
@@ -285,50 +334,48 @@ def mark_attendance():
         
         # --- Face Verification Check (Server-Side) ---
         face_verified_at = session.get('face_verified_at')
-        if not face_verified_at:
+        verification_id = session.get('face_verification_id')
+        if not face_verified_at or not verification_id:
             return jsonify({"error": "Face verification required before marking attendance. Please verify your face first."}), 400
         
         # Check if verification is recent (e.g., within 5 minutes)
         verified_time = datetime.fromisoformat(face_verified_at)
-        if datetime.now() - verified_time > timedelta(minutes=5):
+        if datetime.now() - verified_time > FACE_VERIFICATION_TTL:
              # Clear expired session
             session.pop('face_verified_at', None)
+            session.pop('face_verification_id', None)
             return jsonify({"error": "Face verification expired. Please verify again."}), 400
             
-        # Clear verification after use to prevent replay (optional, but good practice)
+        # Clear verification after use to prevent replay. Callers that reuse an
+        # old session cookie (such as the in-process desktop bridge) can't see
+        # the cleared session, so the use is also recorded in Firestore.
         session.pop('face_verified_at', None)
+        session.pop('face_verification_id', None)
+        if not consume_face_verification(user_id, verification_id, face_verified_at):
+            return jsonify({"error": "Face verification already used. Please verify again."}), 400
+        checkpoint('face-verification')
 
         student_coords = (student_latitude, student_longitude)
         logger.info(f"Attendance attempt - Student: {student_id}, Lecture: {lecture_id}, Coords: {student_coords}")
 
         # --- Time Validation ---
-        lecture_doc = db.collection('timetable').document(lecture_id).get()
-        if not lecture_doc.exists:
+        lecture_data = timetable_index.lecture(db, lecture_id)
+        if lecture_data is None:
             return jsonify({"error": "Lecture not found."}), 404
-        
-        lecture_data = lecture_doc.to_dict()
-
-        try:
-            now = datetime.now()
-            start_time_obj = datetime.strptime(lecture_data['startTime'], '%H:%M').time()
-            end_time_obj = datetime.strptime(lecture_data['endTime'], '%H:%M').time()
-            lecture_start_dt = now.replace(hour=start_time_obj.hour, minute=start_time_obj.minute, second=0, microsecond=0)
-            lecture_end_dt = now.replace(hour=end_time_obj.hour, minute=end_time_obj.minute, second=0, microsecond=0)
-
-            if not (lecture_start_dt <= now <= lecture_end_dt):
-                return jsonify({"error": "This lecture is not currently active."}), 400
-                
-        except (ValueError, KeyError) as e:
-            logger.error(f"Invalid lecture time format: {e}")
+
+        now = datetime.now()
+        lecture_active = timetable_index.is_active(db, lecture_id, now)
+        checkpoint('timetable')
+        if lecture_active is None:
+            logger.error(f"Invalid lecture time format for lecture {lecture_id}: {lecture_data.get('startTime')}-{lecture_data.get('endTime')}")
             return jsonify({"error": "Invalid lecture time format"}), 400
+        if not lecture_active:
+            return jsonify({"error": "This lecture is not currently active."}), 400
 
         # --- Location Validation ---
         location_passed = False
         location_name = "unknown location"
-        locations_ref = db.collection('locations').stream()
-        
-        for loc_doc in locations_ref:
-            loc_data = loc_doc.to_dict()
+        for loc_data in reference_cache.get(db, 'locations'):
             if 'location' in loc_data and isinstance(loc_data['location'], firestore.GeoPoint):
                 authorized_coords = (loc_data['location'].latitude, loc_data['location'].longitude)
                 try:
@@ -350,16 +397,14 @@ def mark_attendance():
             return jsonify({"error": f"You are not within the allowed range of {location_name}."}), 400
 
         logger.info(f"Location validation passed: {location_name}")
+        checkpoint('geofence')
 
         # --- WiFi Validation ---
         wifi_passed = False
         wifi_name = "unknown network"
         if detected_bssid:
             normalized_bssid = normalize_bssid(detected_bssid)
-            wifi_ref = db.collection('wifi_networks').stream()
-            
-            for wifi_doc in wifi_ref:
-                wifi_data = wifi_doc.to_dict()
+            for wifi_data in reference_cache.get(db, 'wifi_networks'):
                 if wifi_data.get('bssid'):
                     stored_bssid = normalize_bssid(wifi_data['bssid'])
                     if normalized_bssid == stored_bssid:
@@ -372,16 +417,14 @@ def mark_attendance():
             return jsonify({"error": "You are not connected to a recognized campus network."}), 400
 
         logger.info(f"WiFi validation passed: {wifi_name}")
+        checkpoint('wifi')
 
         # --- Bluetooth Validation ---
         bluetooth_passed = False
         teacher_name = "unknown teacher"
         if detected_bluetooth_id:
             normalized_bt_id = normalize_bluetooth_address(detected_bluetooth_id)
-            teachers_ref = db.collection('users').where('role', '==', 'Teacher').stream()
-            
-            for teacher_doc in teachers_ref:
-                teacher_data = teacher_doc.to_dict()
+            for teacher_data in reference_cache.get(db, 'teachers'):
                 if teacher_data.get('bluetoothDeviceId'):
                     stored_bt_id = normalize_bluetooth_address(teacher_data['bluetoothDeviceId'])
                     if normalized_bt_id == stored_bt_id:
@@ -394,6 +437,7 @@ def mark_attendance():
             return jsonify({"error": "Teacher's device was not detected in range."}), 400
 
         logger.info(f"Bluetooth validation passed: {teacher_name}'s device")
+        checkpoint('bluetooth')
 
         # --- Check for duplicate attendance ---
         existing_attendance_query = db.collection('attendance')\
@@ -403,11 +447,13 @@ def mark_attendance():
             
         if sum(1 for _ in existing_attendance_query) > 0:
             return jsonify({"error": "You have already marked attendance for this lecture."}), 400
+        checkpoint('duplicate-check')
 
         # --- Save Attendance Record ---
         attendance_record = {
             "studentId": student_id,
             "lectureId": lecture_id,
+            "date": now.strftime('%Y-%m-%d'),
             "courseCode": lecture_data.get('courseCode', 'Unknown'),
             "timestamp": firestore.SERVER_TIMESTAMP,
             "status": "Present",
@@ -422,7 +468,14 @@ def mark_attendance():
         }
         
         db.collection('attendance').add(attendance_record)
+        checkpoint('write')
         logger.info(f"Attendance marked successfully for student {student_id} in lecture {lecture_data.get('courseCode', 'Unknown')}")
+        event_bus.publish(lecture_channel(lecture_id), {
+            "type": "attendance",
+            "studentId": student_id,
+            "status": "Present",
+            "date": attendance_record["date"]
+        })
 
         return jsonify({
             "message": "Attendance marked successfully!",
@@ -449,14 +502,10 @@ def get_attendance_history():
     Returns the student's attendance history
     """
     try:
-        user_id = session['user_id']
-        student_doc = db.collection('users').document(user_id).get()
-        
-        if not student_doc.exists:
+        principal = current_principal(db)
+        if principal is None:
             return jsonify({"error": "Student record not found"}), 404
-        
-        student_data = student_doc.to_dict()
-        student_id = student_data.get('studentId')
+        student_id = principal.studentId
         
         # Get attendance records
         attendance_ref = db.collection('attendance').where('studentId', '==', student_id)
@@ -494,20 +543,9 @@ def register_face():
         if not data or 'image' not in data:
             return jsonify({"error": "No image data provided"}), 400
         
-        # Decode the base64 image
-        image_data = data['image'].split(',')[1]  # Remove data:image/jpeg;base64, prefix
-        image_bytes = base64.b64decode(image_data)
-        
-        # Convert to numpy array
-        image = Image.open(BytesIO(image_bytes))
-        image_np = np.array(image)
-        
-        # Convert RGB to BGR (OpenCV format)
-        image_bgr = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
-        
-        # Find face locations and encodings in the current frame
-        face_locations = face_recognition.face_locations(image_bgr)
-        face_encodings = face_recognition.face_encodings(image_bgr, face_locations)
+        # Decode the base64 image and find face locations and encodings in it
+        image_np = decode_image(data['image'])
+        _, face_locations, face_encodings = encode_faces(image_np)
         
         if not face_encodings:
             return jsonify({"error": "No face detected in the image"}), 400
@@ -519,12 +557,23 @@ def register_face():
         face_encoding = face_encodings[0].tolist()  # Convert to list for Firestore
         
         # Get student data
-        student_doc = db.collection('users').document(user_id).get()
-        if not student_doc.exists:
+        principal = current_principal(db)
+        if principal is None:
             return jsonify({"error": "Student record not found"}), 404
-        
-        student_data = student_doc.to_dict()
-        student_id = student_data.get('studentId')
+        student_id = principal.studentId
+
+        # Reject faces that are already enrolled under another account
+        face_index.ensure_loaded(db)
+        duplicates = face_index.search(face_encoding, exclude_user_id=user_id)
+        if duplicates:
+            logger.warning(f"Duplicate face enrollment blocked for student {student_id}: matches {duplicates[0]['studentId']} (distance {duplicates[0]['distance']:.4f})")
+            db.collection('audit_logs').add({
+                "action": "DUPLICATE_FACE_BLOCKED",
+                "targetId": user_id,
+                "matches": duplicates[:5],
+                "timestamp": firestore.SERVER_TIMESTAMP
+            })
+            return jsonify({"error": "This face is already registered to another account."}), 409
         
         # Check if face encoding already exists
         existing_face_ref = db.collection('face_encodings').where('studentId', '==', student_id).limit(1).stream()
@@ -541,10 +590,12 @@ def register_face():
             # Update existing face encoding
             existing_face_id = existing_faces[0].id
             db.collection('face_encodings').document(existing_face_id).set(face_data, merge=True)
+            face_index.upsert(existing_face_id, user_id, student_id, face_encoding, db)
             logger.info(f"Updated face encoding for student {student_id}")
         else:
             # Create new face encoding
-            db.collection('face_encodings').add(face_data)
+            _, new_face_ref = db.collection('face_encodings').add(face_data)
+            face_index.upsert(new_face_ref.id, user_id, student_id, face_encoding, db)
             logger.info(f"Created new face encoding for student {student_id}")
         
         return jsonify({
@@ -1,8 +1,14 @@
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, Response, jsonify, request, session, stream_with_context
 from firebase_admin import firestore
 from datetime import datetime, timedelta
+import json
 import logging
+import time
 from functools import wraps
+from backend.utils.database import chunked_in
+from backend.utils.events import event_bus, lecture_channel
+from backend.utils.response_cache import response_cache
+from backend.utils.timetable_index import timetable_index
 
 # --------------------------------------------------------------------------
 # Blueprint Setup
@@ -11,6 +17,12 @@ teacher_bp = Blueprint("teacher_bp", __name__)
 logger = logging.getLogger(__name__)
 db = None  # Firestore reference
 
+# Live lecture stream: keep-alive comment interval and client reconnect delay
+SSE_KEEPALIVE_SECONDS = 15
+SSE_RETRY_MS = 5000
+# How often a stream checks for attendance marked through other server processes
+SSE_CATCH_UP_SECONDS = 5
+
 def init_teacher_routes(app, firestore_db):
     """Initializes the teacher routes and registers the blueprint."""
     global db
@@ -34,6 +46,7 @@ def teacher_login_required(f):
 # --------------------------------------------------------------------------
 @teacher_bp.route('/filters', methods=['GET'])
 @teacher_login_required
+@response_cache.cached('timetable', 'catalog')
 def get_filter_options():
     """
     Provides unique values for branches, years, and divisions to populate UI dropdowns.
@@ -90,16 +103,7 @@ def get_teacher_timetable():
     Fetches the logged-in teacher's personal weekly timetable, structured by day.
     """
     try:
-        teacher_id = session['user_id']
-        timetable_ref = db.collection("timetable").where("teacherId", "==", teacher_id).stream()
-        timetable = {day: [] for day in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]}
-        for doc in timetable_ref:
-            lecture_data = {**doc.to_dict(), 'id': doc.id}
-            day = lecture_data.get("day")
-            if day in timetable:
-                timetable[day].append(lecture_data)
-        for day in timetable:
-            timetable[day].sort(key=lambda x: datetime.strptime(x.get('startTime', '00:00'), '%H:%M'))
+        timetable = timetable_index.teacher_week(db, session['user_id'])
         return jsonify({"success": True, "timetable": timetable}), 200
     except Exception as e:
         logger.error(f"Error fetching timetable for teacher {session.get('user_id')}: {e}")
@@ -108,6 +112,71 @@ def get_teacher_timetable():
 # --------------------------------------------------------------------------
 # 2. Live Lecture & Student List
 # --------------------------------------------------------------------------
+def find_live_lecture(teacher_id, now):
+    """The teacher's lecture running at `now`, or None."""
+    return timetable_index.current_for_teacher(db, teacher_id, now)
+
+def student_attendance_stats(student_id):
+    """Overall attendance percentage and at-risk flag for one student."""
+    # Count aggregations: a read per 1000 records instead of one per record
+    attendance_q = db.collection("attendance").where("studentId", "==", student_id)
+    total_count = attendance_q.count().get()[0][0].value
+    present_count = attendance_q.where("status", "==", "Present").count().get()[0][0].value
+    
+    percentage = (present_count / total_count * 100) if total_count > 0 else 100
+    return {"attendancePercentage": round(percentage, 2), "atRisk": percentage < 75}
+
+def present_today_query(lecture_id, today_date_str):
+    return db.collection("attendance") \
+        .where("lectureId", "==", lecture_id) \
+        .where("date", "==", today_date_str) \
+        .where("status", "==", "Present")
+
+def catch_up_attendance(lecture_id, today_date_str, present, known_count):
+    """
+    (count, events): the lecture's present records today, and an attendance
+    event for each student marked since `present` was filled, e.g. through
+    another server process whose events never reach this one. The records
+    are only read when the count has grown past `known_count`, so a quiet
+    lecture costs one aggregation read.
+    """
+    query = present_today_query(lecture_id, today_date_str)
+    count = query.count().get()[0][0].value
+    if count <= known_count:
+        return known_count, []
+    events = []
+    for record in query.stream():
+        student_id = record.to_dict().get('studentId')
+        if student_id and student_id not in present:
+            events.append({"type": "attendance", "studentId": student_id, "status": "Present", "date": today_date_str})
+    return count, events
+
+def build_live_roster(live_lecture, today_date_str):
+    """The lecture's class list with overall attendance and today's status."""
+    students_ref = db.collection("users").where("role", "==", "Student") \
+        .where("branchId", "==", live_lecture["branchId"]) \
+        .where("year", "==", live_lecture["year"]) \
+        .where("division", "==", live_lecture["division"]).stream()
+        
+    student_list = [{**s.to_dict(), "id": s.id} for s in students_ref]
+    student_ids = [s.get('studentId') for s in student_list if s.get('studentId')]
+
+    if not student_ids:
+        return []
+
+    # The lecture and date already scope this to the class; an 'in' filter on
+    # the students would break Firestore's 30-value limit for a normal class
+    present_students = {record.to_dict()['studentId']
+                        for record in present_today_query(live_lecture["id"], today_date_str).stream()}
+
+    final_student_list = []
+    for student in student_list:
+        student_id = student.get('studentId')
+        student.update(student_attendance_stats(student_id))
+        student['todayStatus'] = "Present" if student_id in present_students else "Absent"
+        final_student_list.append(student)
+    return final_student_list
+
 @teacher_bp.route("/live-lecture", methods=["GET"])
 @teacher_login_required
 def get_live_lecture_and_students():
@@ -116,72 +185,100 @@ def get_live_lecture_and_students():
     student list with attendance status for today.
     """
     try:
-        teacher_id = session['user_id']
         now = datetime.now()
-        today_str = now.strftime("%A")
-        today_date_str = now.strftime("%Y-%m-%d")
-
-        timetable_ref = db.collection("timetable").where("teacherId", "==", teacher_id).where("day", "==", today_str).stream()
-        live_lecture = None
-        for doc in timetable_ref:
-            lecture = doc.to_dict()
-            start_time = datetime.strptime(lecture["startTime"], "%H:%M").time()
-            end_time = datetime.strptime(lecture["endTime"], "%H:%M").time()
-            if start_time <= now.time() <= end_time:
-                live_lecture = {**lecture, "id": doc.id}
-                break
-
+        live_lecture = find_live_lecture(session['user_id'], now)
         if not live_lecture:
             return jsonify({"success": True, "message": "No live lecture right now."}), 200
 
-        students_ref = db.collection("users").where("role", "==", "Student") \
-            .where("branchId", "==", live_lecture["branchId"]) \
-            .where("year", "==", live_lecture["year"]) \
-            .where("division", "==", live_lecture["division"]).stream()
-            
-        student_list = [{**s.to_dict(), "id": s.id} for s in students_ref]
-        student_ids = [s.get('studentId') for s in student_list if s.get('studentId')]
-
-        if not student_ids:
-             return jsonify({
-                "success": True,
-                "liveLecture": live_lecture,
-                "students": []
-            }), 200
-
-        attendance_ref = db.collection("attendance") \
-            .where("lectureId", "==", live_lecture["id"]) \
-            .where("studentId", "in", student_ids) \
-            .where("date", "==", today_date_str).stream()
-        
-        present_students = {record.to_dict()['studentId'] for record in attendance_ref}
-
-        final_student_list = []
-        for student in student_list:
-            student_id = student.get('studentId')
-            
-            total_lectures_q = db.collection("attendance").where("studentId", "==", student_id).stream()
-            present_lectures_q = db.collection("attendance").where("studentId", "==", student_id).where("status", "==", "Present").stream()
-            
-            total_count = sum(1 for _ in total_lectures_q)
-            present_count = sum(1 for _ in present_lectures_q)
-            
-            percentage = (present_count / total_count * 100) if total_count > 0 else 100
-            student['attendancePercentage'] = round(percentage, 2)
-            student['atRisk'] = percentage < 75
-            student['todayStatus'] = "Present" if student_id in present_students else "Absent"
-            final_student_list.append(student)
-
         return jsonify({
             "success": True,
             "liveLecture": live_lecture,
-            "students": final_student_list
+            "students": build_live_roster(live_lecture, now.strftime("%Y-%m-%d"))
         }), 200
 
     except Exception as e:
         logger.error(f"Error getting live lecture data: {e}", exc_info=True)
         return jsonify({"success": False, "error": "An internal server error occurred."}), 500
 
+def format_sse(event, data):
+    """Encodes one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@teacher_bp.route("/live-lecture/stream", methods=["GET"])
+@teacher_login_required
+def stream_live_lecture():
+    """
+    Server-sent events for the teacher's live lecture: one 'snapshot' with the
+    full roster, then an 'attendance' delta for each student who marks
+    attendance, and 'lecture-ended' when the lecture is over. Marks made in
+    this process arrive through the event bus at once; marks made in other
+    server processes are picked up every SSE_CATCH_UP_SECONDS.
+    """
+    teacher_id = session['user_id']
+    now = datetime.now()
+    today_date_str = now.strftime("%Y-%m-%d")
+    subscription = None
+    try:
+        live_lecture = find_live_lecture(teacher_id, now)
+        # Subscribe before reading the roster so no attendance is missed in between
+        subscription = event_bus.subscribe(lecture_channel(live_lecture["id"])) if live_lecture else None
+        snapshot = {"success": True, "message": "No live lecture right now."}
+        if live_lecture:
+            snapshot = {"success": True, "liveLecture": live_lecture, "students": build_live_roster(live_lecture, today_date_str)}
+    except Exception as e:
+        logger.error(f"Error starting live lecture stream: {e}", exc_info=True)
+        if subscription:
+            event_bus.unsubscribe(subscription)
+        return jsonify({"success": False, "error": "An internal server error occurred."}), 500
+
+    def generate():
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n"
+            yield format_sse('snapshot', snapshot)
+            if not subscription:
+                return
+            end_hour, end_minute = map(int, live_lecture["endTime"].split(':'))
+            lecture_end = now.replace(hour=end_hour, minute=end_minute, second=59, microsecond=0)
+            present = {s['studentId'] for s in snapshot["students"] if s.get('todayStatus') == "Present"}
+            known_count = len(present)
+            last_sent = time.monotonic()
+            # On a deadline, not when the bus goes quiet: during the class-start
+            # rush this process's own marks never stop arriving
+            next_catch_up = last_sent + SSE_CATCH_UP_SECONDS
+            while datetime.now() <= lecture_end:
+                event = subscription.get(timeout=max(next_catch_up - time.monotonic(), 0))
+                events = [(event, True)] if event is not None else []
+                if time.monotonic() >= next_catch_up:
+                    next_catch_up = time.monotonic() + SSE_CATCH_UP_SECONDS
+                    try:
+                        known_count, caught_up = catch_up_attendance(live_lecture["id"], today_date_str, present, known_count)
+                        events += [(event, False) for event in caught_up]
+                    except Exception as e:
+                        logger.warning(f"Could not catch up on attendance for {live_lecture['id']}: {e}")
+                for event, from_bus in events:
+                    if event.get("date") != today_date_str or event.get("studentId") in present:
+                        continue
+                    present.add(event["studentId"])
+                    if from_bus:
+                        known_count += 1  # Published after its record was written
+                    event = dict(event)  # Shared with other subscribers
+                    try:
+                        event.update(student_attendance_stats(event["studentId"]))
+                    except Exception as e:
+                        logger.warning(f"Could not refresh stats for {event.get('studentId')}: {e}")
+                    last_sent = time.monotonic()
+                    yield format_sse('attendance', event)
+                if time.monotonic() - last_sent >= SSE_KEEPALIVE_SECONDS:
+                    last_sent = time.monotonic()
+                    yield ": keep-alive\n\n"
+            yield format_sse('lecture-ended', {"lectureId": live_lecture["id"]})
+        finally:
+            if subscription:
+                event_bus.unsubscribe(subscription)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 # --------------------------------------------------------------------------
 # 3. Visual Dashboards
 # --------------------------------------------------------------------------
@@ -209,13 +306,14 @@ def get_weekly_attendance_trend():
              return jsonify({"success": True, "trend": {}, "message": "No lectures found."}), 200
 
         today = datetime.now()
-        start_of_week = today - timedelta(days=today.weekday())
+        # From Monday midnight, so Monday's records (dated at midnight) count
+        start_of_week = (today - timedelta(days=today.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
         
         trend = {day: 0 for day in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]}
         
-        attendance_ref = db.collection("attendance").where("lectureId", "in", lecture_ids).stream()
+        attendance_queries = chunked_in(db.collection("attendance"), "lectureId", lecture_ids)
         
-        for record in attendance_ref:
+        for record in (record for query in attendance_queries for record in query.stream()):
             att_data = record.to_dict()
             att_date_str = att_data.get("date")
             if att_date_str:
@@ -251,11 +349,10 @@ def get_branch_attendance_comparison():
                 branch_stats[branch_name] = 0
                 continue
 
-            total_q = db.collection("attendance").where("lectureId", "in", lecture_ids).stream()
-            present_q = db.collection("attendance").where("lectureId", "in", lecture_ids).where("status", "==", "Present").stream()
-            
-            total_count = sum(1 for _ in total_q)
-            present_count = sum(1 for _ in present_q)
+            total_count = present_count = 0
+            for query in chunked_in(db.collection("attendance"), "lectureId", lecture_ids):
+                total_count += query.count().get()[0][0].value
+                present_count += query.where("status", "==", "Present").count().get()[0][0].value
 
             percentage = (present_count / total_count * 100) if total_count > 0 else 0
             branch_stats[branch_name] = round(percentage, 2)
@@ -297,16 +394,16 @@ def get_editable_attendance():
             return jsonify({"success": True, "attendance": []}), 200
         
         # Get attendance records
-        attendance_ref = db.collection("attendance") \
-            .where("lectureId", "in", lecture_ids) \
+        in_range = db.collection("attendance") \
             .where("date", ">=", start_date) \
-            .where("date", "<=", end_date).stream()
+            .where("date", "<=", end_date)
         
         attendance_list = []
-        for record in attendance_ref:
-            record_data = record.to_dict()
-            record_data['id'] = record.id
-            attendance_list.append(record_data)
+        for query in chunked_in(in_range, "lectureId", lecture_ids):
+            for record in query.stream():
+                record_data = record.to_dict()
+                record_data['id'] = record.id
+                attendance_list.append(record_data)
         
         return jsonify({"success": True, "attendance": attendance_list}), 200
         
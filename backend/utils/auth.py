@@ -1 +1,79 @@
+"""
+Authenticated principal for the logged-in user.
 
+The profile fields routes need on every request (studentId, branch, year,
+division, role, name) are read from the user document once at login and kept
+in the signed session cookie. Admin writes to a user bump that user's
+version in the shared cache versions, which reach every server process within
+CACHE_SYNC_SECONDS. The cached copy is also refreshed after a TTL, which
+covers edits made outside the app (e.g. in the Firebase console).
+"""
+import logging
+import time
+
+from flask import session
+
+from backend.utils.shared_versions import shared_versions
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_FIELDS = ('studentId', 'branchId', 'year', 'division', 'role', 'name')
+PRINCIPAL_TTL_SECONDS = 600
+
+
+class Principal:
+    """Read-only view of the session user's profile."""
+    __slots__ = ('user_id',) + PRINCIPAL_FIELDS
+
+    def __init__(self, user_id, fields):
+        self.user_id = user_id
+        for field in PRINCIPAL_FIELDS:
+            setattr(self, field, fields.get(field))
+
+
+def _namespace(user_id):
+    return f"principal:{user_id}"
+
+
+def principal_version(user_id):
+    # A list, as it comes back from the session cookie
+    return list(shared_versions.versions([_namespace(user_id)])[0])
+
+
+def invalidate_principal(user_id):
+    """Call after writing a user document so sessions reload the profile, in every server process."""
+    shared_versions.bump(_namespace(user_id))
+
+
+def store_principal(user_id, user_data):
+    """Caches the profile fields of `user_data` in the session and returns the Principal."""
+    fields = {field: user_data.get(field) for field in PRINCIPAL_FIELDS}
+    session['principal'] = {
+        'uid': user_id,
+        'version': principal_version(user_id),
+        'cachedAt': time.time(),
+        'fields': fields
+    }
+    return Principal(user_id, fields)
+
+
+def current_principal(firestore_db):
+    """
+    The session user's Principal, reading the user document only when the
+    cached copy is missing, stale or invalidated. None if the user no longer
+    exists.
+    """
+    user_id = session.get('user_id')
+    if not user_id:
+        return None
+    cached = session.get('principal')
+    if (cached and cached.get('uid') == user_id
+            and cached.get('version') == principal_version(user_id)
+            and time.time() - cached.get('cachedAt', 0) < PRINCIPAL_TTL_SECONDS):
+        return Principal(user_id, cached['fields'])
+
+    user_doc = firestore_db.collection('users').document(user_id).get()
+    if not user_doc.exists:
+        session.pop('principal', None)
+        return None
+    return store_principal(user_id, user_doc.to_dict())
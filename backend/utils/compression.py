@@ -0,0 +1,75 @@
+"""
+Response compression.
+
+Picks brotli (when the optional 'brotli' package is installed) or gzip from
+the request's Accept-Encoding and compresses buffered responses such as JSON
+lists. Streamed responses (server-sent events, files sent by Flask) are left
+alone; static assets are compressed once and cached by static_assets.
+"""
+import gzip
+import logging
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/javascript', 'text/javascript',
+    'text/css', 'text/html', 'text/plain', 'image/svg+xml'
+}
+
+
+def negotiate_encoding(accept_encodings):
+    """'br', 'gzip' or None for a werkzeug Accept-Encoding header."""
+    if brotli is not None and accept_encodings.quality('br') > 0:
+        return 'br'
+    if accept_encodings.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _weaken_etag(response):
+    """Compressed bytes differ from the original, so a strong ETag must become weak."""
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def compress_response(response):
+    """after_request hook: compresses the body in place when worthwhile."""
+    response.vary.add('Accept-Encoding')
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    _weaken_etag(response)
+    return response
+
+
+def init_compression(flask_app):
+    flask_app.after_request(compress_response)
+    logger.info(f"Response compression enabled ({'brotli, ' if brotli else ''}gzip).")
@@ -1 +1,65 @@
+"""
+Datastore helpers shared by the route modules.
+"""
+import logging
+import threading
+import time
 
+from backend.utils.shared_versions import shared_versions
+
+logger = logging.getLogger(__name__)
+
+# Firestore accepts at most 30 values in one 'in' filter
+MAX_IN_VALUES = 30
+
+
+def chunked_in(query, field, values):
+    """`query` filtered by `field in values`, as one query per 30 values."""
+    return [query.where(field, 'in', values[i:i + MAX_IN_VALUES]) for i in range(0, len(values), MAX_IN_VALUES)]
+
+
+class ReferenceCache:
+    """
+    Short-lived in-memory copies of small, rarely edited reference collections
+    (authorised locations, campus WiFi networks, teacher devices) that are read
+    on every attendance attempt.
+    """
+
+    # name -> function(db) returning a list of plain dicts
+    LOADERS = {
+        'locations': lambda db: [doc.to_dict() for doc in db.collection('locations').stream()],
+        'wifi_networks': lambda db: [doc.to_dict() for doc in db.collection('wifi_networks').stream()],
+        'teachers': lambda db: [{**doc.to_dict(), 'id': doc.id}
+                                for doc in db.collection('users').where('role', '==', 'Teacher').stream()],
+    }
+
+    def __init__(self, ttl_seconds=300):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, firestore_db, name):
+        """Returns the cached collection, loading it if missing or expired."""
+        entry = self._entries.get(name)
+        if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+            return entry[1]
+        value = self.LOADERS[name](firestore_db)
+        with self._lock:
+            self._entries[name] = (time.monotonic(), value)
+        return value
+
+    def prime(self, firestore_db):
+        """Loads every reference collection up front."""
+        for name in self.LOADERS:
+            self.get(firestore_db, name)
+
+    def invalidate(self, *names):
+        """Drops the named entries (all entries if none are given) after an admin write."""
+        with self._lock:
+            for name in names or list(self._entries):
+                self._entries.pop(name, None)
+
+
+reference_cache = ReferenceCache()
+# Teacher devices change with the users they belong to, in any server process
+shared_versions.subscribe('users', lambda: reference_cache.invalidate('teachers'))
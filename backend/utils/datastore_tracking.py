@@ -0,0 +1,336 @@
+"""
+Read/write accounting for the Firestore client.
+
+TrackedClient wraps the client handed to the route modules. It counts the
+documents each request reads and writes, and records the shape of every
+query: collection, filtered fields and operators, and ordering. Values are
+not recorded. After each request:
+
+- the read count is checked against the route's budget (DATASTORE_READ_BUDGET,
+  or @read_budget(n) on the view). Over budget logs a warning, or raises
+  ReadBudgetExceeded when DATASTORE_BUDGET_STRICT is set (as in tests);
+- a query shape run N_PLUS_ONE_THRESHOLD or more times in one request is
+  logged as a likely N+1 loop.
+
+Shapes are also aggregated per process for /api/system/query-shapes, which
+lists the ones that need a composite index in firestore.indexes.json form.
+Only calls made through the wrapper are counted; references taken from a
+snapshot (doc.reference) are the raw client's.
+"""
+import logging
+import threading
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_READ_BUDGET = 500
+N_PLUS_ONE_THRESHOLD = 10
+EQUALITY_OPERATORS = {'==', 'in', 'array-contains', 'array-contains-any'}
+
+
+class ReadBudgetExceeded(RuntimeError):
+    pass
+
+
+def read_budget(max_reads):
+    """Sets the per-request document read budget of a view."""
+    def decorator(view):
+        view.read_budget = max_reads
+        return view
+    return decorator
+
+
+# --------------------------------------------------------------------------
+# Query shapes
+# --------------------------------------------------------------------------
+def needs_composite_index(filters, orders):
+    """
+    Firestore serves equality-only queries by merging single-field indexes.
+    A composite index is needed once a range filter or an ordering is
+    combined with a condition on another field.
+    """
+    fields = {field for field, _ in filters} | {field for field, _ in orders}
+    if len(fields) <= 1:
+        return False
+    return bool(orders) or any(op not in EQUALITY_OPERATORS for _, op in filters)
+
+
+def describe_shape(shape):
+    collection, filters, orders = shape
+    text = collection
+    if filters:
+        text += ' WHERE ' + ' AND '.join(f'{field} {op}' for field, op in filters)
+    if orders:
+        text += ' ORDER BY ' + ', '.join(f'{field} {direction}' for field, direction in orders)
+    return text
+
+
+def index_definition(shape):
+    """The firestore.indexes.json entry for a shape: equality fields first, then range and order fields."""
+    collection, filters, orders = shape
+    fields, seen = [], set()
+    ranked = sorted(filters, key=lambda f: f[1] not in EQUALITY_OPERATORS)
+    for field, op in ranked:
+        if field in seen:
+            continue
+        seen.add(field)
+        if op.startswith('array-contains'):
+            fields.append({'fieldPath': field, 'arrayConfig': 'CONTAINS'})
+        else:
+            direction = next((d for f, d in orders if f == field), 'ASCENDING')
+            fields.append({'fieldPath': field, 'order': direction})
+    for field, direction in orders:
+        if field not in seen:
+            seen.add(field)
+            fields.append({'fieldPath': field, 'order': direction})
+    return {'collectionGroup': collection.rsplit('/', 1)[-1], 'queryScope': 'COLLECTION', 'fields': fields}
+
+
+class QueryShapeRegistry:
+    """Process-wide totals per query shape."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shapes = {}
+
+    def record(self, shape, documents, route):
+        with self._lock:
+            entry = self._shapes.get(shape)
+            if entry is None:
+                entry = self._shapes[shape] = {'executions': 0, 'documents': 0, 'maxDocuments': 0, 'routes': set()}
+            entry['executions'] += 1
+            entry['documents'] += documents
+            entry['maxDocuments'] = max(entry['maxDocuments'], documents)
+            if route:
+                entry['routes'].add(route)
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+
+    def report(self):
+        with self._lock:
+            items = [(shape, dict(entry, routes=sorted(entry['routes']))) for shape, entry in self._shapes.items()]
+        shapes, indexes = [], []
+        for shape, entry in sorted(items, key=lambda item: -item[1]['documents']):
+            composite = needs_composite_index(shape[1], shape[2])
+            shapes.append({'query': describe_shape(shape), 'needsCompositeIndex': composite, **entry})
+            if composite:
+                indexes.append(index_definition(shape))
+        return {'shapes': shapes, 'indexes': indexes}
+
+
+query_shapes = QueryShapeRegistry()
+
+
+# --------------------------------------------------------------------------
+# Per-request accounting
+# --------------------------------------------------------------------------
+class RequestUsage:
+    __slots__ = ('reads', 'writes', 'executions')
+
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        self.executions = Counter()
+
+
+def request_usage():
+    """The current request's RequestUsage, or None outside a request."""
+    if not has_request_context():
+        return None
+    usage = g.get('datastore_usage')
+    if usage is None:
+        usage = g.datastore_usage = RequestUsage()
+    return usage
+
+
+def _record_read(shape, documents):
+    usage = request_usage()
+    route = None
+    if usage is not None:
+        usage.reads += documents
+        usage.executions[shape] += 1
+        route = request.url_rule.rule if request.url_rule else None
+    query_shapes.record(shape, documents, route)
+
+
+def _record_writes(count=1):
+    usage = request_usage()
+    if usage is not None:
+        usage.writes += count
+
+
+def check_request_usage(response):
+    """after_request hook: enforces the read budget and reports N+1 patterns."""
+    # Popped so the error response of a strict failure isn't checked again
+    usage = g.pop('datastore_usage', None)
+    if usage is None:
+        return response
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'read_budget', current_app.config.get('DATASTORE_READ_BUDGET', DEFAULT_READ_BUDGET))
+
+    for shape, executions in usage.executions.items():
+        if executions >= N_PLUS_ONE_THRESHOLD:
+            logger.warning(f"Possible N+1 in {request.endpoint}: '{describe_shape(shape)}' ran {executions} times")
+
+    if usage.reads > budget:
+        message = f"{request.endpoint} read {usage.reads} documents (budget {budget}, {usage.writes} writes)"
+        if current_app.config.get('DATASTORE_BUDGET_STRICT'):
+            raise ReadBudgetExceeded(message)
+        logger.warning(f"Read budget exceeded: {message}")
+    return response
+
+
+def init_datastore_tracking(flask_app):
+    flask_app.after_request(check_request_usage)
+
+
+# --------------------------------------------------------------------------
+# Client wrappers
+# --------------------------------------------------------------------------
+def _filter_fields(args, kwargs):
+    """(field, op) pairs of a where() call, positional or filter= style."""
+    if len(args) >= 2:
+        return [(args[0], args[1])]
+    condition = kwargs.get('filter')
+    if condition is None:
+        return [('?', '?')]
+    if hasattr(condition, 'filters'):  # And/Or composite filter
+        return [pair for sub in condition.filters for pair in _filter_fields((), {'filter': sub})]
+    return [(getattr(condition, 'field_path', '?'), getattr(condition, 'op_string', '?'))]
+
+
+class TrackedQuery:
+    def __init__(self, raw, path, filters=(), orders=()):
+        self._raw = raw
+        self._path = path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+
+    def _derive(self, raw, filters=(), orders=()):
+        return TrackedQuery(raw, self._path, self._filters + tuple(filters), self._orders + tuple(orders))
+
+    def where(self, *args, **kwargs):
+        return self._derive(self._raw.where(*args, **kwargs), filters=_filter_fields(args, kwargs))
+
+    def order_by(self, field_path, direction='ASCENDING', **kwargs):
+        raw = self._raw.order_by(field_path, direction=direction, **kwargs)
+        return self._derive(raw, orders=[(field_path, str(direction).upper())])
+
+    def limit(self, count):
+        return self._derive(self._raw.limit(count))
+
+    def offset(self, count):
+        return self._derive(self._raw.offset(count))
+
+    def select(self, field_paths):
+        return self._derive(self._raw.select(field_paths))
+
+    def start_after(self, document_fields):
+        return self._derive(self._raw.start_after(document_fields))
+
+    def stream(self, *args, **kwargs):
+        shape = (self._path, self._filters, self._orders)
+        documents = 0
+        try:
+            for snapshot in self._raw.stream(*args, **kwargs):
+                documents += 1
+                yield snapshot
+        finally:
+            # Recorded once the caller finishes (or abandons) the stream
+            _record_read(shape, documents)
+
+    def get(self, *args, **kwargs):
+        return list(self.stream(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class TrackedCollection(TrackedQuery):
+    def document(self, *path):
+        raw = self._raw.document(*path)
+        return TrackedDocument(raw, self._path)
+
+    def add(self, document_data, *args, **kwargs):
+        _record_writes()
+        return self._raw.add(document_data, *args, **kwargs)
+
+
+class TrackedDocument:
+    def __init__(self, raw, collection_path):
+        self._raw = raw
+        self._collection_path = collection_path
+
+    def get(self, *args, **kwargs):
+        snapshot = self._raw.get(*args, **kwargs)
+        _record_read((self._collection_path, (('__name__', '=='),), ()), 1)
+        return snapshot
+
+    def set(self, *args, **kwargs):
+        _record_writes()
+        return self._raw.set(*args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        _record_writes()
+        return self._raw.update(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        _record_writes()
+        return self._raw.delete(*args, **kwargs)
+
+    def collection(self, collection_id):
+        return TrackedCollection(self._raw.collection(collection_id), f"{self._collection_path}/{collection_id}")
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+def _unwrap(reference):
+    return reference._raw if isinstance(reference, TrackedDocument) else reference
+
+
+class TrackedBatch:
+    def __init__(self, raw):
+        self._raw = raw
+        self._pending = 0
+
+    def set(self, reference, *args, **kwargs):
+        self._pending += 1
+        return self._raw.set(_unwrap(reference), *args, **kwargs)
+
+    def update(self, reference, *args, **kwargs):
+        self._pending += 1
+        return self._raw.update(_unwrap(reference), *args, **kwargs)
+
+    def delete(self, reference, *args, **kwargs):
+        self._pending += 1
+        return self._raw.delete(_unwrap(reference), *args, **kwargs)
+
+    def commit(self, *args, **kwargs):
+        result = self._raw.commit(*args, **kwargs)
+        _record_writes(self._pending)
+        self._pending = 0
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class TrackedClient:
+    """Drop-in wrapper for a Firestore client; see the module docstring."""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def collection(self, collection_id):
+        return TrackedCollection(self._raw.collection(collection_id), collection_id)
+
+    def batch(self):
+        return TrackedBatch(self._raw.batch())
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
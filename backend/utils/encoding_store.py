@@ -0,0 +1,138 @@
+"""
+On-disk face encoding matrix shared by every worker process.
+
+The encodings live in a float32 .npy file that readers open with mmap, so all
+processes on a machine share one page-cache copy instead of each holding its
+own. A small JSON manifest maps rows to face_encodings document ids and names
+the current matrix file. Writers produce a new matrix file and then atomically
+replace the manifest, so readers always see a complete snapshot.
+"""
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from backend.utils.lazy_import import lazy_module
+
+np = lazy_module('numpy')
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = os.getenv(
+    'FACE_INDEX_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'face_index')
+)
+
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = 'write.lock'
+
+# A writer holding the lock longer than this is assumed to have crashed.
+STALE_LOCK_SECONDS = 30
+
+
+class EncodingStore:
+    """Memory-mapped encoding matrix plus its row -> document id index."""
+
+    def __init__(self, directory=DEFAULT_STORE_DIR):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+
+    def token(self):
+        """Cheap change marker from the manifest's stat, or None if nothing was written yet."""
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        # os.replace gives the manifest a new inode, which catches coarse mtimes
+        return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+
+    def read(self):
+        """
+        Returns (manifest, matrix) for the current snapshot, with the matrix
+        mapped read-only, or None if the store is empty.
+        """
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        matrix_path = os.path.join(self.directory, manifest['matrix'])
+        if manifest['count'] == 0:
+            matrix = np.empty((0, manifest['dim']), dtype=np.float32)
+        else:
+            matrix = np.load(matrix_path, mmap_mode='r')
+        return manifest, matrix
+
+    def write(self, doc_ids, user_ids, student_ids, matrix, signature=None):
+        """
+        Publishes a new snapshot. Readers switch over when the manifest is replaced.
+        `signature` records the Firestore state the snapshot was built from;
+        None means unknown (an incremental update).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        version = time.time_ns()
+        matrix_name = f'encodings-{version}.npy'
+
+        np.save(os.path.join(self.directory, matrix_name), matrix)
+        manifest = {
+            "version": version,
+            "matrix": matrix_name,
+            "count": int(matrix.shape[0]),
+            "dim": int(matrix.shape[1]),
+            "docIds": list(doc_ids),
+            "userIds": list(user_ids),
+            "studentIds": list(student_ids),
+            "signature": signature
+        }
+        tmp_path = f'{self.manifest_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+        self._remove_old_matrices(keep=matrix_name)
+        logger.info(f"Encoding store updated: {manifest['count']} encodings (version {version}).")
+        return manifest
+
+    @contextmanager
+    def writer_lock(self, timeout=10):
+        """Cross-process lock so two workers enrolling at once don't drop each other's rows."""
+        os.makedirs(self.directory, exist_ok=True)
+        lock_path = os.path.join(self.directory, LOCK_NAME)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.stat(lock_path).st_mtime > STALE_LOCK_SECONDS:
+                        os.remove(lock_path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError("Timed out waiting for the encoding store lock")
+                time.sleep(0.01)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            try:
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+
+    def _remove_old_matrices(self, keep):
+        """Deletes superseded matrix files, keeping the newest previous one for readers mid-switch."""
+        old = sorted(name for name in os.listdir(self.directory)
+                     if name.startswith('encodings-') and name.endswith('.npy') and name != keep)
+        for name in old[:-1]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                # Still mapped by a reader on Windows; removed on a later write.
+                pass
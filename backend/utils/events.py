@@ -0,0 +1,75 @@
+"""
+In-process publish/subscribe bus used to push live updates (e.g. attendance
+marked in a lecture) to server-sent event streams.
+
+Events only reach subscribers in the same process; each subscriber gets its
+own bounded queue so a slow client can't hold up publishers.
+"""
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+def lecture_channel(lecture_id):
+    return f"lecture:{lecture_id}"
+
+
+class Subscription:
+    def __init__(self, channel):
+        self.channel = channel
+        self._queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def get(self, timeout=None):
+        """Next event, or None if nothing arrived within the timeout."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBus:
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+        if subscription.dropped:
+            logger.warning(f"Subscriber on {subscription.channel} dropped {subscription.dropped} events")
+
+    def publish(self, channel, event):
+        """Delivers an event to every current subscriber of the channel. Returns how many got it."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+        return len(subscribers)
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+
+event_bus = EventBus()
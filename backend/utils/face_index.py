@@ -0,0 +1,301 @@
+"""
+In-memory index of every enrolled face encoding.
+
+Used at enrollment time to stop the same face from being registered against
+more than one student account, and by the nightly job that re-checks the whole
+collection for near-duplicate pairs.
+"""
+import logging
+import threading
+
+from firebase_admin import firestore
+
+from backend.utils.encoding_store import EncodingStore
+from backend.utils.lazy_import import lazy_module
+
+np = lazy_module('numpy')
+
+logger = logging.getLogger(__name__)
+
+ENCODING_DIM = 128
+
+# face_recognition treats distances below 0.6 as "same person". Enrollment uses
+# a tighter bound so that only near-identical faces are flagged as duplicates.
+DUPLICATE_DISTANCE_THRESHOLD = 0.45
+
+# Rows per block for the all-pairs scan. 4096 x 4096 float32 distances is 64 MB.
+SCAN_BLOCK_SIZE = 4096
+
+# Reads of the collection before load() gives up on enrollments landing
+# meanwhile and reads it while holding the store's writer lock
+LOAD_ATTEMPTS = 3
+
+
+class FaceIndex:
+    """
+    Encodings held as one float32 matrix, one row per face_encodings document.
+
+    When backed by an EncodingStore the matrix is a read-only memory map of the
+    shared store file, and changes published by other worker processes are
+    picked up on the next lookup.
+    """
+
+    def __init__(self, store=None):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._store = store
+        self._store_token = None
+        self._signature = None
+        self._doc_ids = []
+        self._user_ids = []
+        self._student_ids = []
+        self._rows = {}
+        self._matrix = None  # Created on first load so importing the index stays cheap
+
+    def __len__(self):
+        return len(self._doc_ids)
+
+    def load(self, firestore_db):
+        """(Re)builds the index from the face_encodings collection."""
+        if self._store is None:
+            rows = _read_encodings(firestore_db)
+            with self._lock:
+                self._publish(*rows)
+            logger.info(f"Face index loaded with {len(rows[0])} encodings.")
+            return
+
+        for _ in range(LOAD_ATTEMPTS):
+            # Taken before streaming, so writes made meanwhile show up as a mismatch
+            signature = collection_signature(firestore_db)
+            rows = _read_encodings(firestore_db)
+            with self._lock, self._store.writer_lock():
+                # An enrollment through another worker may have landed (and been
+                # upserted into the store) since the read; publishing would drop it
+                if collection_signature(firestore_db) == signature:
+                    self._publish(*rows, signature)
+                    break
+        else:
+            # Enrollments keep landing: read while holding the lock, so none can
+            with self._lock, self._store.writer_lock():
+                signature = collection_signature(firestore_db)
+                rows = _read_encodings(firestore_db)
+                self._publish(*rows, signature)
+        logger.info(f"Face index loaded with {len(rows[0])} encodings.")
+
+    def ensure_loaded(self, firestore_db):
+        """
+        Loads the index on first use. An existing shared store is mapped
+        instead of re-reading every encoding, but only if it was built from
+        the collection as it is now: deletes and edits made outside upsert()
+        (user deletion, clear_db, the console) would otherwise linger in it.
+        """
+        if self._loaded:
+            self._sync_from_store()
+            return
+        if self._store is not None and self._store.token() is not None:
+            with self._lock:
+                self._remap()
+            if self._signature is not None and self._signature == collection_signature(firestore_db):
+                logger.info(f"Face index mapped from shared store with {len(self)} encodings.")
+                return
+            logger.info("Shared face index store is out of date with Firestore; rebuilding.")
+        self.load(firestore_db)
+
+    def upsert(self, doc_id, user_id, student_id, encoding, firestore_db=None):
+        """
+        Adds or replaces the encoding stored under a face_encodings document id,
+        after the document has been written. Given the datastore, the store
+        keeps a signature that still matches Firestore, so the next cold start
+        can map it instead of rebuilding.
+        """
+        vector = np.asarray(encoding, dtype=np.float32).reshape(1, ENCODING_DIM)
+        with self._lock:
+            if self._store is not None:
+                with self._store.writer_lock():
+                    # Start from the latest snapshot so rows added by other workers survive
+                    if self._store.token() != self._store_token:
+                        self._remap()
+                    signature = self._signature_after_upsert(firestore_db, doc_id)
+                    self._apply_upsert(doc_id, user_id, student_id, vector, signature)
+            else:
+                self._apply_upsert(doc_id, user_id, student_id, vector)
+
+    def _signature_after_upsert(self, firestore_db, doc_id):
+        """
+        The collection's signature now, if the store matched Firestore before
+        this upsert and the upsert is the only change since. None otherwise.
+        """
+        if firestore_db is None or self._signature is None:
+            return None
+        expected_count = self._signature['count'] + (0 if doc_id in self._rows else 1)
+        signature = collection_signature(firestore_db)
+        # Another worker's enrollment not yet in the store would be hidden by its signature
+        return signature if signature['count'] == expected_count else None
+
+    def _apply_upsert(self, doc_id, user_id, student_id, vector, signature=None):
+        doc_ids, user_ids, student_ids = list(self._doc_ids), list(self._user_ids), list(self._student_ids)
+        row = self._rows.get(doc_id)
+        if row is None:
+            doc_ids.append(doc_id)
+            user_ids.append(user_id)
+            student_ids.append(student_id)
+            matrix = vector if self._matrix is None else np.vstack([self._matrix, vector])
+        else:
+            matrix = np.array(self._matrix, dtype=np.float32)
+            matrix[row] = vector
+            user_ids[row] = user_id
+            student_ids[row] = student_id
+        self._publish(doc_ids, user_ids, student_ids, matrix, signature)
+
+    def _publish(self, doc_ids, user_ids, student_ids, matrix, signature=None):
+        """Installs a new snapshot, writing it through to the shared store if there is one."""
+        if self._store is not None:
+            self._store.write(doc_ids, user_ids, student_ids, matrix, signature)
+            # Swap the private copy for the shared mapping so memory stays flat
+            self._remap()
+            return
+        self._set_rows(doc_ids, user_ids, student_ids, matrix)
+
+    def _remap(self):
+        token = self._store.token()
+        snapshot = self._store.read()
+        if snapshot is None:
+            return
+        manifest, matrix = snapshot
+        self._set_rows(manifest['docIds'], manifest['userIds'], manifest['studentIds'], matrix)
+        self._signature = manifest.get('signature')
+        self._store_token = token
+
+    def _sync_from_store(self):
+        if self._store is not None and self._store.token() != self._store_token:
+            with self._lock:
+                self._remap()
+
+    def _set_rows(self, doc_ids, user_ids, student_ids, matrix):
+        self._doc_ids = doc_ids
+        self._user_ids = user_ids
+        self._student_ids = student_ids
+        self._rows = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+        self._matrix = matrix
+        self._loaded = True
+
+    def search(self, encoding, threshold=DUPLICATE_DISTANCE_THRESHOLD, exclude_user_id=None):
+        """
+        1:N search of one encoding against every stored encoding.
+        Returns matches closer than `threshold`, nearest first.
+        """
+        self._sync_from_store()
+        with self._lock:
+            matrix = self._matrix
+            doc_ids, user_ids, student_ids = self._doc_ids, self._user_ids, self._student_ids
+        if matrix is None or not len(matrix):
+            return []
+
+        query = np.asarray(encoding, dtype=np.float32).reshape(ENCODING_DIM)
+        distances = np.linalg.norm(matrix - query, axis=1)
+        candidates = np.flatnonzero(distances < threshold)
+
+        matches = []
+        for row in candidates[np.argsort(distances[candidates])]:
+            if exclude_user_id is not None and user_ids[row] == exclude_user_id:
+                continue
+            matches.append({
+                "docId": doc_ids[row],
+                "userId": user_ids[row],
+                "studentId": student_ids[row],
+                "distance": float(distances[row])
+            })
+        return matches
+
+    def scan_all_pairs(self, threshold=DUPLICATE_DISTANCE_THRESHOLD, block_size=SCAN_BLOCK_SIZE):
+        """
+        Finds every pair of encodings from different users closer than `threshold`.
+
+        Distances are computed block by block as |a|^2 + |b|^2 - 2ab so each
+        block is a single matrix multiply and memory stays bounded.
+        """
+        self._sync_from_store()
+        with self._lock:
+            matrix = self._matrix
+            doc_ids, user_ids, student_ids = self._doc_ids, self._user_ids, self._student_ids
+        if matrix is None:
+            return []
+
+        count = len(matrix)
+        squared_norms = np.einsum('ij,ij->i', matrix, matrix)
+        limit = threshold * threshold
+        pairs = []
+
+        for i in range(0, count, block_size):
+            block_a = matrix[i:i + block_size]
+            norms_a = squared_norms[i:i + block_size]
+            for j in range(i, count, block_size):
+                block_b = matrix[j:j + block_size]
+                norms_b = squared_norms[j:j + block_size]
+                squared = norms_a[:, None] + norms_b[None, :] - 2.0 * (block_a @ block_b.T)
+                hits = squared < limit
+                if i == j:
+                    hits = np.triu(hits, k=1)
+                for a, b in zip(*np.nonzero(hits)):
+                    row_a, row_b = i + a, j + b
+                    if user_ids[row_a] == user_ids[row_b]:
+                        continue
+                    pairs.append({
+                        "first": {"docId": doc_ids[row_a], "userId": user_ids[row_a], "studentId": student_ids[row_a]},
+                        "second": {"docId": doc_ids[row_b], "userId": user_ids[row_b], "studentId": student_ids[row_b]},
+                        "distance": float(np.sqrt(max(squared[a, b], 0.0)))
+                    })
+
+        pairs.sort(key=lambda pair: pair["distance"])
+        return pairs
+
+
+def _read_encodings(firestore_db):
+    """(doc_ids, user_ids, student_ids, matrix) of every valid face_encodings document."""
+    doc_ids, user_ids, student_ids, vectors = [], [], [], []
+    for doc in firestore_db.collection('face_encodings').stream():
+        data = doc.to_dict()
+        encoding = data.get('encoding')
+        if not encoding or len(encoding) != ENCODING_DIM:
+            continue
+        doc_ids.append(doc.id)
+        user_ids.append(data.get('userId'))
+        student_ids.append(data.get('studentId'))
+        vectors.append(encoding)
+    return doc_ids, user_ids, student_ids, np.asarray(vectors, dtype=np.float32).reshape(-1, ENCODING_DIM)
+
+
+def collection_signature(firestore_db):
+    """
+    Cheap fingerprint of the face_encodings collection: its document count
+    and newest createdAt, which every enrollment write sets. Costs two reads.
+    """
+    collection = firestore_db.collection('face_encodings')
+    count = collection.count().get()[0][0].value
+    latest = list(collection.order_by('createdAt', direction=firestore.Query.DESCENDING).limit(1).stream())
+    created_at = latest[0].to_dict().get('createdAt') if latest else None
+    return {"count": count, "latest": created_at.isoformat() if hasattr(created_at, 'isoformat') else None}
+
+
+# Shared by the admin and student enrollment routes. Backed by the on-disk
+# store so every worker process maps the same matrix.
+face_index = FaceIndex(store=EncodingStore())
+
+
+def run_duplicate_scan(firestore_db, threshold=DUPLICATE_DISTANCE_THRESHOLD):
+    """Nightly job: reloads the index from Firestore and records any duplicate pairs."""
+    face_index.load(firestore_db)
+    pairs = face_index.scan_all_pairs(threshold)
+    if pairs:
+        logger.warning(f"Duplicate face scan found {len(pairs)} suspicious pair(s) across {len(face_index)} encodings.")
+        firestore_db.collection('audit_logs').add({
+            "action": "FACE_DUPLICATE_SCAN",
+            "pairCount": len(pairs),
+            "pairs": pairs[:100],
+            "threshold": threshold,
+            "timestamp": firestore.SERVER_TIMESTAMP
+        })
+    else:
+        logger.info(f"Duplicate face scan found no duplicates across {len(face_index)} encodings.")
+    return pairs
+
@@ -0,0 +1,110 @@
+"""
+Shared face processing chain used by the student and admin face routes.
+
+Keeps decode -> detect -> encode identical between enrollment and
+verification (a burst of frames, or one frame on the legacy /verify-face
+route), and holds the cheap liveness heuristics applied to those frames. This module is the only way routes reach the CV
+stack, which is imported lazily on the first face request.
+"""
+import base64
+from io import BytesIO
+
+from backend.utils.lazy_import import lazy_module
+from backend.utils.timing import span
+
+cv2 = lazy_module('cv2')
+face_recognition = lazy_module('face_recognition')
+np = lazy_module('numpy')
+Image = lazy_module('PIL.Image')
+
+# Distance below which two encodings are treated as the same person.
+MATCH_THRESHOLD = 0.6
+
+# Liveness heuristics for a burst of frames.
+CROP_SIZE = 64
+MOTION_THRESHOLD = 2.5         # Mean absolute grey-level change between consecutive face crops
+BLINK_EAR_THRESHOLD = 0.21     # Eye aspect ratio below this counts as closed
+BLINK_EAR_DELTA = 0.05         # ...and it must differ this much from the most open frame
+
+
+def decode_image(data_url):
+    """Decodes a base64 data URL from the browser into a numpy image array."""
+    with span('decode'):
+        encoded = data_url.split(',', 1)[1] if ',' in data_url else data_url
+        image = Image.open(BytesIO(base64.b64decode(encoded)))
+        return np.array(image)
+
+
+def encode_faces(image_np, convert_to_bgr=True, model='hog', upsample=1):
+    """
+    Detects and encodes every face in a decoded frame.
+    Returns (image, face_locations, face_encodings). `model` and `upsample`
+    are passed to the detector; the routes use its defaults.
+    """
+    # Student routes convert RGB to BGR (OpenCV format), as verification has always done
+    image = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR) if convert_to_bgr else image_np
+    with span('detect'):
+        face_locations = face_recognition.face_locations(image, number_of_times_to_upsample=upsample, model=model)
+    with span('encode'):
+        face_encodings = face_recognition.face_encodings(image, face_locations)
+    return image, face_locations, face_encodings
+
+
+def face_distance(stored_encoding, encoding):
+    """Distance between a stored encoding (list) and a fresh one."""
+    return float(face_recognition.face_distance([np.array(stored_encoding)], encoding)[0])
+
+
+def eye_aspect_ratio(eye):
+    """EAR of a six-point eye landmark contour: small when the eye is closed."""
+    points = np.asarray(eye, dtype=np.float32)
+    vertical = np.linalg.norm(points[1] - points[5]) + np.linalg.norm(points[2] - points[4])
+    horizontal = np.linalg.norm(points[0] - points[3])
+    return float(vertical / (2.0 * horizontal)) if horizontal else 0.0
+
+
+def analyze_burst_frame(data_url):
+    """Runs the full chain on one burst frame and extracts what liveness needs."""
+    image_np = decode_image(data_url)
+    image, face_locations, face_encodings = encode_faces(image_np)
+    result = {"faces": len(face_encodings), "encoding": None, "crop": None, "ear": None}
+    if len(face_encodings) != 1:
+        return result
+
+    with span('landmarks'):
+        top, right, bottom, left = face_locations[0]
+        grey = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        crop = grey[max(top, 0):bottom, max(left, 0):right]
+        if crop.size:
+            result["crop"] = cv2.resize(crop, (CROP_SIZE, CROP_SIZE)).astype(np.float32)
+
+        landmarks = face_recognition.face_landmarks(image, face_locations)
+        if landmarks and 'left_eye' in landmarks[0] and 'right_eye' in landmarks[0]:
+            result["ear"] = (eye_aspect_ratio(landmarks[0]['left_eye']) + eye_aspect_ratio(landmarks[0]['right_eye'])) / 2.0
+
+    result["encoding"] = face_encodings[0]
+    return result
+
+
+def assess_liveness(frames):
+    """
+    Cheap liveness check over analysed burst frames (in capture order).
+
+    A printed photo or a replayed still shows almost no change between frames
+    and no blink, so either visible motion of the face region or a blink
+    (eye aspect ratio dipping and recovering) is required.
+    """
+    usable = [f for f in frames if f["encoding"] is not None]
+    crops = [f["crop"] for f in usable if f["crop"] is not None]
+    ears = [f["ear"] for f in usable if f["ear"] is not None]
+
+    motion_scores = [float(np.mean(np.abs(b - a))) for a, b in zip(crops, crops[1:])]
+    motion = max(motion_scores, default=0.0)
+    blink = bool(ears) and min(ears) < BLINK_EAR_THRESHOLD and max(ears) - min(ears) >= BLINK_EAR_DELTA
+
+    return {
+        "live": bool(blink or motion >= MOTION_THRESHOLD),
+        "blinkDetected": bool(blink),
+        "motionScore": round(motion, 3),
+        "minEyeAspectRatio": round(min(ears), 3) if ears else None
+    }
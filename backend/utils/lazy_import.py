@@ -0,0 +1,41 @@
+"""
+Deferred imports for the heavy computer-vision stack.
+
+face_recognition (dlib), cv2, numpy and PIL together take seconds to import.
+Modules that only need them inside request handlers bind a LazyModule instead,
+so importing the app, the admin/teacher routes, tests and scripts stays cheap
+and the cost is paid on first use (or by the startup warmup thread).
+"""
+import importlib
+import threading
+
+# Modules that must not be imported just by importing the application.
+HEAVY_MODULES = ('face_recognition', 'dlib', 'cv2', 'numpy', 'PIL')
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<LazyModule '{self._name}' ({state})>"
+
+
+def lazy_module(name):
+    """Returns a proxy for `name` that imports it on first use."""
+    return LazyModule(name)
@@ -0,0 +1,290 @@
+"""
+Per-route request metrics in Prometheus text format.
+
+Requests are labelled by their URL rule ('/api/student/mark-attendance'),
+not the concrete path, so the number of series stays fixed. Recording a
+request is a few dictionary updates under one lock.
+
+Each server process counts its own requests. Under gunicorn every worker
+also writes its counters to a shared directory (METRICS_DIR) every few
+seconds, and a scrape of any worker serves the sum of all of them. Counters
+of workers that have exited are folded into one archive file, so totals
+never go backwards when a worker is replaced.
+
+Durations are measured until the view returns, so for streamed responses
+(server-sent events) they cover only the time to the first byte.
+"""
+import bisect
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+METRICS_FLUSH_SECONDS = 5
+ARCHIVE_FILE = 'archived.json'
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'total', 'count')
+
+    def __init__(self):
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.buckets[bisect.bisect_left(DURATION_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{k}="{str(v)}"' for k, v in labels.items()) + '}'
+
+
+def _worker_file(directory, worker_id):
+    return os.path.join(directory, f'worker-{worker_id}.json')
+
+
+def _add_counters(totals, counters):
+    """Adds `counters` into `totals`; both map kind -> {key: value}."""
+    for kind, values in counters.items():
+        target = totals.setdefault(kind, {})
+        for key, value in values.items():
+            current = target.get(key)
+            if current is None:
+                target[key] = value
+            elif kind == 'durations':
+                buckets, total, count = current
+                target[key] = ([a + b for a, b in zip(buckets, value[0])], total + value[1], count + value[2])
+            else:
+                target[key] = current + value
+
+
+def _dump(path, snapshot):
+    """Writes the snapshot atomically, so readers never see half a file."""
+    rows = {kind: [[*key, value] for key, value in values.items()] for kind, values in snapshot['counters'].items()}
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump({**snapshot, 'counters': rows}, f)
+    os.replace(temp_path, path)
+
+
+def _load(path):
+    """The snapshot at `path`, or None if it is gone (its worker was archived meanwhile)."""
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    snapshot['counters'] = {kind: {tuple(row[:-1]): row[-1] for row in rows}
+                            for kind, rows in snapshot['counters'].items()}
+    return snapshot
+
+
+def archive_worker_metrics(directory, worker_id):
+    """Folds an exited worker's counters into the archive. Called by the gunicorn master."""
+    path = _worker_file(directory, worker_id)
+    snapshot = _load(path)
+    if snapshot is None:
+        return
+    archive_path = os.path.join(directory, ARCHIVE_FILE)
+    archive = _load(archive_path) or {'counters': {}}
+    _add_counters(archive['counters'], snapshot['counters'])
+    _dump(archive_path, {'counters': archive['counters']})
+    os.remove(path)
+
+
+def clear_shared_metrics(directory):
+    """Drops counters left by a previous server run."""
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        os.remove(path)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._statuses = {}
+        self._request_bytes = {}
+        self._response_bytes = {}
+        self._in_flight = 0
+        self._started = time.time()
+        self._shared_dir = None
+        self._worker_id = None
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self._statuses.clear()
+            self._request_bytes.clear()
+            self._response_bytes.clear()
+
+    def request_started(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def request_finished(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def observe(self, method, route, status, seconds, request_bytes, response_bytes):
+        key = (method, route)
+        with self._lock:
+            histogram = self._durations.get(key)
+            if histogram is None:
+                histogram = self._durations[key] = _Histogram()
+            histogram.observe(seconds)
+            status_key = (method, route, status)
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+            self._request_bytes[key] = self._request_bytes.get(key, 0) + request_bytes
+            if response_bytes is not None:
+                self._response_bytes[key] = self._response_bytes.get(key, 0) + response_bytes
+
+    def _snapshot(self):
+        with self._lock:
+            return {
+                'started': self._started,
+                'inFlight': self._in_flight,
+                'counters': {
+                    'durations': {key: (list(h.buckets), h.total, h.count) for key, h in self._durations.items()},
+                    'statuses': dict(self._statuses),
+                    'request_bytes': dict(self._request_bytes),
+                    'response_bytes': dict(self._response_bytes)
+                }
+            }
+
+    def share(self, directory, worker_id, flush_seconds=METRICS_FLUSH_SECONDS):
+        """
+        Publishes this process's counters to `directory` every flush_seconds
+        (only on flush() if None), and makes render() serve the sum of every
+        process sharing the directory.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._shared_dir, self._worker_id = directory, worker_id
+        self._started = time.time()  # The module may have been imported before the fork
+        if flush_seconds is None:
+            return
+
+        def flush_loop():
+            while True:
+                time.sleep(flush_seconds)
+                self.flush()
+
+        threading.Thread(target=flush_loop, name='metrics-flush', daemon=True).start()
+
+    def flush(self):
+        """Writes this process's counters to the shared directory, if any."""
+        if self._shared_dir is None:
+            return
+        try:
+            _dump(_worker_file(self._shared_dir, self._worker_id), self._snapshot())
+        except OSError as e:
+            logger.warning(f"Could not publish request metrics: {e}")
+
+    def _all_processes(self):
+        """(counters, in-flight requests, {worker: start time}) summed over the shared directory."""
+        own = self._snapshot()
+        counters, in_flight = own['counters'], own['inFlight']
+        started = {self._worker_id or os.getpid(): own['started']}
+        if self._shared_dir is None:
+            return counters, in_flight, started
+        for path in sorted(glob.glob(os.path.join(self._shared_dir, '*.json'))):
+            if path == _worker_file(self._shared_dir, self._worker_id):
+                continue  # Our own counters are read live above
+            snapshot = _load(path)
+            if snapshot is None:
+                continue
+            _add_counters(counters, snapshot['counters'])
+            if 'started' in snapshot:  # Not the archive
+                worker_id = os.path.basename(path)[len('worker-'):-len('.json')]
+                started[worker_id] = snapshot['started']
+                in_flight += snapshot['inFlight']
+        return counters, in_flight, started
+
+    def render(self):
+        """The current counters, of every worker when shared, in Prometheus text exposition format."""
+        counters, in_flight, started = self._all_processes()
+        durations = counters['durations']
+        statuses = counters['statuses']
+        request_bytes = counters['request_bytes']
+        response_bytes = counters['response_bytes']
+
+        lines = [
+            '# HELP http_requests_total Requests handled, by route and status code.',
+            '# TYPE http_requests_total counter'
+        ]
+        for (method, route, status), count in sorted(statuses.items()):
+            lines.append(f'http_requests_total{_labels(method=method, route=route, status=status)} {count}')
+
+        lines += [
+            '# HELP http_request_duration_seconds Time spent in the view, by route.',
+            '# TYPE http_request_duration_seconds histogram'
+        ]
+        for (method, route), (buckets, total, count) in sorted(durations.items()):
+            cumulative = 0
+            for bound, in_bucket in zip(DURATION_BUCKETS + ('+Inf',), buckets):
+                cumulative += in_bucket
+                lines.append(f'http_request_duration_seconds_bucket{_labels(method=method, route=route, le=bound)} {cumulative}')
+            lines.append(f'http_request_duration_seconds_sum{_labels(method=method, route=route)} {total:.6f}')
+            lines.append(f'http_request_duration_seconds_count{_labels(method=method, route=route)} {count}')
+
+        for name, help_text, values in (
+                ('http_request_size_bytes_total', 'Request body bytes received, by route.', request_bytes),
+                ('http_response_size_bytes_total', 'Response body bytes sent (after compression), by route.', response_bytes)):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for (method, route), total in sorted(values.items()):
+                lines.append(f'{name}{_labels(method=method, route=route)} {total}')
+
+        lines += [
+            '# HELP http_requests_in_flight Requests currently being handled by the server processes.',
+            '# TYPE http_requests_in_flight gauge',
+            f'http_requests_in_flight {in_flight}',
+            '# HELP process_start_time_seconds Start time of each server process since the Unix epoch.',
+            '# TYPE process_start_time_seconds gauge'
+        ]
+        for worker_id, started_at in sorted(started.items(), key=lambda item: str(item[0])):
+            lines.append(f'process_start_time_seconds{_labels(pid=worker_id)} {started_at:.3f}')
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_in_flight = True
+    request_metrics.request_started()
+
+
+def _after_request(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        request_metrics.observe(request.method, route, response.status_code, time.perf_counter() - started,
+                                request.content_length or 0, response.content_length)
+    return response
+
+
+def _teardown_request(exc):
+    if g.pop('metrics_in_flight', False):
+        request_metrics.request_finished()
+
+
+def init_metrics(flask_app):
+    """
+    Registers the metrics hooks. Call before init_compression so that the
+    response sizes recorded are the compressed ones.
+    """
+    flask_app.before_request(_before_request)
+    flask_app.after_request(_after_request)
+    flask_app.teardown_request(_teardown_request)
@@ -0,0 +1,204 @@
+"""
+On-demand profiling of the running server process.
+
+- sample_stacks: a wall-clock stack sampler over every thread, using
+  sys._current_frames(). The result is in collapsed-stack format, one
+  'thread;outer;...;inner count' line per stack, which flamegraph.pl and
+  speedscope read directly.
+- RequestProfiler: for a time window, runs cProfile around each request this
+  process handles and merges the results into one pstats file.
+- memory_snapshot: the top allocation sites by size from tracemalloc,
+  optionally as growth over a window.
+
+Each capture blocks the calling request for its duration, and only one runs
+at a time per process.
+"""
+import cProfile
+import io
+import linecache
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from flask import g
+
+MAX_PROFILE_SECONDS = 60
+SAMPLE_INTERVAL_SECONDS = 0.005
+
+capture_lock = threading.Lock()
+
+
+# --------------------------------------------------------------------------
+# Stack sampler
+# --------------------------------------------------------------------------
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds, interval=SAMPLE_INTERVAL_SECONDS):
+    """Samples all other threads for `seconds`. Returns (Counter of collapsed stacks, sample rounds)."""
+    own_thread = threading.get_ident()
+    thread_names = {}
+    counts = Counter()
+    rounds = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            if thread_id not in thread_names:
+                thread_names.update((t.ident, t.name) for t in threading.enumerate())
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(thread_names.get(thread_id, f"thread-{thread_id}").replace(';', ':').replace(' ', '_'))
+            counts[';'.join(reversed(stack))] += 1
+        rounds += 1
+        time.sleep(interval)
+    return counts, rounds
+
+
+def collapsed_stacks(counts):
+    return ''.join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+# --------------------------------------------------------------------------
+# Per-request cProfile window
+# --------------------------------------------------------------------------
+class RequestProfiler:
+    """
+    cProfile only sees the thread that enabled it, so while a window is open
+    every request is profiled on its own thread and the stats are merged.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = None
+        self._active = False
+        self.requests = 0
+
+    def start(self):
+        with self._lock:
+            self._stats = None
+            self._active = True
+            self.requests = 0
+
+    def stop(self):
+        """Closes the window; returns the merged pstats.Stats, or None if nothing ran."""
+        with self._lock:
+            self._active = False
+            stats, self._stats = self._stats, None
+            return stats
+
+    def begin_request(self):
+        if not self._active:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile per interpreter
+            return None
+        return profile
+
+    def end_request(self, profile):
+        profile.disable()
+        with self._lock:
+            if not self._active:
+                return
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            self.requests += 1
+
+
+request_profiler = RequestProfiler()
+
+
+def pstats_bytes(stats):
+    """The stats in the binary format written by Stats.dump_stats (load with pstats.Stats(path))."""
+    return marshal.dumps(stats.stats)
+
+
+def pstats_text(stats, limit=60):
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+# --------------------------------------------------------------------------
+# tracemalloc
+# --------------------------------------------------------------------------
+def memory_snapshot(seconds=10, top=25, nframes=1):
+    """
+    Top allocation sites by line. With `seconds`, reports growth between two
+    snapshots taken that far apart. Starts tracemalloc if it isn't running
+    and stops it again afterwards, so allocations made before the call are
+    only visible when the server runs with PYTHONTRACEMALLOC set; without it
+    a zero-second snapshot would be empty and raises ValueError.
+    """
+    started_here = not tracemalloc.is_tracing()
+    if started_here and not seconds:
+        raise ValueError("A point-in-time snapshot needs tracemalloc running since startup (PYTHONTRACEMALLOC).")
+    if started_here:
+        tracemalloc.start(nframes)
+    try:
+        before = tracemalloc.take_snapshot() if seconds else None
+        if seconds:
+            time.sleep(seconds)
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+    snapshot = snapshot.filter_traces(filters)
+    if before is not None:
+        stats = snapshot.compare_to(before.filter_traces(filters), 'lineno')[:top]
+        entries = [{
+            "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "code": linecache.getline(stat.traceback[0].filename, stat.traceback[0].lineno).strip(),
+            "sizeKiB": round(stat.size / 1024, 1),
+            "sizeDiffKiB": round(stat.size_diff / 1024, 1),
+            "count": stat.count,
+            "countDiff": stat.count_diff
+        } for stat in stats]
+    else:
+        entries = [{
+            "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "code": linecache.getline(stat.traceback[0].filename, stat.traceback[0].lineno).strip(),
+            "sizeKiB": round(stat.size / 1024, 1),
+            "count": stat.count
+        } for stat in snapshot.statistics('lineno')[:top]]
+
+    return {
+        "tracingSinceStartup": not started_here,
+        "windowSeconds": seconds,
+        "tracedKiB": round(current / 1024, 1),
+        "peakKiB": round(peak / 1024, 1),
+        "top": entries
+    }
+
+
+def _before_request():
+    g.cprofile = request_profiler.begin_request()
+
+
+def _teardown_request(exc):
+    profile = g.pop('cprofile', None)
+    if profile is not None:
+        request_profiler.end_request(profile)
+
+
+def init_profiling(flask_app):
+    flask_app.before_request(_before_request)
+    flask_app.teardown_request(_teardown_request)
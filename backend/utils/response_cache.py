@@ -0,0 +1,112 @@
+"""
+Response cache for read-mostly GET endpoints (timetables, dropdown data).
+
+Each cached view names the data namespaces it depends on. Admin writes bump
+those namespaces' versions, which makes every dependent entry unreachable, so
+there is no per-key invalidation to get wrong. The versions are shared
+between server processes (backend/utils/shared_versions.py), so a write
+served by one worker reaches the others within a few seconds. Cached
+responses carry an ETag and a matching If-None-Match gets a 304 without
+running the view. Entries also expire after a TTL, which bounds staleness
+for edits made directly in the Firebase console.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import make_response, request, session
+
+from backend.utils.shared_versions import shared_versions
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    def __init__(self, ttl_seconds=300, max_entries=1024, versions=shared_versions):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._versions = versions
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def invalidate(self, *namespaces):
+        """Bumps the namespaces so responses built from the old data are no longer served."""
+        self._versions.bump(*namespaces)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _key(self, namespaces, per_user):
+        versions = self._versions.versions(namespaces)
+        return (
+            request.path,
+            tuple(sorted(request.args.items(multi=True))),
+            session.get('role'),
+            session.get('user_id') if per_user else None,
+            versions
+        )
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['expires'] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, response):
+        body = response.get_data()
+        entry = {
+            'expires': time.monotonic() + self.ttl_seconds,
+            'etag': hashlib.sha1(repr(key).encode() + body).hexdigest()[:20],
+            'body': body,
+            'mimetype': response.mimetype
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _respond(self, entry, status):
+        # Weak comparison: compression turns the ETag weak on the way out
+        if request.if_none_match.contains_weak(entry['etag']):
+            response = make_response('', 304)
+        else:
+            response = make_response(entry['body'], status)
+            response.mimetype = entry['mimetype']
+        response.set_etag(entry['etag'])
+        # Browsers keep the copy but revalidate it on every load
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def cached(self, *namespaces, per_user=False):
+        """
+        Caches a GET view's 200 responses. Use below the login decorator so
+        authorisation still runs on every request; per_user keys entries by
+        the session user for views whose output depends on who is asking.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                key = self._key(namespaces, per_user)
+                entry = self._lookup(key)
+                if entry is None:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    entry = self._store(key, response)
+                return self._respond(entry, 200)
+            return wrapper
+        return decorator
+
+
+response_cache = ResponseCache()
@@ -1 +1,59 @@
+"""
+Minimal in-process scheduler for periodic maintenance jobs.
+"""
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
 
+logger = logging.getLogger(__name__)
+
+
+def seconds_until(hour, minute, now=None):
+    """Seconds from `now` until the next occurrence of hour:minute local time."""
+    now = now or datetime.now()
+    next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+def claim_daily_run(lock_dir, name, day=None):
+    """
+    Creates '<lock_dir>/<name>-<YYYY-MM-DD>.lock' exclusively. Only the first
+    process to claim a given day gets True, so a job scheduled in every
+    server worker still runs once per day.
+    """
+    day = day or datetime.now().strftime('%Y-%m-%d')
+    os.makedirs(lock_dir, exist_ok=True)
+    try:
+        fd = os.open(os.path.join(lock_dir, f"{name}-{day}.lock"), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    os.write(fd, str(os.getpid()).encode())
+    os.close(fd)
+    return True
+
+
+def schedule_daily(name, hour, minute, job, lock_dir=None):
+    """
+    Runs `job()` every day at hour:minute on a daemon thread.
+    With lock_dir, processes sharing that directory run the job once per day between them.
+    Returns an Event that stops the schedule when set.
+    """
+    stop_event = threading.Event()
+
+    def runner():
+        while not stop_event.wait(seconds_until(hour, minute)):
+            if lock_dir and not claim_daily_run(lock_dir, name):
+                logger.info(f"Scheduled job '{name}' already ran today in another process.")
+                continue
+            logger.info(f"Running scheduled job '{name}'.")
+            try:
+                job()
+            except Exception as e:
+                logger.error(f"Scheduled job '{name}' failed: {e}", exc_info=True)
+
+    threading.Thread(target=runner, name=f"scheduler-{name}", daemon=True).start()
+    logger.info(f"Scheduled job '{name}' daily at {hour:02d}:{minute:02d}.")
+    return stop_event
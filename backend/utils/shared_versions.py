@@ -0,0 +1,130 @@
+"""
+Version counters for cached data, shared by every server process.
+
+Each namespace ('timetable', 'users', 'catalog', and 'principal:<uid>' for
+a user's session profile) has a counter in one Firestore document. A bump
+takes effect in this process at once and in the other processes at their
+next sync, at most `sync_seconds` later. A sync is one document read per
+process, however busy the server is. Once every process has synced, they all
+report the same versions. Without a bound datastore (tests, tools) the
+counters are local to the process.
+
+No route writes the 'catalog' data (branches, courses, rooms); it
+changes only through seed_database.py and clear_db.py, which bump it with
+the other namespaces through publish_bulk_change.
+"""
+import logging
+import os
+import threading
+import time
+
+from firebase_admin import firestore
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_COLLECTION = 'cache_versions'
+VERSIONS_DOCUMENT = 'namespaces'
+NAMESPACES = ('timetable', 'users', 'catalog')
+SYNC_SECONDS = float(os.getenv('CACHE_SYNC_SECONDS', 5))
+
+
+class SharedVersions:
+    def __init__(self, sync_seconds=SYNC_SECONDS):
+        self.sync_seconds = sync_seconds
+        self._db = None
+        self._shared = {}  # Counters as last read, plus our own bumps since
+        self._local = {}   # Bumps that could not be published
+        self._synced = False
+        self._next_sync = 0.0
+        self._listeners = {}
+        self._lock = threading.Lock()
+
+    def bind(self, firestore_db):
+        """Shares the counters through `firestore_db` from now on."""
+        with self._lock:
+            self._db = firestore_db
+            self._synced = False
+            self._next_sync = 0.0
+
+    def _document(self):
+        return self._db.collection(VERSIONS_COLLECTION).document(VERSIONS_DOCUMENT)
+
+    def subscribe(self, namespace, callback):
+        """Calls `callback()` whenever the namespace is bumped, here or in another process."""
+        with self._lock:
+            self._listeners.setdefault(namespace, []).append(callback)
+
+    def versions(self, namespaces):
+        """Current version of each namespace, syncing first if a sync is due."""
+        self.sync_if_due()
+        with self._lock:
+            return tuple((self._shared.get(ns, 0), self._local.get(ns, 0)) for ns in namespaces)
+
+    def bump(self, *namespaces):
+        """Marks data in the namespaces as changed, in every process."""
+        with self._lock:
+            # Counted as published already, so the next sync agrees with it
+            for namespace in namespaces:
+                self._shared[namespace] = self._shared.get(namespace, 0) + 1
+            firestore_db = self._db
+        self._notify(namespaces)
+        if firestore_db is None:
+            return
+        try:
+            self._document().set({ns: firestore.Increment(1) for ns in namespaces}, merge=True)
+        except Exception as e:
+            # Other processes then catch up when their cached copies expire
+            logger.warning(f"Could not publish cache invalidation of {namespaces}: {e}")
+            with self._lock:
+                for namespace in namespaces:
+                    self._shared[namespace] -= 1
+                    self._local[namespace] = self._local.get(namespace, 0) + 1
+
+    def sync_if_due(self):
+        """Reads the shared counters if the last read is older than sync_seconds."""
+        with self._lock:
+            if self._db is None or time.monotonic() < self._next_sync:
+                return
+            self._next_sync = time.monotonic() + self.sync_seconds
+        try:
+            snapshot = self._document().get()
+        except Exception as e:
+            logger.warning(f"Could not read shared cache versions: {e}")
+            return
+        counters = (snapshot.to_dict() or {}) if snapshot.exists else {}
+        with self._lock:
+            changed = [ns for ns, value in counters.items() if self._shared.get(ns, 0) < value]
+            # Counters only grow; ours is ahead while our own bump is still being written
+            for namespace in changed:
+                self._shared[namespace] = counters[namespace]
+            first_sync, self._synced = not self._synced, True
+        # Caches loaded before the first sync are already current
+        if not first_sync:
+            self._notify(changed)
+
+    def _notify(self, namespaces):
+        for namespace in namespaces:
+            for callback in self._listeners.get(namespace, ()):
+                try:
+                    callback()
+                except Exception as e:
+                    logger.warning(f"Cache invalidation callback for '{namespace}' failed: {e}")
+
+
+shared_versions = SharedVersions()
+
+
+def init_shared_versions(flask_app, firestore_db):
+    """Binds the counters to the app's datastore and syncs them before requests."""
+    shared_versions.bind(firestore_db)
+
+    @flask_app.before_request
+    def _sync_shared_versions():
+        shared_versions.sync_if_due()
+
+
+def publish_bulk_change(firestore_db):
+    """Invalidates every namespace in running servers, for tools that write the datastore directly."""
+    versions = SharedVersions()
+    versions.bind(firestore_db)
+    versions.bump(*NAMESPACES)
@@ -0,0 +1,31 @@
+"""
+Startup timeline: named milestones in milliseconds since the process started
+loading the app, so time-to-usable can be tracked from the logs and
+/api/health.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_origin = time.perf_counter()
+_marks = {}
+_lock = threading.Lock()
+
+
+def mark(name):
+    """Records a milestone once. Later marks with the same name are ignored."""
+    elapsed = round((time.perf_counter() - _origin) * 1000, 1)
+    with _lock:
+        if name in _marks:
+            return _marks[name]
+        _marks[name] = elapsed
+    logger.info(f"Startup: {name} at {elapsed} ms")
+    return elapsed
+
+
+def timeline():
+    """Milestones in the order they happened."""
+    with _lock:
+        return dict(sorted(_marks.items(), key=lambda item: item[1]))
@@ -0,0 +1,137 @@
+"""
+Serving of the frontend folder with content-hashed asset URLs.
+
+HTML pages are rewritten so every local CSS/JS reference carries '?v=<hash>'
+of the file's content. A request carrying the current hash is cached by the
+browser for a year, so repeat visits make no asset requests, and editing a
+file changes its URL. HTML itself is always revalidated. File contents, their
+hashes and compressed variants are kept in memory and refreshed when the
+file's mtime or size changes.
+"""
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import threading
+
+from flask import Response, abort, request, send_from_directory
+from werkzeug.security import safe_join
+
+from backend.utils.compression import COMPRESSIBLE_MIMETYPES, MIN_COMPRESS_BYTES, compress, negotiate_encoding
+
+logger = logging.getLogger(__name__)
+
+HASHED_EXTENSIONS = ('.css', '.js')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+ASSET_REFERENCE = re.compile(r'''(?P<attr>\b(?:href|src)\s*=\s*)(?P<quote>["'])(?P<url>[^"'?#]+\.(?:css|js))(?P=quote)''', re.IGNORECASE)
+
+
+class _Asset:
+    __slots__ = ('stat_key', 'body', 'digest', 'mimetype', 'encoded')
+
+    def __init__(self, stat_key, body, mimetype):
+        self.stat_key = stat_key
+        self.body = body
+        self.digest = hashlib.sha1(body).hexdigest()[:12]
+        self.mimetype = mimetype
+        self.encoded = {}
+
+
+class StaticAssets:
+    def __init__(self, folder):
+        self.folder = folder
+        self._assets = {}
+        self._canonical = None
+        self._lock = threading.Lock()
+
+    def _canonical_paths(self):
+        """lower-case relative path -> real relative path, for links written with the wrong case."""
+        if self._canonical is None:
+            canonical = {}
+            for root, _, files in os.walk(self.folder):
+                for name in files:
+                    if name.lower().endswith(HASHED_EXTENSIONS):
+                        rel = os.path.relpath(os.path.join(root, name), self.folder).replace(os.sep, '/')
+                        canonical[rel.lower()] = rel
+            self._canonical = canonical
+        return self._canonical
+
+    def _load(self, rel_path):
+        """Returns the cached asset for a relative path, re-reading it if it changed. None if missing."""
+        full_path = safe_join(self.folder, rel_path)
+        if full_path is None or not os.path.isfile(full_path):
+            return None
+        stat = os.stat(full_path)
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        asset = self._assets.get(rel_path)
+        if asset is None or asset.stat_key != stat_key:
+            with open(full_path, 'rb') as f:
+                body = f.read()
+            mimetype = mimetypes.guess_type(rel_path)[0] or 'application/octet-stream'
+            if rel_path.lower().endswith('.js'):
+                mimetype = 'text/javascript'
+            asset = _Asset(stat_key, body, mimetype)
+            with self._lock:
+                self._assets[rel_path] = asset
+        return asset
+
+    def versioned_url(self, url):
+        """'CSS/site.css' -> 'CSS/site.css?v=<hash>'. Unknown or external URLs are returned unchanged."""
+        if '//' in url or url.startswith(('data:', 'http:', 'https:')):
+            return url
+        prefix = '/' if url.startswith('/') else ''
+        rel_path = self._canonical_paths().get(url.lstrip('/').lower())
+        asset = self._load(rel_path) if rel_path else None
+        if asset is None:
+            return url
+        return f"{prefix}{rel_path}?v={asset.digest}"
+
+    def rewrite_html(self, html):
+        return ASSET_REFERENCE.sub(
+            lambda m: f"{m.group('attr')}{m.group('quote')}{self.versioned_url(m.group('url'))}{m.group('quote')}", html)
+
+    def _encoded(self, asset, body, etag, encoding):
+        """Compressed variants are computed once per content version."""
+        if not encoding:
+            return body
+        key = (encoding, etag)
+        if key not in asset.encoded:
+            asset.encoded = {k: v for k, v in asset.encoded.items() if k[1] == etag}
+            asset.encoded[key] = compress(body, encoding)
+        return asset.encoded[key]
+
+    def response(self, rel_path):
+        """Serves a file from the frontend folder with caching and compression."""
+        if not rel_path.lower().endswith(HASHED_EXTENSIONS + ('.html',)):
+            return send_from_directory(self.folder, rel_path)
+
+        asset = self._load(rel_path)
+        if asset is None:
+            canonical = self._canonical_paths().get(rel_path.lower())
+            asset = self._load(canonical) if canonical else None
+            rel_path = canonical or rel_path
+        if asset is None:
+            abort(404)
+
+        body, etag = asset.body, asset.digest
+        if rel_path.lower().endswith('.html'):
+            # Pages embed the current asset hashes, so they are rewritten on every request
+            body = self.rewrite_html(body.decode('utf-8')).encode('utf-8')
+            etag = hashlib.sha1(body).hexdigest()[:12]
+
+        encoding = None
+        if asset.mimetype in COMPRESSIBLE_MIMETYPES and len(body) >= MIN_COMPRESS_BYTES:
+            encoding = negotiate_encoding(request.accept_encodings)
+
+        response = Response(self._encoded(asset, body, etag, encoding), mimetype=asset.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.set_etag(etag, weak=bool(encoding))
+
+        if rel_path.lower().endswith(HASHED_EXTENSIONS) and request.args.get('v') == asset.digest:
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
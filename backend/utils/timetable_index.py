@@ -0,0 +1,167 @@
+"""
+Compiled in-memory timetable.
+
+The whole timetable collection is read once and compiled into per-day interval
+lists (times as minutes since midnight) keyed by teacher, class and room, so
+"what is this teacher teaching now" and "is lecture L running now" are
+dictionary and bisect lookups instead of a Firestore query plus strptime per
+entry. The index is rebuilt after admin timetable writes, in every server
+process through the shared 'timetable' version, and on a TTL.
+"""
+import bisect
+import logging
+import threading
+import time
+
+from backend.utils.shared_versions import shared_versions
+
+logger = logging.getLogger(__name__)
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+
+def to_minutes(hhmm):
+    """'09:30' -> 570. None for missing or malformed times."""
+    try:
+        hours, minutes = hhmm.split(':')
+        hours, minutes = int(hours), int(minutes)
+    except (AttributeError, ValueError):
+        return None
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        return None
+    return hours * 60 + minutes
+
+
+def minute_of_day(now):
+    """Fractional minutes since midnight, so 10:00:30 is after a 10:00 end."""
+    return now.hour * 60 + now.minute + (now.second + now.microsecond / 1e6) / 60
+
+
+class _Intervals:
+    """Lectures of one key on one day, sorted by start minute."""
+    __slots__ = ('starts', 'ends', 'max_ends', 'ids')
+
+    def __init__(self, rows):
+        rows.sort()
+        self.starts = [start for start, _, _ in rows]
+        self.ends = [end for _, end, _ in rows]
+        self.ids = [lecture_id for _, _, lecture_id in rows]
+        # Running maximum of end times lets the backwards scan stop early
+        self.max_ends = []
+        for end in self.ends:
+            self.max_ends.append(max(end, self.max_ends[-1]) if self.max_ends else end)
+
+    def active_at(self, minute):
+        """Id of the latest-starting lecture covering `minute`, or None."""
+        i = bisect.bisect_right(self.starts, minute) - 1
+        while i >= 0 and self.max_ends[i] >= minute:
+            if self.ends[i] >= minute:
+                return self.ids[i]
+            i -= 1
+        return None
+
+
+class _Compiled:
+    def __init__(self, entries):
+        self.lectures = {}
+        self.minutes = {}
+        self.by_teacher = {}
+        rows = {'teacher': {}, 'class': {}, 'room': {}}
+
+        for entry in entries:
+            lecture_id = entry['id']
+            self.lectures[lecture_id] = entry
+            self.by_teacher.setdefault(entry.get('teacherId'), []).append(lecture_id)
+
+            start, end = to_minutes(entry.get('startTime')), to_minutes(entry.get('endTime'))
+            if start is None or end is None:
+                continue  # Entries without times can never be live
+            self.minutes[lecture_id] = (start, end)
+            day = entry.get('day')
+            class_key = (entry.get('branchId'), entry.get('year'), entry.get('division'))
+            room_key = entry.get('roomNumber') or entry.get('roomNo')
+            for kind, key in (('teacher', entry.get('teacherId')), ('class', class_key), ('room', room_key)):
+                rows[kind].setdefault((key, day), []).append((start, end, lecture_id))
+
+        self.live = {kind: {key: _Intervals(items) for key, items in keyed.items()} for kind, keyed in rows.items()}
+
+
+class TimetableIndex:
+    def __init__(self, ttl_seconds=300):
+        self.ttl_seconds = ttl_seconds
+        self._compiled = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def _get(self, firestore_db):
+        compiled = self._compiled
+        if compiled is not None and time.monotonic() - self._built_at < self.ttl_seconds:
+            return compiled
+        with self._lock:
+            # Another thread may have rebuilt it while we waited
+            if self._compiled is not None and time.monotonic() - self._built_at < self.ttl_seconds:
+                return self._compiled
+            started = time.perf_counter()
+            entries = [{**doc.to_dict(), 'id': doc.id} for doc in firestore_db.collection('timetable').stream()]
+            self._compiled = _Compiled(entries)
+            self._built_at = time.monotonic()
+            logger.info(f"Timetable index built: {len(entries)} lectures in {round((time.perf_counter() - started) * 1000, 1)} ms")
+            return self._compiled
+
+    def prime(self, firestore_db):
+        self._get(firestore_db)
+
+    def invalidate(self):
+        """Forces a rebuild on the next lookup, after an admin timetable write."""
+        with self._lock:
+            self._compiled = None
+
+    def lecture(self, firestore_db, lecture_id):
+        """A copy of the timetable entry (with 'id'), or None if unknown."""
+        entry = self._get(firestore_db).lectures.get(lecture_id)
+        if entry is None and firestore_db.collection('timetable').document(lecture_id).get().exists:
+            # Added since the last build (e.g. by another server process)
+            self.invalidate()
+            entry = self._get(firestore_db).lectures.get(lecture_id)
+        return dict(entry) if entry else None
+
+    def is_active(self, firestore_db, lecture_id, now):
+        """
+        True/False for whether the lecture is running at `now` (start and end
+        inclusive). None if the lecture is unknown or has no valid times.
+        """
+        span = self._get(firestore_db).minutes.get(lecture_id)
+        if span is None:
+            return None
+        return span[0] <= minute_of_day(now) <= span[1]
+
+    def _active(self, firestore_db, kind, key, now):
+        compiled = self._get(firestore_db)
+        intervals = compiled.live[kind].get((key, now.strftime("%A")))
+        lecture_id = intervals.active_at(minute_of_day(now)) if intervals else None
+        return dict(compiled.lectures[lecture_id]) if lecture_id else None
+
+    def current_for_teacher(self, firestore_db, teacher_id, now):
+        return self._active(firestore_db, 'teacher', teacher_id, now)
+
+    def current_for_class(self, firestore_db, branch_id, year, division, now):
+        return self._active(firestore_db, 'class', (branch_id, year, division), now)
+
+    def current_for_room(self, firestore_db, room_number, now):
+        return self._active(firestore_db, 'room', room_number, now)
+
+    def teacher_week(self, firestore_db, teacher_id):
+        """The teacher's lectures grouped by day, each day sorted by start time."""
+        compiled = self._get(firestore_db)
+        week = {day: [] for day in DAYS}
+        for lecture_id in compiled.by_teacher.get(teacher_id, ()):
+            entry = compiled.lectures[lecture_id]
+            if entry.get('day') in week:
+                week[entry['day']].append(dict(entry))
+        for day in week:
+            week[day].sort(key=lambda x: to_minutes(x.get('startTime', '00:00')) or 0)
+        return week
+
+
+timetable_index = TimetableIndex()
+shared_versions.subscribe('timetable', timetable_index.invalidate)
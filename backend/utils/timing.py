@@ -0,0 +1,136 @@
+"""
+Per-request stage timing, reported in the Server-Timing response header.
+
+Handlers mark stages in one of two ways. `with span('detect'):` times a
+block. `checkpoint('geofence')` records the time since the previous span or
+checkpoint, which times straight-line pipelines without re-indenting them.
+Stages show up in the browser devtools (Network > Timing), and a sample of
+requests (TIMING_LOG_SAMPLE_RATE) is also logged as one JSON line.
+
+Outside a request both are no-ops, unless the thread is inside
+`collect_stages()`. Work handed to a thread pool (e.g. burst frames) is timed
+that way in the worker, and the handler adds the results to the request with
+`record_parallel_stages()`.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+
+logger = logging.getLogger(__name__)
+
+
+class _RequestTimer:
+    __slots__ = ('started', 'last', 'spans')
+
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.spans = []
+
+    def add(self, name, started, ended):
+        self.spans.append((name, (ended - started) * 1000))
+        self.last = ended
+
+
+_collecting = threading.local()
+
+
+def _timer():
+    if not has_request_context():
+        return getattr(_collecting, 'timer', None)
+    timer = g.get('request_timer')
+    if timer is None:
+        timer = g.request_timer = _RequestTimer()
+    return timer
+
+
+@contextmanager
+def span(name):
+    """Times the enclosed block as stage `name`."""
+    timer = _timer()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, started, time.perf_counter())
+
+
+def checkpoint(name):
+    """Records the time since the previous stage ended as stage `name`."""
+    timer = _timer()
+    if timer is not None:
+        timer.add(name, timer.last, time.perf_counter())
+
+
+@contextmanager
+def collect_stages():
+    """Collects the stages timed on this thread outside a request; yields the (name, ms) list."""
+    timer = _collecting.timer = _RequestTimer()
+    try:
+        yield timer.spans
+    finally:
+        _collecting.timer = None
+
+
+def record_parallel_stages(stage_lists, prefix=''):
+    """
+    Adds stages collected by workers that ran side by side to the request.
+    Each stage is reported once, as its slowest worker's time, since that is
+    what the request waited for.
+    """
+    timer = _timer()
+    if timer is None:
+        return
+    slowest = {}
+    for stages in stage_lists:
+        totals = {}
+        for name, ms in stages:
+            totals[name] = totals.get(name, 0.0) + ms
+        for name, ms in totals.items():
+            slowest[name] = max(slowest.get(name, 0.0), ms)
+    timer.spans.extend((prefix + name, ms) for name, ms in slowest.items())
+
+
+def server_timing_header(spans, total_ms):
+    """'decode;dur=4.1, detect;dur=83.0, total;dur=95.2'. Repeated stages are summed."""
+    durations = {}
+    for name, ms in spans:
+        durations[name] = durations.get(name, 0.0) + ms
+    entries = [f"{name};dur={ms:.1f}" for name, ms in durations.items()]
+    entries.append(f"total;dur={total_ms:.1f}")
+    return ', '.join(entries)
+
+
+def _before_request():
+    g.request_timer = _RequestTimer()
+
+
+def _after_request(response):
+    timer = g.get('request_timer')
+    if timer is None or not timer.spans:
+        return response
+    total_ms = (time.perf_counter() - timer.started) * 1000
+    response.headers.add('Server-Timing', server_timing_header(timer.spans, total_ms))
+
+    sample_rate = current_app.config.get('TIMING_LOG_SAMPLE_RATE', 0.0)
+    if sample_rate and random.random() < sample_rate:
+        logger.info("request timing " + json.dumps({
+            "route": request.url_rule.rule if request.url_rule else request.path,
+            "method": request.method,
+            "status": response.status_code,
+            "totalMs": round(total_ms, 1),
+            "spans": [[name, round(ms, 1)] for name, ms in timer.spans]
+        }))
+    return response
+
+
+def init_timing(flask_app):
+    flask_app.before_request(_before_request)
+    flask_app.after_request(_after_request)
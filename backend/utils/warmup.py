@@ -0,0 +1,89 @@
+"""
+Background warmup run once at startup.
+
+Loads the dlib face models, opens the Firestore channel and primes the
+reference caches so the first student of the day doesn't pay for them.
+The readiness flag is reported by /api/health.
+"""
+import logging
+import threading
+import time
+
+from backend.utils.database import reference_cache
+from backend.utils.face_index import face_index
+from backend.utils.startup_timeline import mark
+from backend.utils.timetable_index import timetable_index
+
+logger = logging.getLogger(__name__)
+
+_state = {"ready": False, "started": False, "steps": {}}
+_state_lock = threading.Lock()
+
+
+def _warm_face_models():
+    import numpy as np
+    import face_recognition
+
+    # A blank frame exercises the HOG detector; encoding a fixed box loads the
+    # landmark and recognition models that face verification needs.
+    blank = np.zeros((160, 160, 3), dtype=np.uint8)
+    face_recognition.face_locations(blank)
+    face_recognition.face_encodings(blank, [(20, 140, 140, 20)])
+
+
+def _warm_firestore(firestore_db):
+    firestore_db.collection('locations').limit(1).get()
+
+
+def _warm_caches(firestore_db):
+    reference_cache.prime(firestore_db)
+    timetable_index.prime(firestore_db)
+    face_index.ensure_loaded(firestore_db)
+
+
+def _run_step(name, func, *args):
+    started = time.perf_counter()
+    try:
+        func(*args)
+        step = {"status": "done"}
+    except Exception as e:
+        logger.warning(f"Warmup step '{name}' failed: {e}")
+        step = {"status": "failed", "error": str(e)}
+    step["durationMs"] = round((time.perf_counter() - started) * 1000, 1)
+    with _state_lock:
+        _state["steps"][name] = step
+
+
+def _run(firestore_db):
+    started = time.perf_counter()
+    _run_step('firestore', _warm_firestore, firestore_db)
+    _run_step('reference_caches', _warm_caches, firestore_db)
+    _run_step('face_models', _warm_face_models)
+    with _state_lock:
+        _state["ready"] = True
+        _state["durationMs"] = round((time.perf_counter() - started) * 1000, 1)
+    mark('warm')
+    logger.info(f"Warmup complete in {_state['durationMs']} ms.")
+
+
+def start_warmup(firestore_db):
+    """Starts the warmup thread once. Later calls are no-ops."""
+    with _state_lock:
+        if _state["started"]:
+            return
+        _state["started"] = True
+    threading.Thread(target=_run, args=(firestore_db,), name='warmup', daemon=True).start()
+
+
+def is_ready():
+    return _state["ready"]
+
+
+def warmup_status():
+    """Snapshot of the readiness flag and per-step timings."""
+    with _state_lock:
+        return {
+            "ready": _state["ready"],
+            "durationMs": _state.get("durationMs"),
+            "steps": {name: dict(step) for name, step in _state["steps"].items()}
+        }
@@ -0,0 +1,202 @@
+"""
+Throughput of the face processing chain on CPU, for capacity planning.
+
+    python -m benchmarks.bench_face_pipeline --images path/to/faces
+    python -m benchmarks.bench_face_pipeline --images faces --sizes 480,640 --threads 1,4 --processes 4
+    python -m benchmarks.bench_face_pipeline --images faces --chain register --index-size 20000
+
+Every image is scaled so its longest side is each of --sizes, then
+re-encoded as a JPEG data URL, as the browser sends it. The chain then runs
+on it, through the same functions the routes call:
+
+- verify:   decode -> detect -> encode -> compare (one frame of student verify-face-burst)
+- register: decode -> detect -> encode -> duplicate search over a face
+            index of --index-size encodings (student/admin register-face)
+
+Stage times come from the pipeline's own Server-Timing spans. Each
+configuration runs the frames --rounds times on a pool of threads or
+processes, after one untimed warmup frame per worker to load the models.
+
+faces/s/core divides throughput by min(workers, CPUs). It is the figure to
+multiply by the cores of a CPU-only server.
+"""
+import argparse
+import base64
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+
+from benchmarks.bench_routes import percentile
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+STAGES = ('decode', 'detect', 'encode', 'compare', 'search')
+
+# Per-process state, set by _init_worker
+_worker = {}
+
+
+def load_images(folder):
+    paths = sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                   if name.lower().endswith(IMAGE_EXTENSIONS))
+    if not paths:
+        raise SystemExit(f"No images ({', '.join(IMAGE_EXTENSIONS)}) in {folder}")
+    return paths
+
+
+def scale_frame(path, longest_side, quality=90):
+    """The image resized to `longest_side` pixels on its longer edge, as a JPEG data URL."""
+    from PIL import Image
+    with Image.open(path) as image:
+        image = image.convert('RGB')
+        scale = longest_side / max(image.size)
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                             Image.BILINEAR)
+        out = BytesIO()
+        image.save(out, format='JPEG', quality=quality)
+    return "data:image/jpeg;base64," + base64.b64encode(out.getvalue()).decode()
+
+
+def _init_worker(chain, model, upsample, index_size):
+    from flask import Flask
+    from benchmarks.memory_datastore import MemoryClient
+    from backend.utils.face_index import FaceIndex
+
+    logging.disable(logging.CRITICAL)
+    _worker.update(app=Flask(__name__), chain=chain, model=model, upsample=upsample,
+                   reference=[0.0] * 128, index=None)
+    if chain == 'register':
+        import random
+        rng = random.Random(index_size)
+        store = MemoryClient()
+        store.load({'face_encodings': {
+            f"F{i:06d}": {'userId': f"U{i:06d}", 'studentId': f"S{i:06d}",
+                          'encoding': [rng.gauss(0, 0.1) for _ in range(128)]}
+            for i in range(index_size)}})
+        _worker['index'] = FaceIndex()
+        _worker['index'].load(store)
+
+
+def process_frame(data_url):
+    """Runs the configured chain on one frame. Returns (faces found, {stage: ms}, total ms)."""
+    from flask import g
+    from backend.utils.face_pipeline import decode_image, encode_faces, face_distance
+    from backend.utils.timing import span
+
+    if not _worker:
+        raise RuntimeError("call _init_worker first")
+    started = time.perf_counter()
+    with _worker['app'].test_request_context():
+        image_np = decode_image(data_url)
+        if _worker['chain'] == 'register':
+            _, _, encodings = encode_faces(image_np, convert_to_bgr=False,
+                                           model=_worker['model'], upsample=_worker['upsample'])
+            with span('search'):
+                for encoding in encodings:
+                    _worker['index'].search(encoding.tolist())
+        else:
+            _, _, encodings = encode_faces(image_np, model=_worker['model'], upsample=_worker['upsample'])
+            with span('compare'):
+                for encoding in encodings:
+                    face_distance(_worker['reference'], encoding)
+        stages = {}
+        for name, ms in g.request_timer.spans:
+            stages[name] = stages.get(name, 0.0) + ms
+    return len(encodings), stages, (time.perf_counter() - started) * 1000
+
+
+def _warm_process(data_url):
+    process_frame(data_url)
+    return os.getpid()
+
+
+def run_config(frames, kind, workers, rounds, init_args):
+    """Times `rounds` passes over `frames` on a pool. Returns the result row."""
+    work = frames * rounds
+    if kind == 'process':
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args)
+        # One warmup frame per process: the pool starts processes on demand
+        list(pool.map(_warm_process, [frames[0]] * workers))
+    else:
+        _init_worker(*init_args)
+        pool = ThreadPoolExecutor(max_workers=workers)
+        list(pool.map(process_frame, [frames[0]] * workers))
+    try:
+        started = time.perf_counter()
+        results = list(pool.map(process_frame, work))
+        elapsed = time.perf_counter() - started
+    finally:
+        pool.shutdown()
+
+    faces = sum(found for found, _, _ in results)
+    cores = min(workers, os.cpu_count() or 1)
+    stage_means = {stage: round(statistics.mean(stages.get(stage, 0.0) for _, stages, _ in results), 2)
+                   for stage in STAGES if any(stage in stages for _, stages, _ in results)}
+    totals = [total for _, _, total in results]
+    return {
+        'workers': f"{kind}:{workers}",
+        'frames': len(results),
+        'faces': faces,
+        'framesPerSecond': round(len(results) / elapsed, 2),
+        'facesPerSecond': round(faces / elapsed, 2),
+        'facesPerSecondPerCore': round(faces / elapsed / cores, 2),
+        'stageMeanMs': stage_means,
+        'p50Ms': round(percentile(totals, 50), 1),
+        'p95Ms': round(percentile(totals, 95), 1),
+    }
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the face decode/detect/encode chain.")
+    parser.add_argument('--images', required=True, help="folder of test photos")
+    parser.add_argument('--chain', choices=('verify', 'register'), default='verify')
+    parser.add_argument('--sizes', type=_int_list, default=[320, 480, 640, 960, 1280],
+                        help="longest image side in pixels (default 320,480,640,960,1280)")
+    parser.add_argument('--threads', type=_int_list, default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument('--processes', type=_int_list, default=[])
+    parser.add_argument('--model', choices=('hog', 'cnn'), default='hog', help="face detector (routes use hog)")
+    parser.add_argument('--upsample', type=int, default=1, help="detector upsampling passes (routes use 1)")
+    parser.add_argument('--index-size', type=int, default=5000, help="enrolled faces for --chain register")
+    parser.add_argument('--rounds', type=int, default=3, help="passes over the images per configuration")
+    parser.add_argument('--json', metavar='PATH', help="also write the results here")
+    options = parser.parse_args(argv)
+
+    paths = load_images(options.images)
+    init_args = (options.chain, options.model, options.upsample, options.index_size)
+    pools = [('thread', n) for n in options.threads] + [('process', n) for n in options.processes]
+    print(f"{len(paths)} images, chain={options.chain}, model={options.model}, upsample={options.upsample}, "
+          f"{os.cpu_count()} CPUs")
+    print(f"{'size':>5} {'workers':<10} {'frames':>6} {'faces':>6} {'frames/s':>9} {'faces/s':>8} "
+          f"{'faces/s/core':>12} {'p50 ms':>8} {'p95 ms':>8}  stage means (ms)")
+
+    results = []
+    for size in options.sizes:
+        frames = [scale_frame(path, size) for path in paths]
+        for kind, workers in pools:
+            row = {'size': size, **run_config(frames, kind, workers, options.rounds, init_args)}
+            results.append(row)
+            stages = ' '.join(f"{stage}={ms}" for stage, ms in row['stageMeanMs'].items())
+            print(f"{size:>5} {row['workers']:<10} {row['frames']:>6} {row['faces']:>6} {row['framesPerSecond']:>9} "
+                  f"{row['facesPerSecond']:>8} {row['facesPerSecondPerCore']:>12} {row['p50Ms']:>8} "
+                  f"{row['p95Ms']:>8}  {stages}")
+            if row['faces'] != row['frames']:
+                print(f"      {row['frames'] - row['faces']} frames did not give exactly one face; "
+                      f"faces/s only counts the faces found")
+
+    if options.json:
+        with open(options.json, 'w') as out:
+            json.dump({'options': vars(options), 'cpus': os.cpu_count(), 'results': results}, out, indent=2)
+        print(f"Wrote {options.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,361 @@
+"""
+Times every API route against a synthetic campus held in memory.
+
+    python -m benchmarks.bench_routes                      # small, medium and large
+    python -m benchmarks.bench_routes --sizes small --repeat 50
+    python -m benchmarks.bench_routes --save-baseline      # write benchmarks/baselines/routes.json
+    python -m benchmarks.bench_routes --compare --fail-on-regression
+
+For each dataset size the app is built with create_app(db=MemoryClient), the
+campus from synthetic_campus.py is loaded, and each route is called once
+cold (process caches dropped) and then `--repeat` times warm. The response
+cache is cleared before every call, so the numbers are for the handler and
+not for a cached body. Requests that write are rolled back after each call,
+so every iteration sees the same data.
+
+Datastore reads are counted by the in-memory client. They do not depend on
+the machine, so a jump in reads is the clearest sign of a query that has
+started to scale with the dataset.
+
+A route that answers with an error is timing its error path, so any 4xx/5xx
+fails the run (exit status 1) and no baseline is written.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from benchmarks.memory_datastore import MemoryClient
+from benchmarks.synthetic_campus import CAMPUS_BSSID, CAMPUS_LOCATION, SIZES, generate_campus
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+DEFAULT_BASELINE = os.path.join(BASELINE_DIR, 'routes.json')
+BENCHMARKED_BLUEPRINTS = ('admin', 'admin_system', 'student', 'teacher_bp', 'login')
+
+# Endpoints that need a camera frame, stream forever or block for seconds by design
+SKIPPED = {
+    'admin.register_face': "needs a face image",
+    'student.register_face': "needs a face image",
+    'student.verify_face_burst': "needs face images (see bench_face_pipeline.py)",
+    'teacher_bp.stream_live_lecture': "server-sent event stream",
+    'admin_system.profile_cpu': "blocks for the capture window",
+    'admin_system.profile_memory': "blocks for the capture window",
+}
+
+
+@dataclass
+class RouteCase:
+    endpoint: str
+    method: str
+    path: str
+    role: str
+    user_id: str
+    body: dict = None
+    args: dict = None
+    session: callable = None  # Extra session values, evaluated before every call
+    writes: bool = False
+    label: str = None
+
+    @property
+    def name(self):
+        return self.label or self.endpoint
+
+
+def route_cases(campus):
+    """One RouteCase per endpoint, addressed at ids that exist in `campus`."""
+    live = campus.live_lectures[0]
+    branch_id, year, division = live['branchId'], live['year'], live['division']
+    teacher_id = live['teacherId']
+    teachers = sorted(uid for uid, user in campus.collections['users'].items() if user['role'] == 'Teacher')
+    other_teacher = next(uid for uid in teachers if uid != teacher_id)
+    student, other_student = campus.students_by_class[branch_id][:2]
+    student_doc = campus.collections['users'][student]
+    lecture_ids = sorted(lid for lid, entry in campus.collections['timetable'].items() if entry['branchId'] == branch_id)
+    timetable_id = next(lid for lid in lecture_ids if lid != live['id'])
+    records = sorted(rid for rid, record in campus.collections['attendance'].items()
+                     if record['lectureId'] in set(lecture_ids[:3]))[:20]
+    end = datetime.now().date()
+    class_args = {'branchId': branch_id, 'year': year, 'division': division}
+    admin = campus.admin_id
+
+    def entry(day, number):
+        return {**class_args, 'day': day, 'lectureNumber': number, 'courseCode': 'C002', 'teacherId': other_teacher,
+                'roomNumber': 'Room-999', 'startTime': '18:00', 'endTime': '18:45'}
+
+    return [
+        RouteCase('login.login', 'POST', '/api/login', None, None,
+                  body={'email': student_doc['email'], 'password': student_doc['password']}),
+        RouteCase('login.update_password', 'POST', '/api/update-password', None, None,
+                  body={'uid': student, 'new_password': 'benchmark1'}, writes=True),
+
+        RouteCase('admin.get_users', 'GET', '/api/admin/users', 'Admin', admin, args={'page': 2, 'limit': 10}),
+        RouteCase('admin.get_users', 'GET', '/api/admin/users', 'Admin', admin,
+                  args={'search': student_doc['name'].split()[0]}, label='admin.get_users[search]'),
+        RouteCase('admin.create_user', 'POST', '/api/admin/users', 'Admin', admin, writes=True, body={
+            'name': 'Bench Student', 'email': 'bench@student.college.edu', 'role': 'Student',
+            'studentId': 'SBENCH', 'password': 'bench', **class_args}),
+        RouteCase('admin.get_user', 'GET', f'/api/admin/users/{student}', 'Admin', admin),
+        RouteCase('admin.update_user', 'PUT', f'/api/admin/users/{other_student}', 'Admin', admin,
+                  body={'name': 'Renamed Student'}, writes=True),
+        RouteCase('admin.delete_user', 'DELETE', f'/api/admin/users/{other_student}', 'Admin', admin, writes=True),
+        RouteCase('admin.create_timetable_entry', 'POST', '/api/admin/timetable', 'Admin', admin,
+                  body=entry('Saturday', 9), writes=True),
+        RouteCase('admin.get_timetable', 'GET', f"/api/admin/timetable/{branch_id.split('_')[0]}/{year}/{division}",
+                  'Admin', admin),
+        RouteCase('admin.delete_timetable_entry', 'DELETE', f'/api/admin/timetable/{timetable_id}', 'Admin', admin,
+                  writes=True),
+        RouteCase('admin.create_bulk_timetable', 'POST', '/api/admin/timetable/bulk', 'Admin', admin, writes=True,
+                  body={'entries': [entry(day, 9) for day in ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday')]}),
+        RouteCase('admin.get_branches', 'GET', '/api/admin/branches', 'Admin', admin),
+        RouteCase('admin.get_teachers', 'GET', '/api/admin/teachers', 'Admin', admin),
+        RouteCase('admin.get_courses', 'GET', '/api/admin/courses', 'Admin', admin),
+        RouteCase('admin.get_rooms', 'GET', '/api/admin/rooms', 'Admin', admin),
+        RouteCase('admin.get_stats', 'GET', '/api/admin/stats', 'Admin', admin),
+        RouteCase('admin.get_face_duplicates', 'GET', '/api/admin/face-duplicates', 'Admin', admin),
+
+        RouteCase('admin_system.update_admin_details', 'PUT', '/api/system/admin/details', 'Admin', admin,
+                  body={'phone': '9999999999'}, writes=True),
+        RouteCase('admin_system.change_admin_password', 'POST', '/api/system/admin/password', 'Admin', admin,
+                  body={'newPassword': 'benchmark1'}, writes=True),
+        RouteCase('admin_system.get_teachers_without_bluetooth', 'GET', '/api/system/teachers/no-bluetooth',
+                  'Admin', admin),
+        RouteCase('admin_system.update_teacher_details', 'PUT', f'/api/system/teachers/{other_teacher}', 'Admin',
+                  admin, body={'phone': '9999999999'}, writes=True),
+        RouteCase('admin_system.remove_teacher', 'DELETE', f'/api/system/teachers/{other_teacher}', 'Admin', admin,
+                  body={'reason': 'benchmark'}, writes=True),
+        RouteCase('admin_system.find_students', 'GET', '/api/system/students/find', 'Admin', admin, args=class_args),
+        RouteCase('admin_system.block_student_attendance', 'POST', f'/api/system/students/{other_student}/block',
+                  'Admin', admin, body={'blockUntilDate': (end + timedelta(days=7)).isoformat(), 'reason': 'benchmark'},
+                  writes=True),
+        RouteCase('admin_system.update_student_details', 'PUT', f'/api/system/students/{other_student}', 'Admin',
+                  admin, body={'phone': '9999999999'}, writes=True),
+        RouteCase('admin_system.reset_student_password', 'POST',
+                  f'/api/system/students/{other_student}/reset-password', 'Admin', admin,
+                  body={'newPassword': 'benchmark1'}, writes=True),
+        RouteCase('admin_system.remove_student', 'DELETE', f'/api/system/students/{other_student}', 'Admin', admin,
+                  body={'reason': 'benchmark'}, writes=True),
+        RouteCase('admin_system.get_metrics', 'GET', '/api/system/metrics', 'Admin', admin),
+        RouteCase('admin_system.get_query_shapes', 'GET', '/api/system/query-shapes', 'Admin', admin),
+
+        RouteCase('student.get_dashboard_data', 'GET', '/api/student/dashboard', 'Student', student),
+        RouteCase('student.get_student_timetable', 'GET', '/api/student/timetable', 'Student', student),
+        RouteCase('student.get_teacher_devices', 'GET', '/api/student/teacher-devices', 'Student', student),
+        RouteCase('student.get_attendance_history', 'GET', '/api/student/attendance-history', 'Student', student),
+        RouteCase('student.mark_attendance', 'POST', '/api/student/mark-attendance', 'Student', student, writes=True,
+                  session=lambda: {'face_verified_at': datetime.now().isoformat(), 'face_verification_id': uuid.uuid4().hex},
+                  body={'lectureId': live['id'], 'latitude': CAMPUS_LOCATION[0], 'longitude': CAMPUS_LOCATION[1],
+                        'bssid': CAMPUS_BSSID,
+                        'bluetoothDeviceId': campus.collections['users'][teacher_id]['bluetoothDeviceId']}),
+
+        RouteCase('teacher_bp.get_filter_options', 'GET', '/api/teacher/filters', 'Teacher', teacher_id),
+        RouteCase('teacher_bp.get_teacher_timetable', 'GET', '/api/teacher/timetable', 'Teacher', teacher_id),
+        RouteCase('teacher_bp.get_live_lecture_and_students', 'GET', '/api/teacher/live-lecture', 'Teacher',
+                  teacher_id),
+        RouteCase('teacher_bp.get_weekly_attendance_trend', 'GET', '/api/teacher/analytics/weekly-trend', 'Teacher',
+                  teacher_id, args=class_args),
+        RouteCase('teacher_bp.get_branch_attendance_comparison', 'GET', '/api/teacher/analytics/branch-comparison',
+                  'Teacher', teacher_id),
+        RouteCase('teacher_bp.get_editable_attendance', 'GET', '/api/teacher/attendance/editable', 'Teacher',
+                  teacher_id, args={**class_args, 'startDate': (end - timedelta(days=7)).isoformat(),
+                                    'endDate': end.isoformat()}),
+        RouteCase('teacher_bp.update_attendance', 'POST', '/api/teacher/attendance/update', 'Teacher', teacher_id,
+                  body={'changes': [{'recordId': rid, 'status': 'Present'} for rid in records]}, writes=True),
+    ]
+
+
+def uncovered_endpoints(flask_app, cases):
+    """Endpoints of the benchmarked blueprints with neither a case nor a skip reason."""
+    covered = {case.endpoint for case in cases} | set(SKIPPED)
+    return sorted(rule.endpoint for rule in flask_app.url_map.iter_rules()
+                  if rule.endpoint.split('.')[0] in BENCHMARKED_BLUEPRINTS and rule.endpoint not in covered)
+
+
+def _reset_process_caches():
+    from backend.utils.database import reference_cache
+    from backend.utils.response_cache import response_cache
+    from backend.utils.timetable_index import timetable_index
+    response_cache.clear()
+    reference_cache.invalidate()
+    timetable_index.invalidate()
+
+
+def _prime_process_caches(store):
+    from backend.utils.database import reference_cache
+    from backend.utils.timetable_index import timetable_index
+    reference_cache.prime(store)
+    timetable_index.prime(store)
+
+
+def _call(client, store, case):
+    from backend.utils.response_cache import response_cache
+    if case.role is not None:
+        with client.session_transaction() as sess:
+            sess['user_id'] = case.user_id
+            sess['role'] = case.role
+            sess.update(case.session() if case.session else {})
+    if case.writes:
+        store.checkpoint()
+    response_cache.clear()
+    reads = store.reads
+    started = time.perf_counter()
+    response = client.open(case.path, method=case.method, json=case.body, query_string=case.args)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    reads = store.reads - reads
+    if case.writes:
+        store.rollback()
+        # Admin writes invalidate the process caches; rebuild them outside the timed region
+        _prime_process_caches(store)
+    return elapsed_ms, reads, response.status_code
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_size(size, repeat):
+    """Benchmarks every case on one dataset size. Returns (results, uncovered endpoints, document count)."""
+    from app import create_app
+
+    spec = SIZES[size]
+    now = datetime.now()
+    campus = generate_campus(type(spec)(**{**spec.__dict__, 'live_at': now}))
+    store = MemoryClient(seed=spec.seed)
+    store.load(campus.collections)
+    flask_app = create_app({
+        'START_BACKGROUND_JOBS': False, 'DATASTORE_BUDGET_STRICT': False,
+        'JOB_LOCK_DIR': tempfile.mkdtemp(prefix='bench-jobs-')
+    }, db=store)
+
+    cases = route_cases(campus)
+    results = {}
+    for case in cases:
+        _reset_process_caches()
+        cold_ms, cold_reads, status = _call(flask_app.test_client(), store, case)
+        _prime_process_caches(store)
+        client = flask_app.test_client()
+        durations, reads, statuses = [], [], {status}
+        for _ in range(repeat):
+            elapsed_ms, call_reads, call_status = _call(client, store, case)
+            durations.append(elapsed_ms)
+            reads.append(call_reads)
+            statuses.add(call_status)
+        results[case.name] = {
+            'method': case.method, 'path': case.path,
+            'status': sorted(statuses),
+            'coldMs': round(cold_ms, 2),
+            'p50Ms': round(statistics.median(durations), 2),
+            'p95Ms': round(percentile(durations, 95), 2),
+            'coldReads': cold_reads,
+            'reads': max(reads),
+        }
+    return results, uncovered_endpoints(flask_app, cases), campus.document_count()
+
+
+def compare(current, baseline, threshold=1.3, min_delta_ms=1.0):
+    """
+    Rows of (size, route, metric, baseline, current, ratio) that got worse by
+    more than `threshold` (and, for timings, by at least `min_delta_ms`).
+    p95 is reported but not compared: over a few warm calls it is too noisy.
+    """
+    regressions = []
+    for size, routes in current.items():
+        for name, result in routes.items():
+            before = baseline.get(size, {}).get(name)
+            if before is None:
+                continue
+            for metric in ('p50Ms', 'reads'):
+                old, new = before.get(metric), result.get(metric)
+                if not old or new is None:
+                    continue
+                ratio = new / old
+                if ratio > threshold and (metric == 'reads' or new - old >= min_delta_ms):
+                    regressions.append((size, name, metric, old, new, round(ratio, 2)))
+    return regressions
+
+
+def _print_table(size, documents, results):
+    print(f"\n== {size}: {documents} documents")
+    print(f"{'route':<52} {'status':>7} {'cold ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'reads':>7}")
+    for name, result in results.items():
+        status = ','.join(str(code) for code in result['status'])
+        print(f"{name:<52} {status:>7} {result['coldMs']:>9.2f} {result['p50Ms']:>8.2f} "
+              f"{result['p95Ms']:>8.2f} {result['reads']:>7}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every API route over synthetic datasets.")
+    parser.add_argument('--sizes', default='small,medium,large', help="comma-separated: " + ', '.join(SIZES))
+    parser.add_argument('--repeat', type=int, default=15, help="warm calls per route (default 15)")
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, metavar='PATH')
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, metavar='PATH')
+    parser.add_argument('--threshold', type=float, default=1.3, help="regression ratio (default 1.3)")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--json', metavar='PATH', help="also write the raw results here")
+    options = parser.parse_args(argv)
+
+    # Set before app.py is imported: keep the shared face index out of the
+    # working tree, and the per-request logging and the periodic shared cache
+    # version read (one process here) out of the timings and read counts
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('FACE_INDEX_DIR', tempfile.mkdtemp(prefix='bench-face-index-'))
+    os.environ.setdefault('CACHE_SYNC_SECONDS', 'inf')
+    logging.disable(logging.CRITICAL)
+
+    sizes = [size.strip() for size in options.sizes.split(',') if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+
+    results, failures = {}, []
+    for size in sizes:
+        started = time.perf_counter()
+        results[size], uncovered, documents = run_size(size, options.repeat)
+        _print_table(size, documents, results[size])
+        print(f"({time.perf_counter() - started:.1f} s)")
+        if uncovered:
+            print(f"Not benchmarked (add a case or a SKIPPED reason): {', '.join(uncovered)}")
+        failures += [f"{size} {name}" for name, result in results[size].items()
+                     if any(code >= 400 for code in result['status'])]
+
+    if failures:
+        print(f"\nRoutes returning errors: {', '.join(failures)}")
+        if options.save_baseline:
+            print("Baseline not saved.")
+            options.save_baseline = None
+
+    report = {
+        'meta': {'created': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+                 'machine': platform.machine(), 'repeat': options.repeat},
+        'results': results
+    }
+    for path in filter(None, (options.save_baseline, options.json)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as out:
+            json.dump(report, out, indent=2, sort_keys=True)
+        print(f"Wrote {path}")
+
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], threshold=options.threshold)
+        print(f"\nCompared with {options.compare} (created {baseline['meta'].get('created')}):")
+        if not regressions:
+            print("no regressions")
+        for size, name, metric, old, new, ratio in regressions:
+            print(f"  {size:<7} {name:<52} {metric:<6} {old:>9} -> {new:<9} x{ratio}")
+        if regressions and options.fail_on_regression:
+            return 1
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""
+Class-start stampede: many students logging in, verifying their face and
+marking attendance in the first minutes of their lectures.
+
+    python -m benchmarks.load_stampede                              # 5 lectures x 60 students over 10 s
+    python -m benchmarks.load_stampede --lectures 10 --ramp 120 --latency-ms 40 --jitter-ms 20
+    python -m benchmarks.load_stampede --face-image me.jpg          # run real burst face verification
+    python -m benchmarks.load_stampede --double-submit 0.1          # 10% submit from two devices at once
+
+The app runs behind a real HTTP server on a loopback port. Like one gunicorn
+gthread worker, the server handles requests on a fixed pool of threads
+(--server-threads). The datastore is the in-memory client, with a simulated
+round-trip latency. Every student gets their own cookie session and arrives
+at a random moment within --ramp seconds of the start.
+
+Without --face-image the verify-face-burst step is skipped. Instead the
+harness writes the verification time and id into the signed session cookie,
+as the handler does on a match. With it, the photo's encoding is stored for
+every student, and each student posts --burst-frames copies of the photo to
+/verify-face-burst, so every frame runs the full decode/detect/encode path
+on the frame pool, followed by the match and liveness checks. The copies
+alternate in brightness so the still photo passes the motion check.
+
+The report gives p50/p95/p99 latency and errors per step. It also counts
+duplicate attendance rows (one student, one lecture, several records).
+There should be none.
+"""
+import argparse
+import base64
+import io
+import json
+import logging
+import mimetypes
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+
+from benchmarks.bench_routes import percentile
+from benchmarks.memory_datastore import MemoryClient
+from benchmarks.synthetic_campus import CAMPUS_BSSID, CAMPUS_LOCATION, CampusSpec, generate_campus
+
+STEPS = ('login', 'verify-face-burst', 'mark-attendance')
+# Brightness step between consecutive burst frames, enough for the motion check
+BURST_BRIGHTNESS_STEP = 0.06
+REQUEST_TIMEOUT_SECONDS = 120
+
+
+@dataclass
+class StepResult:
+    step: str
+    status: int  # 0 when the request itself failed (connection error, timeout)
+    ms: float
+    error: str = None
+
+
+def _pooled_server(flask_app, threads):
+    """A werkzeug server that handles connections on a fixed pool of threads."""
+    from werkzeug.serving import BaseWSGIServer
+
+    class PooledWSGIServer(BaseWSGIServer):
+        def __init__(self):
+            super().__init__('127.0.0.1', 0, flask_app)
+            self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='server')
+
+        def process_request(self, request, client_address):
+            self._pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+        def server_close(self):
+            self._pool.shutdown(wait=True)
+            super().server_close()
+
+    return PooledWSGIServer()
+
+
+class Stampede:
+    def __init__(self, options):
+        self.options = options
+        self.rng = random.Random(options.seed)
+        self.results = []
+        self._results_lock = threading.Lock()
+
+        spec = CampusSpec(students=options.lectures * options.class_size, class_size=options.class_size,
+                          teachers=max(options.lectures, 10), weeks=options.weeks, face_encodings=True,
+                          live_at=datetime.now(), live_lectures=options.lectures, seed=options.seed)
+        self.campus = generate_campus(spec)
+        self.burst = None
+        if options.face_image:
+            self.burst = self._enroll_face(options.face_image, options.burst_frames)
+
+        self.store = MemoryClient(seed=options.seed, latency_ms=options.latency_ms, jitter_ms=options.jitter_ms)
+        self.store.load(self.campus.collections)
+
+        from app import create_app
+        self.app = create_app({
+            'START_BACKGROUND_JOBS': False, 'DATASTORE_BUDGET_STRICT': False,
+            'JOB_LOCK_DIR': tempfile.mkdtemp(prefix='stampede-jobs-')
+        }, db=self.store)
+        self.cookie_name = self.app.config.get('SESSION_COOKIE_NAME', 'session')
+        self.serializer = self.app.session_interface.get_signing_serializer(self.app)
+
+    def _enroll_face(self, path, frame_count):
+        """Stores the photo's encoding for every student. Returns a burst of the photo as JPEG data URLs."""
+        from PIL import Image, ImageEnhance
+        from backend.utils.face_pipeline import decode_image, encode_faces
+        with open(path, 'rb') as f:
+            mimetype = mimetypes.guess_type(path)[0] or 'image/jpeg'
+            image_url = f"data:{mimetype};base64,{base64.b64encode(f.read()).decode()}"
+        _, _, encodings = encode_faces(decode_image(image_url))
+        if len(encodings) != 1:
+            raise SystemExit(f"{path}: expected exactly one face, found {len(encodings)}")
+        encoding = [float(value) for value in encodings[0]]
+        for record in self.campus.collections['face_encodings'].values():
+            record['encoding'] = encoding
+
+        photo = Image.open(path).convert('RGB')
+        burst = []
+        for index in range(frame_count):
+            frame = ImageEnhance.Brightness(photo).enhance(1 + BURST_BRIGHTNESS_STEP * (index % 2))
+            buffer = io.BytesIO()
+            frame.save(buffer, format='JPEG', quality=90)
+            burst.append(f"data:image/jpeg;base64,{base64.b64encode(buffer.getvalue()).decode()}")
+        return burst
+
+    def _record(self, step, started, response=None, error=None):
+        ms = (time.perf_counter() - started) * 1000
+        if response is not None and response.status_code >= 400:
+            try:
+                body = response.json()
+                error = body.get('error') or body.get('message')
+            except ValueError:
+                error = response.reason
+        result = StepResult(step, response.status_code if response is not None else 0, ms, error)
+        with self._results_lock:
+            self.results.append(result)
+        return result
+
+    def _post(self, http, base_url, step, path, payload):
+        started = time.perf_counter()
+        try:
+            response = http.post(base_url + path, json=payload, timeout=REQUEST_TIMEOUT_SECONDS)
+        except Exception as e:
+            return self._record(step, started, error=type(e).__name__)
+        return self._record(step, started, response)
+
+    def _mark_verified(self, http):
+        """What verify-face-burst does on a match: put the verification time and id in the session."""
+        cookie = next(c for c in http.cookies if c.name == self.cookie_name)
+        data = self.serializer.loads(cookie.value)
+        data['face_verified_at'] = datetime.now().isoformat()
+        data['face_verification_id'] = uuid.uuid4().hex
+        http.cookies.set(self.cookie_name, self.serializer.dumps(data), domain=cookie.domain, path=cookie.path)
+
+    def student_session(self, base_url, start_at, uid, lecture):
+        """One device: login, verify-face-burst, mark-attendance."""
+        import requests
+
+        delay = start_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        user = self.campus.collections['users'][uid]
+        with requests.Session() as http:
+            login = self._post(http, base_url, 'login', '/api/login',
+                               {'email': user['email'], 'password': user['password']})
+            if login.status != 200:
+                return
+            if self.burst:
+                verify = self._post(http, base_url, 'verify-face-burst', '/api/student/verify-face-burst',
+                                    {'images': self.burst})
+                if verify.status != 200:
+                    return
+            else:
+                self._mark_verified(http)
+            # Within the campus geofence (~50 m of its centre)
+            self._post(http, base_url, 'mark-attendance', '/api/student/mark-attendance', {
+                'lectureId': lecture['id'],
+                'latitude': CAMPUS_LOCATION[0] + self.rng.uniform(-0.0004, 0.0004),
+                'longitude': CAMPUS_LOCATION[1] + self.rng.uniform(-0.0004, 0.0004),
+                'bssid': CAMPUS_BSSID,
+                'bluetoothDeviceId': self.campus.collections['users'][lecture['teacherId']]['bluetoothDeviceId']
+            })
+
+    def run(self):
+        server = _pooled_server(self.app, self.options.server_threads)
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        server_thread = threading.Thread(target=server.serve_forever, name='stampede-server', daemon=True)
+        server_thread.start()
+
+        sessions = []
+        for lecture in self.campus.live_lectures:
+            for uid in self.campus.students_by_class[lecture['branchId']]:
+                arrival = self.rng.uniform(0, self.options.ramp)
+                sessions.append((arrival, uid, lecture))
+                if self.rng.random() < self.options.double_submit:
+                    # A second device a moment later, with its own login and verification
+                    sessions.append((arrival + self.rng.uniform(0, 0.05), uid, lecture))
+        self.session_count = len(sessions)
+
+        started = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=len(sessions), thread_name_prefix='student') as clients:
+                for arrival, uid, lecture in sessions:
+                    clients.submit(self.student_session, base_url, started + arrival, uid, lecture)
+        finally:
+            self.elapsed = time.monotonic() - started
+            server.shutdown()
+            server.server_close()
+
+    def duplicate_writes(self):
+        """(extra rows, students affected) among today's attendance for the live lectures."""
+        today = datetime.now().strftime('%Y-%m-%d')
+        live_ids = [lecture['id'] for lecture in self.campus.live_lectures]
+        rows = Counter()
+        for start in range(0, len(live_ids), 30):
+            query = self.store.collection('attendance').where('lectureId', 'in', live_ids[start:start + 30])
+            for doc in query.stream():
+                record = doc.to_dict()
+                if record.get('date') == today:
+                    rows[(record['studentId'], record['lectureId'])] += 1
+        extra = sum(count - 1 for count in rows.values() if count > 1)
+        return extra, sum(1 for count in rows.values() if count > 1), len(rows)
+
+    def report(self):
+        steps = {}
+        for step in STEPS:
+            results = [r for r in self.results if r.step == step]
+            if not results:
+                continue
+            durations = [r.ms for r in results]
+            errors = [r for r in results if r.status == 0 or r.status >= 400]
+            steps[step] = {
+                'requests': len(results),
+                'errors': len(errors),
+                'errorRate': round(len(errors) / len(results), 4),
+                'p50Ms': round(percentile(durations, 50), 1),
+                'p95Ms': round(percentile(durations, 95), 1),
+                'p99Ms': round(percentile(durations, 99), 1),
+                'maxMs': round(max(durations), 1),
+            }
+        error_kinds = Counter((r.step, r.status, r.error) for r in self.results if r.status == 0 or r.status >= 400)
+        extra, affected, marked = self.duplicate_writes()
+        return {
+            'config': {key: value for key, value in vars(self.options).items() if key != 'json'},
+            'sessions': self.session_count,
+            'elapsedSeconds': round(self.elapsed, 1),
+            'steps': steps,
+            'errors': [{'step': step, 'status': status, 'error': error, 'count': count}
+                       for (step, status, error), count in error_kinds.most_common()],
+            'attendanceMarked': marked,
+            'duplicateWrites': extra,
+            'studentsWithDuplicates': affected,
+            'datastore': {'reads': self.store.reads, 'writes': self.store.writes},
+        }
+
+
+def print_report(report):
+    config = report['config']
+    print(f"{report['sessions']} sessions for {config['lectures']} lectures in {report['elapsedSeconds']} s "
+          f"(ramp {config['ramp']} s, datastore {config['latency_ms']}±{config['jitter_ms']} ms, "
+          f"{config['server_threads']} server threads)")
+    print(f"\n{'step':<18} {'requests':>8} {'errors':>7} {'err %':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for step, s in report['steps'].items():
+        print(f"{step:<18} {s['requests']:>8} {s['errors']:>7} {s['errorRate'] * 100:>6.1f} "
+              f"{s['p50Ms']:>8} {s['p95Ms']:>8} {s['p99Ms']:>8} {s['maxMs']:>8}")
+    if report['errors']:
+        print("\nErrors:")
+        for e in report['errors']:
+            print(f"  {e['count']:>5}  {e['step']:<18} {e['status']:>3}  {e['error']}")
+    print(f"\nAttendance marked: {report['attendanceMarked']}   duplicate writes: {report['duplicateWrites']} "
+          f"({report['studentsWithDuplicates']} students)")
+    print(f"Datastore: {report['datastore']['reads']} reads, {report['datastore']['writes']} writes")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate students marking attendance as lectures start.")
+    parser.add_argument('--lectures', type=int, default=5, help="live lectures (default 5)")
+    parser.add_argument('--class-size', type=int, default=60, help="students per lecture (default 60)")
+    parser.add_argument('--ramp', type=float, default=10.0, help="arrivals spread over this many seconds")
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="datastore round trip (default 20)")
+    parser.add_argument('--jitter-ms', type=float, default=10.0, help="+/- uniform jitter on the round trip")
+    parser.add_argument('--server-threads', type=int, default=8, help="request threads (gunicorn's WEB_THREADS)")
+    parser.add_argument('--double-submit', type=float, default=0.0,
+                        help="fraction of students who submit from two devices at once")
+    parser.add_argument('--face-image', help="photo of one face; enables real verify-face-burst calls")
+    parser.add_argument('--burst-frames', type=int, default=5, help="frames per verify-face-burst call (default 5)")
+    parser.add_argument('--weeks', type=int, default=2, help="weeks of attendance history")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--json', metavar='PATH', help="also write the report here")
+    options = parser.parse_args(argv)
+
+    # Set before app.py is imported (see bench_routes.py)
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    from backend.routes.student_routes import MAX_BURST_FRAMES, MIN_BURST_FRAMES
+    if not MIN_BURST_FRAMES <= options.burst_frames <= MAX_BURST_FRAMES:
+        parser.error(f"--burst-frames must be between {MIN_BURST_FRAMES} and {MAX_BURST_FRAMES}")
+    os.environ.setdefault('FACE_INDEX_DIR', tempfile.mkdtemp(prefix='stampede-face-index-'))
+    logging.disable(logging.CRITICAL)
+
+    stampede = Stampede(options)
+    stampede.run()
+    report = stampede.report()
+    print_report(report)
+    if options.json:
+        with open(options.json, 'w') as out:
+            json.dump(report, out, indent=2)
+        print(f"Wrote {options.json}")
+    return 1 if report['duplicateWrites'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
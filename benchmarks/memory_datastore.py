@@ -0,0 +1,443 @@
+"""
+In-process stand-in for the Firestore client.
+
+Implements the part of the google-cloud-firestore API the route modules use:
+collection/document references, where/order_by/limit/offset queries,
+start_after cursors on the default (document id) order, count() aggregations,
+stream/get, create/set/update/delete/add, write batches, SERVER_TIMESTAMP and
+Increment. It
+follows Firestore's semantics where they affect results:
+
+- documents missing a filtered or ordered field are excluded;
+- values only compare with values of the same type (numbers together);
+- 'in' and 'not-in' accept at most 30 values and a batch at most 500 writes.
+  Breaking a limit raises ValueError, as the real client would fail.
+
+Equality filters are served from per-field hash indexes that are built on
+first use and kept up to date on writes. Without them, the large benchmark
+datasets would be scanned in full on every query.
+
+`latency_ms`/`jitter_ms` add a sleep to every round trip (document get,
+query, write, batch commit), outside the client's lock. The calling thread
+then waits on the "network" as it would with Firestore, while other requests
+carry on.
+"""
+import random
+import string
+import threading
+import time
+from datetime import datetime, timezone
+from numbers import Number
+
+from google.api_core.exceptions import AlreadyExists
+
+MAX_DISJUNCTIONS = 30
+MAX_BATCH_WRITES = 500
+
+_MISSING = object()
+
+
+def _is_server_timestamp(value):
+    return type(value).__name__ == 'Sentinel' and 'timestamp' in repr(value).lower()
+
+
+def _resolve(data, existing=None):
+    """Replaces SERVER_TIMESTAMP sentinels with the current time and applies Increment transforms."""
+    now = None
+    resolved = {}
+    for key, value in data.items():
+        if _is_server_timestamp(value):
+            now = now or datetime.now(timezone.utc)
+            value = now
+        elif type(value).__name__ == 'Increment':
+            current = (existing or {}).get(key)
+            value = (current if isinstance(current, Number) and not isinstance(current, bool) else 0) + value.value
+        resolved[key] = value
+    return resolved
+
+
+def _comparable(a, b):
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b)
+    if isinstance(a, Number) and isinstance(b, Number):
+        return True
+    return type(a) is type(b)
+
+
+def _matches(value, op, target):
+    if value is _MISSING:
+        return False
+    if op == '==':
+        return _comparable(value, target) and value == target
+    if op == '!=':
+        return not (_comparable(value, target) and value == target)
+    if op == 'in':
+        return any(_comparable(value, t) and value == t for t in target)
+    if op == 'not-in':
+        return not any(_comparable(value, t) and value == t for t in target)
+    if op == 'array-contains':
+        return isinstance(value, list) and target in value
+    if op == 'array-contains-any':
+        return isinstance(value, list) and any(t in value for t in target)
+    if not _comparable(value, target):
+        return False
+    if op == '<':
+        return value < target
+    if op == '<=':
+        return value <= target
+    if op == '>':
+        return value > target
+    if op == '>=':
+        return value >= target
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+def _hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+class _Collection:
+    """Documents of one collection path and their equality indexes."""
+
+    def __init__(self):
+        self.docs = {}
+        self.indexes = {}
+
+    def index(self, field):
+        index = self.indexes.get(field)
+        if index is None:
+            index = {}
+            for doc_id, data in self.docs.items():
+                self._index_value(index, field, data, doc_id)
+            self.indexes[field] = index
+        return index
+
+    @staticmethod
+    def _index_value(index, field, data, doc_id):
+        value = data.get(field, _MISSING)
+        if value is not _MISSING and _hashable(value):
+            index.setdefault((type(value) is bool, value), set()).add(doc_id)
+
+    def put(self, doc_id, data):
+        old = self.docs.get(doc_id)
+        for field, index in self.indexes.items():
+            if old is not None:
+                value = old.get(field, _MISSING)
+                if value is not _MISSING and _hashable(value):
+                    index.get((type(value) is bool, value), set()).discard(doc_id)
+            if data is not None:
+                self._index_value(index, field, data, doc_id)
+        if data is None:
+            self.docs.pop(doc_id, None)
+        else:
+            self.docs[doc_id] = data
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self._data = data
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        if self._data is None:
+            return None
+        # Fresh containers, as the real client returns decoded copies
+        return {k: (list(v) if isinstance(v, list) else dict(v) if isinstance(v, dict) else v)
+                for k, v in self._data.items()}
+
+    def get(self, field):
+        return self._data.get(field) if self._data else None
+
+
+class DocumentReference:
+    def __init__(self, client, collection_path, doc_id):
+        self._client = client
+        self._collection_path = collection_path
+        self.id = doc_id
+
+    @property
+    def path(self):
+        return f"{self._collection_path}/{self.id}"
+
+    def get(self, *args, **kwargs):
+        self._client._rpc()
+        with self._client._lock:
+            data = self._client._collection(self._collection_path).docs.get(self.id)
+            self._client.reads += 1
+        return DocumentSnapshot(self, data)
+
+    def create(self, document_data):
+        """Writes a new document; raises AlreadyExists if it is already there."""
+        self._client._rpc()
+        self._client._write(self._collection_path, self.id, document_data, must_not_exist=True)
+
+    def set(self, document_data, merge=False):
+        self._client._rpc()
+        self._client._write(self._collection_path, self.id, document_data, merge=merge)
+
+    def update(self, field_updates):
+        self._client._rpc()
+        self._client._write(self._collection_path, self.id, field_updates, merge=True, must_exist=True)
+
+    def delete(self):
+        self._client._rpc()
+        self._client._write(self._collection_path, self.id, None)
+
+    def collection(self, collection_id):
+        return CollectionReference(self._client, f"{self.path}/{collection_id}")
+
+
+class Query:
+    ASCENDING = 'ASCENDING'
+    DESCENDING = 'DESCENDING'
+
+    def __init__(self, client, path, filters=(), orders=(), limit=None, offset=0, start_after=None):
+        self._client = client
+        self._path = path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._offset = offset
+        self._start_after = start_after
+
+    def _copy(self, **changes):
+        state = dict(filters=self._filters, orders=self._orders, limit=self._limit, offset=self._offset,
+                     start_after=self._start_after)
+        state.update(changes)
+        return Query(self._client, self._path, **state)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string in ('in', 'not-in', 'array-contains-any'):
+            if len(value) > MAX_DISJUNCTIONS:
+                raise ValueError(f"'{op_string}' filters support a maximum of {MAX_DISJUNCTIONS} elements in the value array.")
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction=ASCENDING):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def offset(self, count):
+        return self._copy(offset=count)
+
+    def start_after(self, document):
+        """Continues after `document` (a snapshot). Only the default order is supported."""
+        if self._orders:
+            raise NotImplementedError("start_after is only supported without order_by")
+        return self._copy(start_after=document.id)
+
+    def _candidates(self, collection):
+        """Doc ids worth checking: narrowed by the first indexable equality filter."""
+        for field, op, value in self._filters:
+            if op == '==' and _hashable(value):
+                return set(collection.index(field).get((type(value) is bool, value), ()))
+            if op == 'in' and all(_hashable(v) for v in value):
+                index = collection.index(field)
+                return set().union(*(index.get((type(v) is bool, v), ()) for v in value)) if value else set()
+        return collection.docs.keys()
+
+    def _rows(self):
+        """(doc_id, data) pairs the query returns. Call with the client's lock held."""
+        collection = self._client._collection(self._path)
+        rows = []
+        for doc_id in self._candidates(collection):
+            if self._start_after is not None and doc_id <= self._start_after:
+                continue
+            data = collection.docs.get(doc_id)
+            if data is None:
+                continue
+            if all(_matches(data.get(field, _MISSING), op, value) for field, op, value in self._filters):
+                if all(field in data for field, _ in self._orders):
+                    rows.append((doc_id, data))
+        # Firestore returns documents in id order unless asked otherwise
+        rows.sort(key=lambda row: row[0])
+        for field, direction in reversed(self._orders):
+            rows.sort(key=lambda row: row[1][field], reverse=direction == Query.DESCENDING)
+        rows = rows[self._offset:]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        return rows
+
+    def _run(self):
+        self._client._rpc()
+        with self._client._lock:
+            rows = self._rows()
+            self._client.reads += max(len(rows), 1)  # An empty result still costs one read
+        return [DocumentSnapshot(DocumentReference(self._client, self._path, doc_id), data) for doc_id, data in rows]
+
+    def stream(self, *args, **kwargs):
+        yield from self._run()
+
+    def get(self, *args, **kwargs):
+        return self._run()
+
+    def count(self, alias=None):
+        return AggregationQuery(self, alias or 'field_1')
+
+
+class AggregationResult:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+
+class AggregationQuery:
+    """A count() over a query. Firestore bills one read per 1000 documents counted."""
+
+    def __init__(self, query, alias):
+        self._query = query
+        self._alias = alias
+
+    def get(self, *args, **kwargs):
+        client = self._query._client
+        client._rpc()
+        with client._lock:
+            value = len(self._query._rows())
+            client.reads += max(1, value // 1000)
+        return [[AggregationResult(self._alias, value)]]
+
+    def stream(self, *args, **kwargs):
+        yield from self.get()
+
+
+class CollectionReference(Query):
+    def __init__(self, client, path):
+        super().__init__(client, path)
+
+    @property
+    def id(self):
+        return self._path.rsplit('/', 1)[-1]
+
+    def document(self, document_id=None):
+        return DocumentReference(self._client, self._path, document_id or self._client._auto_id())
+
+    def add(self, document_data, document_id=None):
+        reference = self.document(document_id)
+        reference.set(document_data)
+        return datetime.now(timezone.utc), reference
+
+
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def _queue(self, write):
+        if len(self._writes) >= MAX_BATCH_WRITES:
+            raise ValueError(f"A batch can contain at most {MAX_BATCH_WRITES} writes.")
+        self._writes.append(write)
+
+    def set(self, reference, document_data, merge=False):
+        self._queue((reference, document_data, merge, False))
+
+    def update(self, reference, field_updates):
+        self._queue((reference, field_updates, True, True))
+
+    def delete(self, reference):
+        self._queue((reference, None, False, False))
+
+    def commit(self):
+        self._client._rpc()
+        with self._client._lock:
+            # All or nothing: check updates before applying any write
+            for reference, _, _, must_exist in self._writes:
+                if must_exist and reference.id not in self._client._collection(reference._collection_path).docs:
+                    raise KeyError(f"No document to update: {reference.path}")
+            for reference, data, merge, must_exist in self._writes:
+                self._client._write(reference._collection_path, reference.id, data, merge=merge, must_exist=must_exist)
+        writes, self._writes = self._writes, []
+        return [datetime.now(timezone.utc)] * len(writes)
+
+
+class MemoryClient:
+    """Drop-in for firestore.client() backed by dictionaries."""
+
+    def __init__(self, seed=0, latency_ms=0.0, jitter_ms=0.0):
+        self._collections = {}
+        self._lock = threading.RLock()
+        self._ids = random.Random(seed)
+        self._latency = random.Random(seed)
+        self._undo = None
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.reads = 0
+        self.writes = 0
+
+    def _rpc(self):
+        """Called once per simulated round trip; sleeps for the configured latency."""
+        if self.latency_ms or self.jitter_ms:
+            delay = self.latency_ms + self._latency.uniform(-self.jitter_ms, self.jitter_ms)
+            time.sleep(max(delay, 0) / 1000)
+
+    def _collection(self, path):
+        collection = self._collections.get(path)
+        if collection is None:
+            collection = self._collections[path] = _Collection()
+        return collection
+
+    def _auto_id(self):
+        with self._lock:
+            return ''.join(self._ids.choices(string.ascii_letters + string.digits, k=20))
+
+    def _write(self, path, doc_id, data, merge=False, must_exist=False, must_not_exist=False):
+        with self._lock:
+            collection = self._collection(path)
+            existing = collection.docs.get(doc_id)
+            if must_exist and existing is None:
+                raise KeyError(f"No document to update: {path}/{doc_id}")
+            if must_not_exist and existing is not None:
+                raise AlreadyExists(f"Document already exists: {path}/{doc_id}")
+            if data is not None:
+                data = _resolve(data, existing if merge else None)
+                if merge and existing is not None:
+                    data = {**existing, **data}
+            if self._undo is not None:
+                self._undo.append((path, doc_id, existing))
+            # Documents are replaced, never mutated, so snapshots handed out stay valid
+            collection.put(doc_id, data)
+            self.writes += 1
+
+    def collection(self, collection_id):
+        return CollectionReference(self, collection_id)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def load(self, collections):
+        """Bulk insert {collection: {doc_id: data}} without going through the write path."""
+        with self._lock:
+            for path, docs in collections.items():
+                collection = self._collection(path)
+                for doc_id, data in docs.items():
+                    collection.put(doc_id, dict(data))
+
+    def checkpoint(self):
+        """Starts recording writes so rollback() can undo them."""
+        with self._lock:
+            self._undo = []
+
+    def rollback(self):
+        """Undoes every write since checkpoint(), keeping the indexes built so far."""
+        with self._lock:
+            for path, doc_id, previous in reversed(self._undo or []):
+                self._collection(path).put(doc_id, previous)
+            self._undo = None
+
+    def count(self, path):
+        with self._lock:
+            return len(self._collection(path).docs)
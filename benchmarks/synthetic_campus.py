@@ -0,0 +1,269 @@
+"""
+Deterministic synthetic campus for benchmarks and load tests.
+
+generate_campus(CampusSpec(...)) returns every collection the app reads, as
+{collection: {doc_id: data}}, in the shapes written by the admin routes and
+seed_database.py. The same spec and seed always give the same data. Classes
+follow seed_database.py's '<BRANCH>_Y<year>_<division>' ids. Every class has
+a clash-free weekly timetable, and attendance is generated for the past
+`weeks` of lectures.
+
+With `live_at`, the first `live_lectures` classes get a lecture running at
+that moment. The teacher live-lecture and mark-attendance paths then have
+something to work on whatever time the benchmark runs.
+
+For datasets too big to hold in memory (seed_database.py), call
+generate_campus(spec, attendance=False) and stream the attendance records
+from iter_attendance(campus).
+"""
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+BRANCHES = [
+    ("CSE", "Computer Science"), ("IT", "Information Technology"), ("MECH", "Mechanical Engineering"),
+    ("CIVIL", "Civil Engineering"), ("EEE", "Electrical Engineering"), ("ECE", "Electronics & Communication"),
+]
+DIVISIONS_PER_BLOCK = 3
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+SLOT_TIMES = [("09:00", "10:00"), ("10:00", "11:00"), ("11:15", "12:15"), ("13:00", "14:00"), ("14:00", "15:00")]
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Vihaan", "Arjun", "Sai", "Reyansh", "Krishna", "Ishaan", "Shaurya",
+               "Ananya", "Diya", "Pari", "Aadhya", "Navya", "Ira", "Anika", "Myra", "Aarohi", "Saanvi"]
+LAST_NAMES = ["Patel", "Sharma", "Iyer", "Nair", "Menon", "Reddy", "Rao", "Kumar", "Gupta", "Singh",
+              "Chopra", "Joshi", "Mehta", "Deshmukh", "Banerjee", "Mukherjee", "Das", "Roy", "Chatterjee", "Verma"]
+COURSES = ["Mathematics", "Physics", "Chemistry", "Data Structures", "DBMS", "Operating Systems",
+           "Computer Networks", "AI & ML", "Web Development", "Cloud Computing", "Cyber Security",
+           "Thermodynamics", "Strength of Materials", "Circuit Theory", "Digital Electronics"]
+
+CAMPUS_LOCATION = (18.5204, 73.8567)
+CAMPUS_BSSID = "AA:BB:CC:DD:EE:01"
+
+
+@dataclass
+class CampusSpec:
+    students: int = 120
+    teachers: int = 10
+    class_size: int = 60
+    slots_per_day: int = 5
+    weeks: int = 2
+    present_rate: float = 0.85
+    face_encodings: bool = True
+    live_at: datetime = None
+    live_lectures: int = 1
+    seed: int = 7
+    end_date: datetime = None  # Last day of generated attendance (default: live_at or today)
+    rate_spread: float = 0.0  # Std. dev. of each student's own present rate around present_rate
+
+
+SIZES = {
+    'small': CampusSpec(students=120, teachers=10, weeks=2),
+    'medium': CampusSpec(students=600, teachers=30, weeks=4),
+    'large': CampusSpec(students=2400, teachers=80, weeks=4),
+}
+
+
+@dataclass
+class Campus:
+    """Generated collections plus the ids benchmarks need to address them."""
+    spec: CampusSpec
+    collections: dict
+    admin_id: str = "ADMIN001"
+    classes: list = field(default_factory=list)        # (branchId, year, division)
+    students_by_class: dict = field(default_factory=dict)
+    live_lectures: list = field(default_factory=list)  # timetable entries with 'id'
+    rng: random.Random = field(default=None, repr=False)  # Continues into iter_attendance
+    present_rates: dict = field(default_factory=dict, repr=False)
+
+    def document_count(self):
+        return sum(len(docs) for docs in self.collections.values())
+
+
+def _division_name(index):
+    """A, B, ..., Z, AA, AB, ..."""
+    name = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(ord("A") + remainder) + name
+    return name
+
+
+def _class_ids(count):
+    # Divisions A-C of every branch and year first, then D-F, and so on
+    ids = []
+    block = 0
+    while len(ids) < count:
+        for year in range(1, 5):
+            for branch_id, _ in BRANCHES:
+                for d in range(block * DIVISIONS_PER_BLOCK, (block + 1) * DIVISIONS_PER_BLOCK):
+                    division = _division_name(d)
+                    ids.append((f"{branch_id}_Y{year}_{division}", year, division))
+        block += 1
+    return ids[:count]
+
+
+def _minutes(hhmm):
+    hours, minutes = hhmm.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def _hhmm(minutes):
+    minutes = max(0, min(minutes, 23 * 60 + 59))
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def generate_campus(spec, attendance=True):
+    """The campus for `spec`; without `attendance`, records are left to iter_attendance()."""
+    rng = random.Random(spec.seed)
+    users, branches, courses, rooms, timetable = {}, {}, {}, {}, {}
+    face_encodings = {}
+
+    users["ADMIN001"] = {"adminId": "ADMIN001", "name": "System Admin", "role": "Admin",
+                         "email": "admin@college.edu", "password": "admin123"}
+
+    teacher_ids = []
+    for i in range(spec.teachers):
+        tid = f"T{i + 1:03d}"
+        teacher_ids.append(tid)
+        users[tid] = {
+            "teacherId": tid, "prefix": rng.choice(["Dr.", "Prof.", "Mr.", "Ms."]),
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", "role": "Teacher",
+            "email": f"{tid.lower()}@college.edu", "password": tid,
+            "bluetoothDeviceId": ':'.join(f"{rng.randint(0, 255):02X}" for _ in range(6))
+        }
+
+    for i, name in enumerate(COURSES, 1):
+        courses[f"C{i:03d}"] = {"courseCode": f"C{i:03d}", "courseName": name}
+
+    class_count = max(1, -(-spec.students // spec.class_size))
+    if spec.teachers < class_count:
+        raise ValueError(f"A clash-free timetable needs a teacher per class: {class_count} classes, "
+                         f"{spec.teachers} teachers.")
+    classes = _class_ids(class_count)
+    branch_names = dict(BRANCHES)
+    for class_index, (branch_id, year, division) in enumerate(classes):
+        branches[branch_id] = {"branchId": branch_id, "branchName": branch_names[branch_id.split('_')[0]],
+                               "name": branch_names[branch_id.split('_')[0]], "year": year, "division": division}
+        rooms[f"Room-{101 + class_index}"] = {"roomNumber": f"Room-{101 + class_index}"}
+
+    # Timetable: class c, day d, slot s is taught by teacher (c + d + s) % T, so
+    # no teacher has two classes in one slot as long as T >= number of classes
+    slots = SLOT_TIMES[:spec.slots_per_day]
+    for class_index, (branch_id, year, division) in enumerate(classes):
+        for day_index, day in enumerate(DAYS):
+            for slot_index, (start, end) in enumerate(slots):
+                lecture_id = f"L-{branch_id}-{day[:3]}-{slot_index + 1}"
+                course_code = f"C{(class_index + day_index + slot_index) % len(COURSES) + 1:03d}"
+                timetable[lecture_id] = {
+                    "branchId": branch_id, "year": year, "division": division, "day": day,
+                    "lectureNumber": slot_index + 1, "courseCode": course_code,
+                    "teacherId": teacher_ids[(class_index + day_index + slot_index) % len(teacher_ids)],
+                    "roomNumber": f"Room-{101 + class_index}", "startTime": start, "endTime": end
+                }
+
+    live = []
+    if spec.live_at is not None:
+        day = spec.live_at.strftime("%A")
+        now_minutes = spec.live_at.hour * 60 + spec.live_at.minute
+        start, end = now_minutes - 10, now_minutes + 50
+        for class_index, (branch_id, year, division) in enumerate(classes[:spec.live_lectures]):
+            teacher_id = teacher_ids[class_index % len(teacher_ids)]
+            # Drop whatever the class or the teacher had overlapping the live slot
+            for other_id, other in list(timetable.items()):
+                if (other["day"] == day and (other["teacherId"] == teacher_id or other["branchId"] == branch_id)
+                        and _minutes(other["startTime"]) <= end and _minutes(other["endTime"]) >= start):
+                    del timetable[other_id]
+            lecture_id = f"L-{branch_id}-LIVE"
+            timetable[lecture_id] = {
+                "branchId": branch_id, "year": year, "division": division, "day": day,
+                "lectureNumber": spec.slots_per_day + 1, "courseCode": "C001", "teacherId": teacher_id,
+                "roomNumber": f"Room-{101 + class_index}", "startTime": _hhmm(start), "endTime": _hhmm(end)
+            }
+            live.append({**timetable[lecture_id], "id": lecture_id})
+
+    students_by_class, present_rates = {}, {}
+    for i in range(spec.students):
+        branch_id, year, division = classes[i // spec.class_size]
+        uid = f"U{i + 1:05d}"
+        student_id = f"S{i + 1:05d}"
+        users[uid] = {
+            "studentId": student_id, "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "role": "Student", "email": f"{student_id.lower()}@student.college.edu", "password": student_id,
+            "branchId": branch_id, "year": year, "division": division
+        }
+        students_by_class.setdefault(branch_id, []).append(uid)
+        if spec.rate_spread:
+            present_rates[uid] = min(1.0, max(0.3, rng.gauss(spec.present_rate, spec.rate_spread)))
+        if spec.face_encodings:
+            face_encodings[f"F{i + 1:05d}"] = {
+                "studentId": student_id, "userId": uid,
+                "encoding": [round(rng.gauss(0, 0.1), 6) for _ in range(128)]
+            }
+
+    collections = {
+        "users": users, "branches": branches, "courses": courses, "rooms": rooms, "timetable": timetable,
+        "attendance": {}, "face_encodings": face_encodings,
+        "locations": {"campus": {"place": "Main Campus", "location": _geopoint(*CAMPUS_LOCATION), "radius": 300}},
+        "wifi_networks": {"campus-wifi": {"ssid": "CampusNet", "bssid": CAMPUS_BSSID}},
+    }
+    campus = Campus(spec=spec, collections=collections, classes=classes,
+                    students_by_class=students_by_class, live_lectures=live, rng=rng,
+                    present_rates=present_rates)
+    if attendance:
+        collections["attendance"] = dict(iter_attendance(campus))
+    return campus
+
+
+def iter_attendance(campus):
+    """
+    Yields (doc_id, record) for the past `weeks` of lectures: Present records,
+    plus Absent for some misses. Live lectures get no history: the duplicate
+    check ignores the date, so any past record would make mark-attendance
+    fail for that student.
+    """
+    spec, rng = campus.spec, campus.rng
+    users, timetable = campus.collections["users"], campus.collections["timetable"]
+    live_ids = {entry["id"] for entry in campus.live_lectures}
+    lectures_by_class_day = {}
+    for lecture_id, entry in timetable.items():
+        lectures_by_class_day.setdefault((entry["branchId"], entry["day"]), []).append(lecture_id)
+    for ids in lectures_by_class_day.values():
+        ids.sort(key=lambda lecture_id: timetable[lecture_id]["lectureNumber"])
+
+    end_date = (spec.end_date or spec.live_at or datetime.now()).date()
+    record = 0
+    for offset in range(1, spec.weeks * 7 + 1):
+        date = end_date - timedelta(days=offset)
+        day = date.strftime("%A")
+        if day not in DAYS:
+            continue
+        date_str = date.isoformat()
+        for branch_id, year, division in campus.classes:
+            for lecture_id in lectures_by_class_day.get((branch_id, day), ()):
+                if lecture_id in live_ids:
+                    continue
+                entry = timetable[lecture_id]
+                start_minutes = _minutes(entry["startTime"])
+                for uid in campus.students_by_class.get(branch_id, ()):
+                    present_rate = campus.present_rates.get(uid, spec.present_rate)
+                    roll = rng.random()
+                    if roll < present_rate:
+                        status = "Present"
+                    elif roll < present_rate + (1 - present_rate) / 2:
+                        status = "Absent"
+                    else:
+                        continue
+                    record += 1
+                    yield f"A{record:08d}", {
+                        "studentId": users[uid]["studentId"], "lectureId": lecture_id, "date": date_str,
+                        "courseCode": entry["courseCode"], "status": status,
+                        "timestamp": datetime(date.year, date.month, date.day, start_minutes // 60, start_minutes % 60,
+                                              rng.randint(0, 59), tzinfo=timezone.utc),
+                        "validationMethod": "GPS+WiFi+Bluetooth+Face"
+                    }
+
+
+def _geopoint(latitude, longitude):
+    # The routes check isinstance(..., firestore.GeoPoint), so use the real type
+    from firebase_admin import firestore
+    return firestore.GeoPoint(latitude, longitude)
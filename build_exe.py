@@ -21,6 +21,12 @@ PyInstaller.__main__.run([
     '--add-data=.env;.',
     f'--add-data={models_path};face_recognition_models', # Crucial fix for "Unable to open ... dat" error
     '--hidden-import=flask_cors',
+    # The face stack is imported lazily (backend/utils/face_pipeline.py), so
+    # PyInstaller cannot discover it by static analysis
+    '--hidden-import=face_recognition',
+    '--hidden-import=cv2',
+    '--hidden-import=numpy',
+    '--hidden-import=PIL.Image',
     '--clean',
     '--exclude-module=PyQt6',
     '--exclude-module=PyQt5',
@@ -1,56 +1,240 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
-
-# --- Initialize Firestore ---
-# Make sure your serviceAccountKey.json is in the same folder
-try:
-    cred = credentials.Certificate("serviceAccountKey.json")
-    firebase_admin.initialize_app(cred)
-    db = firestore.client()
-except Exception as e:
-    print(f"Error initializing Firebase: {e}")
-    print("Please ensure 'serviceAccountKey.json' is present and valid.")
-    exit()
-
-def delete_collection(coll_ref, batch_size):
-    """
-    Deletes all documents in a collection in batches.
-    """
-    docs = coll_ref.limit(batch_size).stream()
-    deleted = 0
+"""
+Deletes the app's collections from Firestore, in batches of 500.
 
-    for doc in docs:
-        doc.reference.delete()
-        deleted += 1
+    python clear_db.py                          # every app collection (asks first)
+    python clear_db.py --dry-run                # only count what would be deleted
+    python clear_db.py --collections attendance,audit_logs --yes
+    python clear_db.py --branch CSE_Y1_A        # one class: students, timetable, attendance, face encodings
+    python clear_db.py --branch CSE             # every class of a branch
 
-    # Recurse until the collection is empty
-    if deleted >= batch_size:
-        return delete_collection(coll_ref, batch_size)
+Each collection is paged with a query cursor, and every page is deleted as
+one batch on a shared pool of --workers threads. Collections are purged
+concurrently. Progress (documents deleted and documents/s) is printed every
+second, and a per-collection summary at the end.
 
+With --branch, only the collections that belong to a class are touched:
+- users, timetable and branches, by branchId;
+- attendance, by the class's lecture ids;
+- face_encodings, by its students' ids.
+Courses, rooms and audit logs are shared and are left alone.
+"""
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-# --- Main Deletion Logic ---
+BATCH_SIZE = 500  # Firestore's limit on writes per batch
+MAX_DISJUNCTIONS = 30  # Values allowed in one 'in' filter
+COMMIT_ATTEMPTS = 3
 
-# Add the names of all collections you want to clear to this list.
-# I've included all the ones we've discussed.
-collections_to_delete = [
-    'users', 
-    'teachers', # To remove the old, obsolete collection
-    'courses', 
-    'rooms', 
+DEFAULT_COLLECTIONS = [
+    'users',
+    'teachers',  # Obsolete collection from older versions
+    'courses',
+    'rooms',
     'branches',
-    'timetable' # Clearing timetable entries as well
+    'timetable',
+    'attendance',
+    'face_encodings',
+    'face_verifications',
+    'audit_logs',
 ]
+BRANCH_SCOPED = ('users', 'branches', 'timetable', 'attendance', 'face_encodings')
+
+
+class Progress:
+    """Thread-safe per-collection counters, printed on one updating line."""
+
+    def __init__(self, names):
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(names, 0)
+        self.finished = {}
+        self.started = time.monotonic()
+
+    def add(self, name, count):
+        with self._lock:
+            self.counts[name] += count
+            self.finished[name] = time.monotonic()
+
+    def line(self):
+        with self._lock:
+            total = sum(self.counts.values())
+            parts = [f"{name} {count:,}" for name, count in self.counts.items() if count]
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return f"{total:>12,} documents  {total / elapsed:>9,.0f}/s  {' | '.join(parts)}"
+
+
+class BatchDeleter:
+    """Deletes pages of document references as batches on a bounded thread pool."""
+
+    def __init__(self, client, progress, workers):
+        self.client = client
+        self.progress = progress
+        self.errors = []
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='purge')
+        self._slots = threading.BoundedSemaphore(workers * 2)
+
+    def submit(self, name, references):
+        if self.errors:
+            raise self.errors[0]
+        self._slots.acquire()
+        self._pool.submit(self._delete, name, references)
+
+    def _delete(self, name, references):
+        try:
+            for attempt in range(COMMIT_ATTEMPTS):
+                batch = self.client.batch()
+                for reference in references:
+                    batch.delete(reference)
+                try:
+                    batch.commit()
+                    break
+                except Exception:
+                    if attempt == COMMIT_ATTEMPTS - 1:
+                        raise
+                    time.sleep(2 ** attempt)
+            self.progress.add(name, len(references))
+        except Exception as e:
+            self.errors.append(e)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        if self.errors:
+            raise self.errors[0]
+
+
+def branch_queries(db, branch):
+    """
+    {collection: [queries]} selecting one class ('CSE_Y1_A') or every class
+    of a branch ('CSE').
+    """
+    def scoped(name):
+        query = db.collection(name)
+        if '_' in branch:
+            return query.where('branchId', '==', branch)
+        return query.where('branchId', '>=', branch + '_').where('branchId', '<', branch + '_\uf8ff')
+
+    def chunked_in(name, field, values):
+        return [db.collection(name).where(field, 'in', values[i:i + MAX_DISJUNCTIONS])
+                for i in range(0, len(values), MAX_DISJUNCTIONS)]
 
-print("🧹 Starting to clean the pantry (deleting collections)...")
+    # Resolve lectures and students first: their own documents are deleted too
+    lecture_ids = [doc.id for doc in scoped('timetable').stream()]
+    student_ids = [doc.to_dict().get('studentId') for doc in scoped('users').stream()]
+    return {
+        'users': [scoped('users')],
+        'branches': [scoped('branches')],
+        'timetable': [scoped('timetable')],
+        'attendance': chunked_in('attendance', 'lectureId', lecture_ids),
+        'face_encodings': chunked_in('face_encodings', 'studentId', [sid for sid in student_ids if sid]),
+    }
 
-for coll_name in collections_to_delete:
+
+def purge_query(query, name, deleter, progress, dry_run, page_size=BATCH_SIZE):
+    """Pages through `query` with a cursor, deleting (or just counting) each page."""
+    last = None
+    while True:
+        page = query.limit(page_size) if last is None else query.start_after(last).limit(page_size)
+        docs = list(page.stream())
+        if not docs:
+            return
+        if dry_run:
+            progress.add(name, len(docs))
+        else:
+            deleter.submit(name, [doc.reference for doc in docs])
+        if len(docs) < page_size:
+            return
+        last = docs[-1]
+
+
+def purge(db, queries, workers=8, dry_run=False, show_progress=True):
+    """
+    Purges {collection: [queries]} concurrently.
+    Returns {collection: (documents, seconds)}.
+    """
+    progress = Progress(queries)
+    deleter = BatchDeleter(db, progress, workers)
+    done = threading.Event()
+
+    def report():
+        while not done.wait(1):
+            print(f"\r   {progress.line()}", end="", flush=True)
+
+    reporter = threading.Thread(target=report, daemon=True)
+    if show_progress:
+        reporter.start()
     try:
-        coll_ref = db.collection(coll_name)
-        print(f"\nAttempting to delete all documents in '{coll_name}'...")
-        delete_collection(coll_ref, 100) # Deleting 100 documents at a time
-        print(f"✅ Successfully cleared '{coll_name}'.")
+        with ThreadPoolExecutor(max_workers=max(1, len(queries)), thread_name_prefix='page') as pagers:
+            futures = [pagers.submit(purge_query, query, name, deleter, progress, dry_run)
+                       for name, name_queries in queries.items() for query in name_queries]
+            for future in futures:
+                future.result()
+    finally:
+        deleter.close()
+        done.set()
+    if show_progress:
+        reporter.join()
+        print(f"\r   {progress.line()}")
+    return {name: (count, progress.finished.get(name, progress.started) - progress.started)
+            for name, count in progress.counts.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Delete the app's Firestore collections in batches.")
+    parser.add_argument('--collections', help=f"comma-separated (default: {', '.join(DEFAULT_COLLECTIONS)})")
+    parser.add_argument('--branch', help="only one class (CSE_Y1_A) or branch (CSE)")
+    parser.add_argument('--dry-run', action='store_true', help="count the documents, delete nothing")
+    parser.add_argument('--workers', type=int, default=8, help="batches deleted in parallel")
+    parser.add_argument('--credentials', default='serviceAccountKey.json')
+    parser.add_argument('--yes', action='store_true', help="don't ask for confirmation")
+    options = parser.parse_args(argv)
+
+    names = [name.strip() for name in options.collections.split(',')] if options.collections else DEFAULT_COLLECTIONS
+    if options.branch:
+        skipped = [name for name in names if name not in BRANCH_SCOPED]
+        names = [name for name in names if name in BRANCH_SCOPED]
+        if skipped:
+            print(f"ℹ️ Not branch-specific, left alone: {', '.join(skipped)}")
+
+    scope = f"documents of '{options.branch}' in" if options.branch else "every document in"
+    if not options.dry_run and not options.yes:
+        if input(f"Delete {scope} {', '.join(names)}? [y/N] ").strip().lower() != 'y':
+            print("Aborted.")
+            return 1
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    try:
+        if not firebase_admin._apps:
+            firebase_admin.initialize_app(credentials.Certificate(options.credentials))
+        db = firestore.client()
     except Exception as e:
-        # This can happen if a collection doesn't exist, which is fine.
-        print(f"Could not process collection '{coll_name}'. It might not exist. Error: {e}")
+        print(f"Error initializing Firebase: {e}")
+        print(f"Please ensure '{options.credentials}' is present and valid.")
+        return 1
+
+    if options.branch:
+        queries = {name: query for name, query in branch_queries(db, options.branch).items() if name in names}
+    else:
+        queries = {name: [db.collection(name)] for name in names}
+
+    print("🔎 Counting documents (dry run)..." if options.dry_run else "🧹 Deleting collections...")
+    results = purge(db, queries, workers=options.workers, dry_run=options.dry_run)
+    if not options.dry_run:
+        from backend.utils.shared_versions import publish_bulk_change
+        publish_bulk_change(db)  # Running servers drop their cached copies
+
+    verb = "would delete" if options.dry_run else "deleted"
+    for name, (count, seconds) in results.items():
+        rate = f"{count / seconds:,.0f}/s" if count and seconds else "-"
+        print(f"✅ {name:<16} {verb} {count:>10,}  ({seconds:.1f} s, {rate})")
+    total = sum(count for count, _ in results.values())
+    print(f"\n✨ {total:,} documents {verb}.")
+    return 0
+
 
-print("\n✨ Pantry cleaning complete! Your Firestore is ready for fresh data.")
\ No newline at end of file
+if __name__ == '__main__':
+    sys.exit(main())
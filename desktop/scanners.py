@@ -0,0 +1,364 @@
+"""
+Pluggable WiFi and Bluetooth scanner backends for the desktop app.
+
+Every backend shells out to a platform tool through a command runner and
+parses its text output. The runner can be swapped for a ReplayRunner fed by
+recorded command output, so the parsers can be tested and benchmarked on any
+machine:
+
+    python -m desktop.scanners --replay tests/fixtures/scans --bench 2000
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+
+MAC_PATTERN = re.compile(r'([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})')
+# Windows Bluetooth device ids end in the bare 12-digit address, e.g. ...&0&222213C7C8FE_C00000000
+DEVICE_ID_MAC_PATTERN = re.compile(r'(?:&|_|\\)([0-9A-Fa-f]{12})(?:_|$)')
+
+
+def format_mac(raw):
+    """'222213c7c8fe' or '22-22-13-C7-C8-FE' -> '22:22:13:C7:C8:FE'."""
+    digits = re.sub(r'[^0-9A-Fa-f]', '', raw).upper()
+    return ':'.join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+# --------------------------------------------------------------------------
+# Command runners
+# --------------------------------------------------------------------------
+class CommandRunner:
+    """Runs scanner commands for real."""
+
+    def available(self, args):
+        return shutil.which(args[0]) is not None
+
+    def run(self, args, timeout):
+        return subprocess.check_output(args, timeout=timeout, stderr=subprocess.DEVNULL).decode('utf-8', errors='ignore')
+
+
+class RecordingRunner(CommandRunner):
+    """Runs commands for real and saves their output as replay fixtures."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def run(self, args, timeout):
+        output = super().run(args, timeout)
+        os.makedirs(self.directory, exist_ok=True)
+        recordings = ReplayRunner.load_index(self.directory)
+        file_name = re.sub(r'[^A-Za-z0-9]+', '_', ' '.join(args)).strip('_')[:80] + '.txt'
+        with open(os.path.join(self.directory, file_name), 'w', encoding='utf-8') as f:
+            f.write(output)
+        recordings[ReplayRunner.key(args)] = file_name
+        with open(os.path.join(self.directory, ReplayRunner.INDEX_NAME), 'w', encoding='utf-8') as f:
+            json.dump(recordings, f, indent=2, sort_keys=True)
+        return output
+
+
+class ReplayRunner:
+    """Answers commands from recorded output listed in <directory>/recordings.json."""
+
+    INDEX_NAME = 'recordings.json'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.recordings = self.load_index(directory)
+        self._cache = {}
+
+    @classmethod
+    def load_index(cls, directory):
+        try:
+            with open(os.path.join(directory, cls.INDEX_NAME), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    @staticmethod
+    def key(args):
+        return ' '.join(args)
+
+    def available(self, args):
+        return self.key(args) in self.recordings
+
+    def run(self, args, timeout):
+        key = self.key(args)
+        if key not in self.recordings:
+            raise FileNotFoundError(f"No recording for command: {key}")
+        if key not in self._cache:
+            with open(os.path.join(self.directory, self.recordings[key]), 'r', encoding='utf-8') as f:
+                self._cache[key] = f.read()
+        return self._cache[key]
+
+
+# --------------------------------------------------------------------------
+# Scanner interface
+# --------------------------------------------------------------------------
+class Scanner:
+    """
+    One way of listing nearby WiFi networks or Bluetooth devices.
+    Subclasses set `commands` (the first one decides availability) and
+    implement `scan`, keeping parsing in separate `parse_*` methods.
+    """
+    name = 'base'
+    kind = None          # 'wifi' or 'bluetooth'
+    platforms = ()       # sys.platform prefixes this backend supports
+    commands = ()
+
+    def __init__(self, runner=None):
+        self.runner = runner or CommandRunner()
+
+    def is_available(self):
+        return bool(self.commands) and self.runner.available(self.commands[0])
+
+    def scan(self):
+        raise NotImplementedError
+
+
+# --- WiFi ---
+class NetshWifiScanner(Scanner):
+    name = 'netsh'
+    kind = 'wifi'
+    platforms = ('win',)
+    commands = (['netsh', 'wlan', 'show', 'networks', 'mode=bssid'],)
+
+    def scan(self):
+        return self.parse(self.runner.run(self.commands[0], timeout=10))
+
+    @staticmethod
+    def parse(output):
+        networks = []
+        current_network = None
+        for line in output.split('\n'):
+            line = line.strip()
+            if 'SSID' in line and 'BSSID' not in line:
+                if current_network:
+                    networks.append(current_network)
+                current_network = {'ssid': line.split(':', 1)[1].strip(), 'bssid': None}
+            elif 'BSSID' in line and current_network:
+                current_network['bssid'] = line.split(':', 1)[1].strip()
+        if current_network:
+            networks.append(current_network)
+        return networks
+
+
+class NmcliWifiScanner(Scanner):
+    name = 'nmcli'
+    kind = 'wifi'
+    platforms = ('linux',)
+    commands = (['nmcli', '-t', '-f', 'IN-USE,SSID,BSSID,SIGNAL', 'device', 'wifi', 'list'],)
+
+    def scan(self):
+        return self.parse(self.runner.run(self.commands[0], timeout=10))
+
+    @staticmethod
+    def parse(output):
+        """Parses terse output, where ':' inside a field is escaped as '\\:'."""
+        rows = []
+        for line in output.splitlines():
+            fields = [field.replace('\\:', ':') for field in re.split(r'(?<!\\):', line)]
+            if len(fields) < 4 or not fields[2]:
+                continue
+            in_use, ssid, bssid, signal = fields[:4]
+            rows.append((in_use.strip() == '*', int(signal) if signal.isdigit() else 0,
+                         {'ssid': ssid, 'bssid': bssid}))
+        # Connected network first (callers use networks[0]), then strongest signal
+        rows.sort(key=lambda row: (not row[0], -row[1]))
+        return [network for _, _, network in rows]
+
+
+# --- Bluetooth ---
+class PowerShellBluetoothScanner(Scanner):
+    name = 'powershell'
+    kind = 'bluetooth'
+    platforms = ('win',)
+    commands = (
+        ['powershell', '-command',
+         'Get-PnpDevice -Class Bluetooth | Where-Object {$_.Status -eq "OK"} | '
+         'Select-Object FriendlyName, DeviceID | ConvertTo-Csv -NoTypeInformation'],
+        ['powershell', '-command', 'btcom -b | findstr /i "address name"'],
+        ['powershell', '-command', 'btcom -s'],
+    )
+
+    def scan(self):
+        """
+        Falls back through the commands until one finds devices. Raises the
+        last error if every command failed, so the scan is reported as failed
+        rather than as finding nothing.
+        """
+        pnp, paired, discovered = self.commands
+        devices, error = [], None
+        succeeded = False
+        for args, timeout, parse in ((pnp, 15, self.parse_pnp),
+                                     (paired, 10, self.parse_btcom_paired),
+                                     (discovered, 10, self.parse_btcom_discovered)):
+            try:
+                devices = parse(self.runner.run(args, timeout=timeout))
+                succeeded = True
+            except Exception as e:
+                print(f"Python: {self.name} command failed ({args[-1][:40]}...): {e}")
+                error = e
+            if devices:
+                break
+        if not succeeded:
+            raise error
+        return devices
+
+    @staticmethod
+    def parse_pnp(output):
+        devices = []
+        for row in csv.DictReader(io.StringIO(output.strip())):
+            device_id = row.get('DeviceID') or ''
+            match = DEVICE_ID_MAC_PATTERN.search(device_id)
+            address = match.group(1) if match else (MAC_PATTERN.search(device_id) or [None])[0]
+            if not address:
+                continue  # Adapters, enumerators and protocol drivers carry no address
+            devices.append({'name': row.get('FriendlyName') or 'Unknown', 'address': format_mac(address)})
+        return devices
+
+    @staticmethod
+    def parse_btcom_paired(output):
+        devices = []
+        current_device = {}
+        for line in output.strip().split('\n'):
+            if 'address:' in line.lower():
+                current_device['address'] = line.split(':', 1)[-1].strip()
+            elif 'name:' in line.lower():
+                current_device['name'] = line.split(':', 1)[-1].strip()
+            if 'address' in current_device and 'name' in current_device:
+                devices.append(current_device)
+                current_device = {}
+        return devices
+
+    @staticmethod
+    def parse_btcom_discovered(output):
+        devices = []
+        for line in output.strip().split('\n'):
+            if 'found' in line.lower() and 'device' in line.lower():
+                parts = line.split()
+                if len(parts) >= 3:
+                    devices.append({'name': 'Discovered Device', 'address': parts[1]})
+        return devices
+
+
+class BluezDbusBluetoothScanner(Scanner):
+    """Reads BlueZ's device objects over D-Bus: no discovery wait, just what the adapter has seen."""
+    name = 'bluez-dbus'
+    kind = 'bluetooth'
+    platforms = ('linux',)
+    commands = (['busctl', '--system', '--json=short', 'call', 'org.bluez', '/',
+                 'org.freedesktop.DBus.ObjectManager', 'GetManagedObjects'],)
+
+    def scan(self):
+        return self.parse(self.runner.run(self.commands[0], timeout=5))
+
+    @staticmethod
+    def parse(output):
+        payload = json.loads(output)
+        objects = payload['data'][0] if payload.get('data') else {}
+        devices = []
+        for path in sorted(objects):
+            properties = objects[path].get('org.bluez.Device1')
+            if not properties:
+                continue
+            values = {key: value.get('data') for key, value in properties.items()}
+            # Only devices currently in range: seen with a signal strength, or connected
+            if 'RSSI' not in values and not values.get('Connected'):
+                continue
+            devices.append({'name': values.get('Name') or values.get('Alias') or 'Unknown',
+                            'address': values['Address'].upper()})
+        return devices
+
+
+class BluetoothctlScanner(Scanner):
+    name = 'bluetoothctl'
+    kind = 'bluetooth'
+    platforms = ('linux',)
+    commands = (['bluetoothctl', 'devices'],
+                ['bluetoothctl', '--timeout', '4', 'scan', 'on'])
+
+    def scan(self):
+        devices_cmd, discover_cmd = self.commands
+        try:
+            self.runner.run(discover_cmd, timeout=8)
+        except Exception as e:
+            print(f"Python: bluetoothctl discovery failed: {e}")
+        return self.parse(self.runner.run(devices_cmd, timeout=5))
+
+    @staticmethod
+    def parse(output):
+        devices = []
+        for line in output.splitlines():
+            parts = line.strip().split(' ', 2)
+            if len(parts) >= 2 and parts[0] == 'Device' and MAC_PATTERN.fullmatch(parts[1]):
+                devices.append({'name': parts[2] if len(parts) > 2 else 'Unknown', 'address': parts[1].upper()})
+        return devices
+
+
+# Fastest backend first for each platform
+SCANNER_BACKENDS = [
+    NetshWifiScanner,
+    NmcliWifiScanner,
+    PowerShellBluetoothScanner,
+    BluezDbusBluetoothScanner,
+    BluetoothctlScanner,
+]
+
+
+def select_scanner(kind, platform=None, runner=None):
+    """Returns the first available backend of `kind` for the platform, or None."""
+    platform = platform or sys.platform
+    for backend in SCANNER_BACKENDS:
+        if backend.kind != kind or not platform.startswith(backend.platforms):
+            continue
+        scanner = backend(runner)
+        if scanner.is_available():
+            return scanner
+    return None
+
+
+def default_runner():
+    """Real commands, or recorded ones when SCANNER_REPLAY_DIR is set."""
+    replay_dir = os.getenv('SCANNER_REPLAY_DIR')
+    return ReplayRunner(replay_dir) if replay_dir else CommandRunner()
+
+
+def _benchmark(replay_dir, platform, iterations):
+    runner = ReplayRunner(replay_dir)
+    for backend in SCANNER_BACKENDS:
+        if platform and not platform.startswith(backend.platforms):
+            continue
+        scanner = backend(runner)
+        if not scanner.is_available():
+            continue
+        scanner.scan()  # Load recordings into the runner cache
+        started = time.perf_counter()
+        for _ in range(iterations):
+            found = scanner.scan()
+        per_call_us = (time.perf_counter() - started) / iterations * 1e6
+        print(f"{backend.kind:<10} {backend.name:<14} {len(found):>3} results  {per_call_us:8.1f} us/scan")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run or benchmark the presence scanners.")
+    parser.add_argument('--replay', help="Directory of recorded command output to replay")
+    parser.add_argument('--record', help="Run real commands and save their output to this directory")
+    parser.add_argument('--platform', help="Pretend to be this sys.platform when choosing backends")
+    parser.add_argument('--bench', type=int, default=0, help="Benchmark parsing over N iterations (needs --replay)")
+    args = parser.parse_args()
+
+    if args.bench and args.replay:
+        _benchmark(args.replay, args.platform, args.bench)
+    else:
+        runner = ReplayRunner(args.replay) if args.replay else RecordingRunner(args.record) if args.record else CommandRunner()
+        for kind in ('wifi', 'bluetooth'):
+            scanner = select_scanner(kind, args.platform, runner)
+            print(f"{kind}: {scanner.name if scanner else 'no backend available'}")
+            if scanner:
+                print(json.dumps(scanner.scan(), indent=2))
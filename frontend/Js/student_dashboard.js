@@ -12,6 +12,8 @@
 
 const API_BASE = '/api/student';
 let currentLecture = null; // Stores the currently active lecture object
+const BURST_FRAME_COUNT = 5; // Frames sent per face verification request
+const BURST_FRAME_INTERVAL_MS = 150; // Gap between burst frames, long enough to catch a blink
 
 // --- INITIALIZATION ---
 
@@ -213,6 +215,27 @@ function checkForCurrentLecture(timetable) {
     });
 }
 
+/**
+ * Receives per-scanner progress pushed from the desktop app while perform_scans runs,
+ * so each step updates as soon as its scanner finishes.
+ * @param {object} progress - Map of scanner name to {state, durationMs, count}.
+ */
+window.onScanProgress = function (progress) {
+    const wifi = progress.wifi;
+    if (wifi && wifi.state === 'done') {
+        updateVerificationStep('wifi', `Found ${wifi.count || 0} WiFi networks`, wifi.count ? 'success' : 'error');
+    } else if (wifi && (wifi.state === 'timeout' || wifi.state === 'failed')) {
+        updateVerificationStep('wifi', 'WiFi scan timed out', 'error');
+    }
+
+    const bluetooth = progress.bluetooth;
+    if (bluetooth && bluetooth.state === 'done') {
+        updateVerificationStep('bluetooth', `Found ${bluetooth.count || 0} nearby devices, checking...`, 'processing');
+    } else if (bluetooth && (bluetooth.state === 'timeout' || bluetooth.state === 'failed')) {
+        updateVerificationStep('bluetooth', 'Bluetooth scan timed out', 'error');
+    }
+};
+
 /**
  * Desktop-specific scanning function using pywebview API
  */
@@ -228,15 +251,20 @@ async function performDesktopScan() {
             if (scanResults.success) {
                 console.log("Desktop scan successful:", scanResults);
                 
-                // Update UI with scan results
+                // Update UI with scan results. A scan that failed is reported as such, not as "nothing found"
+                const scanStatus = scanResults.scan_status || {};
                 if (scanResults.wifi_networks && scanResults.wifi_networks.length > 0) {
                     updateVerificationStep('wifi', `Found ${scanResults.wifi_networks.length} WiFi networks`, 'success');
+                } else if (scanStatus.wifi && scanStatus.wifi.state !== 'done') {
+                    updateVerificationStep('wifi', `WiFi scan failed: ${scanStatus.wifi.error || scanStatus.wifi.state}`, 'error');
                 } else {
                     updateVerificationStep('wifi', 'No WiFi networks found', 'error');
                 }
 
                 if (scanResults.matched_bluetooth) {
                     updateVerificationStep('bluetooth', 'Teacher device detected!', 'success');
+                } else if (scanStatus.bluetooth && scanStatus.bluetooth.state !== 'done') {
+                    updateVerificationStep('bluetooth', `Bluetooth scan failed: ${scanStatus.bluetooth.error || scanStatus.bluetooth.state}`, 'error');
                 } else {
                     updateVerificationStep('bluetooth', 'No teacher device found', 'error');
                 }
@@ -499,19 +527,19 @@ async function startFaceVerification() {
             subtitle: 'Please look at the camera...'
         });
 
-        // Open camera and capture image
-        const imageData = await captureFaceImage();
+        // Open camera and capture a short burst so the server can check liveness
+        const frames = await captureFaceBurst(BURST_FRAME_COUNT, BURST_FRAME_INTERVAL_MS);
         
-        if (!imageData) {
+        if (!frames || frames.length === 0) {
             throw new Error('Could not capture image');
         }
 
-        // Send image to server for verification
-        const response = await fetch(`${API_BASE}/verify-face`, {
+        // Send all frames to the server in a single verification request
+        const response = await fetch(`${API_BASE}/verify-face-burst`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             credentials: 'include',
-            body: JSON.stringify({ image: imageData })
+            body: JSON.stringify({ images: frames })
         });
 
         const result = await response.json();
@@ -520,7 +548,7 @@ async function startFaceVerification() {
             showToast("Face verified successfully!", "success");
             return true;
         } else {
-            showToast(result.message || "Face verification failed", "error");
+            showToast(result.message || result.error || "Face verification failed", "error");
             return false;
         }
     } catch (error) {
@@ -530,37 +558,43 @@ async function startFaceVerification() {
     }
 }
 
-async function captureFaceImage() {
-    return new Promise((resolve, reject) => {
-        const video = document.createElement('video');
-        const canvas = document.createElement('canvas');
-        const ctx = canvas.getContext('2d');
-
-        navigator.mediaDevices.getUserMedia({ video: true })
-            .then(stream => {
-                video.srcObject = stream;
-                video.play();
-
-                video.onloadedmetadata = () => {
-                    canvas.width = video.videoWidth;
-                    canvas.height = video.videoHeight;
-
-                    // Wait a moment for camera to focus
-                    setTimeout(() => {
-                        ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
-                        const imageData = canvas.toDataURL('image/jpeg');
-                        
-                        // Stop the video stream
-                        stream.getTracks().forEach(track => track.stop());
-                        
-                        resolve(imageData);
-                    }, 1000);
-                };
-            })
-            .catch(error => {
-                reject(error);
-            });
-    });
+/**
+ * Captures several frames from one camera session for burst verification.
+ * @param {number} count - Number of frames to capture.
+ * @param {number} intervalMs - Delay between frames.
+ * @returns {Promise<string[]>} JPEG data URLs in capture order.
+ */
+async function captureFaceBurst(count, intervalMs) {
+    const stream = await navigator.mediaDevices.getUserMedia({ video: true });
+    const video = document.createElement('video');
+    const canvas = document.createElement('canvas');
+    const ctx = canvas.getContext('2d');
+
+    try {
+        video.srcObject = stream;
+        await video.play();
+        if (!video.videoWidth) {
+            await new Promise(resolve => { video.onloadedmetadata = resolve; });
+        }
+        canvas.width = video.videoWidth;
+        canvas.height = video.videoHeight;
+
+        // Wait a moment for camera to focus
+        await new Promise(resolve => setTimeout(resolve, 1000));
+
+        const frames = [];
+        for (let i = 0; i < count; i++) {
+            ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
+            frames.push(canvas.toDataURL('image/jpeg', 0.85));
+            if (i < count - 1) {
+                await new Promise(resolve => setTimeout(resolve, intervalMs));
+            }
+        }
+        return frames;
+    } finally {
+        // Stop the video stream
+        stream.getTracks().forEach(track => track.stop());
+    }
 }
 
 // Modify the startAttendanceCheck function to include face recognition
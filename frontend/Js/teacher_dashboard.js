@@ -3,6 +3,8 @@ document.addEventListener('DOMContentLoaded', () => {
     let liveLectureData = null;
     let weeklyTrendChart, branchCompChart;
     const POLLING_INTERVAL = 30000; // 30 seconds for live data refresh
+    const LIVE_STREAM_URL = '/api/teacher/live-lecture/stream';
+    const MAX_STREAM_FAILURES = 3; // Fall back to polling after this many stream errors in a row
 
     // --- DOM ELEMENT SELECTORS ---
     const dom = {
@@ -128,6 +130,31 @@ document.addEventListener('DOMContentLoaded', () => {
         dom.liveLectureContainer.innerHTML = table;
     };
     
+    const activeRosterFilter = () => {
+        const active = dom.studentListFilters.querySelector('.filter-btn.active');
+        return active ? active.dataset.filter : 'all';
+    };
+
+    const renderLiveStats = () => {
+        dom.stats.liveStudents.textContent = liveLectureData.students.length;
+        dom.stats.atRisk.textContent = liveLectureData.students.filter(s => s.atRisk).length;
+        dom.stats.absent.textContent = liveLectureData.students.filter(s => s.todayStatus === 'Absent').length;
+    };
+
+    // Applies one 'attendance' event from the live stream to the roster
+    const applyAttendanceDelta = (event) => {
+        if (!liveLectureData) return;
+        const student = liveLectureData.students.find(s => s.studentId === event.studentId);
+        if (!student) return;
+        student.todayStatus = event.status;
+        if (event.attendancePercentage !== undefined) {
+            student.attendancePercentage = event.attendancePercentage;
+            student.atRisk = event.atRisk;
+        }
+        renderLiveStats();
+        renderLiveStudentRoster(activeRosterFilter());
+    };
+
     const updateDashboardView = (data, fullTimetable) => {
         liveLectureData = data.liveLecture ? data : null;
         const now = new Date();
@@ -139,12 +166,10 @@ document.addEventListener('DOMContentLoaded', () => {
             dom.nextLecture.countdownContainer.style.display = 'block';
             startCountdown(lecture.endTime);
 
-            dom.stats.liveStudents.textContent = liveLectureData.students.length;
-            dom.stats.atRisk.textContent = liveLectureData.students.filter(s => s.atRisk).length;
-            dom.stats.absent.textContent = liveLectureData.students.filter(s => s.todayStatus === 'Absent').length;
+            renderLiveStats();
             
             dom.liveLectureCard.style.display = 'block';
-            renderLiveStudentRoster();
+            renderLiveStudentRoster(activeRosterFilter());
         } else {
             // Find next lecture
             const todayStr = now.toLocaleDateString('en-US', { weekday: 'long' });
@@ -198,16 +223,15 @@ document.addEventListener('DOMContentLoaded', () => {
     async function initializeDashboard() {
         showLoader(true);
         try {
-            const [filterData, timetableData, liveData, branchCompData] = await Promise.all([
+            const [filterData, timetableData, branchCompData] = await Promise.all([
                 api.get('/api/teacher/filters'),
                 api.get('/api/teacher/timetable'),
-                api.get('/api/teacher/live-lecture'),
                 api.get('/api/teacher/analytics/branch-comparison')
             ]);
             
             populateFilterDropdowns(filterData.filters);
             renderTimetable(timetableData.timetable, dom.timetableContainer);
-            updateDashboardView(liveData, timetableData.timetable);
+            updateDashboardView({}, timetableData.timetable); // Live roster arrives with the first stream snapshot
 
             weeklyTrendChart = renderChart('weeklyTrendChart', 'bar', weeklyTrendChart, { labels: [], datasets: [] }, { responsive: true, maintainAspectRatio: false });
             branchCompChart = renderChart('branchComparisonChart', 'pie', branchCompChart, {
@@ -215,11 +239,8 @@ document.addEventListener('DOMContentLoaded', () => {
                 datasets: [{ data: Object.values(branchCompData.branch_comparison), backgroundColor: ['#4a69bd', '#60a3bc', '#f39c12', '#e74c3c', '#c0392b'] }]
             }, { responsive: true, maintainAspectRatio: false });
 
-            // Set up polling for live data
-            setInterval(async () => {
-                const liveData = await api.get('/api/teacher/live-lecture');
-                updateDashboardView(liveData, timetableData.timetable);
-            }, POLLING_INTERVAL);
+            // Live data is pushed over SSE; polling is the fallback
+            startLiveUpdates(timetableData.timetable);
 
         } catch (error) {
             showAlert(error.message, "Dashboard Failed to Load");
@@ -228,6 +249,41 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
     
+    function startLivePolling(timetable) {
+        const poll = async () => {
+            try {
+                const liveData = await api.get('/api/teacher/live-lecture');
+                updateDashboardView(liveData, timetable);
+            } catch (error) {
+                console.error('Live lecture refresh failed:', error);
+            }
+        };
+        poll();
+        setInterval(poll, POLLING_INTERVAL);
+    }
+
+    function startLiveUpdates(timetable, failures = 0) {
+        if (!window.EventSource || failures >= MAX_STREAM_FAILURES) {
+            startLivePolling(timetable);
+            return;
+        }
+        const source = new EventSource(LIVE_STREAM_URL);
+        const reconnect = (delay, failed) => {
+            source.close();
+            setTimeout(() => startLiveUpdates(timetable, failed ? failures + 1 : 0), delay);
+        };
+
+        source.addEventListener('snapshot', (e) => {
+            const data = JSON.parse(e.data);
+            updateDashboardView(data, timetable);
+            // No lecture right now: the server ends the stream, so check again later
+            if (!data.liveLecture) reconnect(POLLING_INTERVAL, false);
+        });
+        source.addEventListener('attendance', (e) => applyAttendanceDelta(JSON.parse(e.data)));
+        source.addEventListener('lecture-ended', () => reconnect(1000, false));
+        source.onerror = () => reconnect(POLLING_INTERVAL / 3, true);
+    }
+
     function populateFilterDropdowns(filters) {
         const populate = (id, options) => {
             const select = document.getElementById(id);
@@ -0,0 +1,52 @@
+"""
+Gunicorn settings for serving the API to a whole campus from one machine:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import multiprocessing
+import os
+import tempfile
+
+bind = os.getenv('BIND', '0.0.0.0:5000')
+# State that must agree across workers lives in Firestore: cache versions
+# (cache_versions), used face verifications, and the attendance that live
+# lecture streams catch up on. Anything else a worker keeps is a cache.
+workers = int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count()))
+# Threads keep a worker responsive while requests wait on Firestore; each open
+# live-lecture stream holds one thread for the length of the lecture
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', 8))
+timeout = 120
+
+# Each worker imports the app itself: Firestore's gRPC channel and the face
+# thread pools must be created after the fork, never inherited from the master.
+preload_app = False
+
+# Warmup and the nightly scan are started per worker once it has loaded the
+# app (below), not during the import.
+os.environ['START_BACKGROUND_JOBS'] = '0'
+
+# Workers publish their request metrics here, so /api/system/metrics on any
+# worker reports the whole server
+METRICS_DIR = os.getenv('METRICS_DIR') or os.path.join(tempfile.gettempdir(), f"attendance-metrics-{os.getpid()}")
+
+
+def on_starting(server):
+    from backend.utils.metrics import clear_shared_metrics
+    clear_shared_metrics(METRICS_DIR)
+
+
+def post_worker_init(worker):
+    from app import start_background_jobs
+    from backend.utils.metrics import request_metrics
+    request_metrics.share(METRICS_DIR, worker.pid)
+    start_background_jobs(worker.wsgi)
+
+
+def worker_exit(server, worker):
+    from backend.utils.metrics import request_metrics
+    request_metrics.flush()
+
+
+def child_exit(server, worker):
+    from backend.utils.metrics import archive_worker_metrics
+    archive_worker_metrics(METRICS_DIR, worker.pid)
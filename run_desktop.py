@@ -1,58 +1,178 @@
+from backend.utils.startup_timeline import mark, timeline
 import webview
 import threading
-import subprocess
 import requests
 import json
 import time
 import re
-from app import app
+import os
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from desktop.scanners import default_runner, select_scanner
+
+SERVER_URL = "http://127.0.0.1:5000"
+HEALTH_URL = f"{SERVER_URL}/api/health"
+STARTUP_TIMEOUT_SECONDS = 60
+HEALTH_POLL_INTERVAL_SECONDS = 0.1
+
+# Per-scanner deadlines (seconds) for perform_scans
+SCAN_DEADLINES = {
+    'location': 5,
+    'wifi': 15,
+    'teacher_devices': 10,
+    'bluetooth': 20
+}
+DEFAULT_SCAN_DEADLINE = 15
+
+# Background presence monitor: how often it rescans, and how old a snapshot
+# may be before perform_scans forces a fresh scan
+PRESENCE_REFRESH_SECONDS = float(os.getenv('PRESENCE_REFRESH_SECONDS', 15))
+PRESENCE_MAX_AGE_SECONDS = float(os.getenv('PRESENCE_MAX_AGE_SECONDS', 30))
+# The only page that reads presence data; the monitor runs only while it is open
+STUDENT_DASHBOARD_PATH = '/student_dashboard.html'
+
+# Shown while Flask, Firebase and the routes load in the background
+SPLASH_HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+<style>
+    body { margin: 0; height: 100vh; display: flex; align-items: center; justify-content: center;
+           font-family: 'Segoe UI', Arial, sans-serif; background: #f4f6fb; color: #2d3748; }
+    .box { text-align: center; }
+    .spinner { width: 42px; height: 42px; margin: 0 auto 18px; border: 4px solid #d6dcf0;
+               border-top-color: #4f46e5; border-radius: 50%; animation: spin 0.9s linear infinite; }
+    @keyframes spin { to { transform: rotate(360deg); } }
+    #status { color: #718096; font-size: 14px; }
+</style>
+</head>
+<body>
+    <div class="box">
+        <div class="spinner"></div>
+        <h2>Smart Attendance System</h2>
+        <p id="status">Starting up...</p>
+    </div>
+</body>
+</html>
+"""
+
+class PresenceMonitor:
+    """
+    Keeps a timestamped presence snapshot (location, WiFi, teacher devices,
+    Bluetooth) refreshed on a background thread so the attendance flow can
+    read it instantly instead of waiting on subprocess scans.
+    """
+
+    def __init__(self, collect, refresh_seconds=PRESENCE_REFRESH_SECONDS, max_age_seconds=PRESENCE_MAX_AGE_SECONDS):
+        self._collect = collect
+        self.refresh_seconds = refresh_seconds
+        self.max_age_seconds = max_age_seconds
+        self._scan_lock = threading.Lock()  # Only one scan runs at a time
+        self._snapshot = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop_event.is_set()
+
+    def start(self):
+        if self.running:
+            return
+        # A fresh event per thread, so a monitor stopped at logout can start again
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._loop, args=(self._stop_event,), name='presence-monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops background rescans and drops the snapshot, so the next session scans afresh."""
+        self._stop_event.set()
+        self._thread = None
+        self._snapshot = None
+
+    def age(self, snapshot):
+        return time.monotonic() - snapshot['taken_at']
+
+    def is_fresh(self, snapshot):
+        return snapshot is not None and self.age(snapshot) <= self.max_age_seconds
+
+    def get(self, force=False):
+        """Returns the snapshot, rescanning first if it is stale or a refresh is forced."""
+        snapshot = self._snapshot
+        if not force and self.is_fresh(snapshot):
+            return snapshot
+        return self.refresh(only_if_stale=not force, foreground=True)
+
+    def refresh(self, only_if_stale=False, foreground=False):
+        with self._scan_lock:
+            # Another caller may have refreshed while we waited for the lock
+            if only_if_stale and self.is_fresh(self._snapshot):
+                return self._snapshot
+            results, statuses = self._collect(publish=foreground)
+            self._snapshot = {
+                "results": results,
+                "statuses": statuses,
+                "taken_at": time.monotonic(),
+                "scanned_at": time.strftime('%Y-%m-%dT%H:%M:%S')
+            }
+            return self._snapshot
+
+    def _loop(self, stop_event):
+        while not stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Python: Background presence scan failed: {e}")
+            stop_event.wait(self.refresh_seconds)
+
 
 class Api:
     def __init__(self):
-        self.base_url = "http://127.0.0.1:5000/api"
+        self._client = None  # In-process Flask test client for bridge calls
+        self._client_lock = threading.Lock()
+        self._window = None  # Set once the webview window exists, used to push scan progress
+        self._progress_lock = threading.Lock()
+        self._scan_progress = {}
+        self._presence = PresenceMonitor(self._collect_presence)
+        self._server_ready = threading.Event()  # Set once the health check passes
+        runner = default_runner()
+        self._wifi_scanner = select_scanner('wifi', runner=runner)
+        self._bluetooth_scanner = select_scanner('bluetooth', runner=runner)
     
-    def perform_scans(self):
+    def perform_scans(self, force_refresh=False):
         """
-        Performs all required scans for attendance marking
+        Returns presence data for attendance marking from the background
+        monitor's snapshot. A new scan only runs when the snapshot is older
+        than the freshness window (or force_refresh is set).
         """
-        print("Python: Starting comprehensive scan for attendance...")
+        print("Python: Fetching presence snapshot for attendance...")
         
         try:
-            # Get current location (mock for testing)
-            location_data = self._get_current_location()
-            
-            # Scan for WiFi networks
-            wifi_data = self._scan_wifi_networks()
-            
-            # Get teacher Bluetooth IDs from database FIRST
-            teacher_devices = self._get_teacher_bluetooth_ids()
+            snapshot = self._presence.get(force=force_refresh)
+            results, statuses = snapshot['results'], snapshot['statuses']
+
+            location_data = results.get('location') or {"latitude": 0, "longitude": 0, "accuracy": 0}
+            wifi_data = results.get('wifi') or []
+            teacher_devices = results.get('teacher_devices') or []
+            bluetooth_data = results.get('bluetooth') or []
             print(f"Python: Teacher devices from DB: {teacher_devices}")
-            
+
+            teacher_status = statuses.get('teacher_devices', {})
+            if teacher_status.get('state') != 'done':
+                return {
+                    "success": False,
+                    "error": f"Could not load teacher devices: {teacher_status.get('error', teacher_status.get('state'))}",
+                    "scan_status": statuses
+                }
             if not teacher_devices:
                 return {
                     "success": False,
-                    "error": "No teacher devices found in database"
+                    "error": "No teacher devices found in database",
+                    "scan_status": statuses
                 }
             
-            # Scan for Bluetooth devices dynamically
-            bluetooth_data = self._scan_bluetooth_sync()
-            
             # Check if any detected Bluetooth matches teacher devices
-            matched_bluetooth = None
-            for bt_device in bluetooth_data:
-                # Normalize both addresses for comparison
-                detected_addr = self.normalize_bluetooth_address(bt_device['address'])
-                
-                for teacher_addr in teacher_devices:
-                    teacher_addr_normalized = self.normalize_bluetooth_address(teacher_addr)
-                    
-                    if detected_addr == teacher_addr_normalized:
-                        matched_bluetooth = teacher_addr  # Return the original format
-                        print(f"Python: MATCH FOUND! Teacher device detected: {matched_bluetooth}")
-                        break
-                
-                if matched_bluetooth:
-                    break
+            matched_bluetooth = self._match_teacher_device(bluetooth_data, teacher_devices)
             
             print(f"Python: Scan results - Location: {location_data}")
             print(f"Python: WiFi networks found: {len(wifi_data)}")
@@ -74,116 +194,138 @@ class Api:
                 "bluetooth_devices": bluetooth_data,
                 "matched_bluetooth": matched_bluetooth,
                 "wifi_bssid": wifi_bssid,
+                "scan_status": statuses,
+                "partial": any(status['state'] != 'done' for status in statuses.values()),
+                "scanned_at": snapshot['scanned_at'],
+                "snapshot_age_seconds": round(self._presence.age(snapshot), 1),
                 "success": True
             }
             
         except Exception as e:
             print(f"Python Error during scanning: {e}")
             return {"success": False, "error": str(e)}
-    
-    def _scan_bluetooth_sync(self):
+
+    def _collect_presence(self, publish=True):
         """
-        Synchronous Bluetooth scanning using Windows command line tools
+        Runs the location lookup, WiFi scan, teacher device fetch and Bluetooth
+        scan concurrently, each with its own deadline, so the total time is
+        that of the slowest scanner rather than the sum of all of them.
         """
-        devices = []
-        print("Python: Scanning for Bluetooth devices using Windows commands...")
-        
-        try:
-            # Method 1: Try using Windows PowerShell command for paired devices
+        return self._run_scans_concurrently({
+            'location': self._get_current_location,
+            'wifi': self._scan_wifi_networks,
+            'teacher_devices': self._get_teacher_bluetooth_ids,
+            'bluetooth': self._scan_bluetooth_sync
+        }, publish=publish)
+
+    def mark_server_ready(self):
+        self._server_ready.set()
+
+    def sync_presence_monitor(self, url):
+        """
+        Runs the background presence monitor only while a logged-in student has
+        the student dashboard open. Called on every page load: logging in
+        starts it, and logging out (or leaving the dashboard) stops it, so
+        admins, teachers and the login page never trigger scans.
+        """
+        on_dashboard = urlparse(url or '').path == STUDENT_DASHBOARD_PATH
+        if self._server_ready.is_set() and on_dashboard and self._session_role() == 'Student':
+            if not self._presence.running:
+                print("Python: Student logged in, starting background presence scans")
+                self._presence.start()
+        elif self._presence.running:
+            print("Python: Left the student dashboard, stopping background presence scans")
+            self._presence.stop()
+
+    def stop_presence_monitor(self):
+        """Stops background scans (for example from a logout handler on the page)."""
+        self._presence.stop()
+
+    def get_scan_progress(self):
+        """Returns the state of the scan in progress (or the last one) for the JS side."""
+        with self._progress_lock:
+            return json.loads(json.dumps(self._scan_progress))
+
+    def _run_scans_concurrently(self, scanners, publish=True):
+        """
+        Runs each scanner on its own thread and collects results as they
+        finish. A scanner that misses its deadline is reported as timed out and
+        its result is dropped; the others are still returned. Progress is only
+        pushed to the page for scans the user is waiting on (publish=True).
+        """
+        started = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=len(scanners), thread_name_prefix='scan')
+        futures = {executor.submit(func): name for name, func in scanners.items()}
+        deadlines = {name: started + SCAN_DEADLINES.get(name, DEFAULT_SCAN_DEADLINE) for name in scanners}
+        results = {}
+        statuses = {name: {"state": "running"} for name in scanners}
+        if publish:
+            self._publish_progress(statuses)
+
+        pending = set(futures)
+        while pending:
+            next_deadline = min(deadlines[futures[f]] for f in pending)
+            done, pending = wait(pending, timeout=max(next_deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = futures[future]
+                elapsed_ms = round((time.monotonic() - started) * 1000)
+                try:
+                    results[name] = future.result()
+                    count = len(results[name]) if isinstance(results[name], list) else None
+                    statuses[name] = {"state": "done", "durationMs": elapsed_ms, "count": count}
+                except Exception as e:
+                    print(f"Python: {name} scan failed: {e}")
+                    statuses[name] = {"state": "failed", "durationMs": elapsed_ms, "error": str(e)}
+
+            now = time.monotonic()
+            for future in [f for f in pending if deadlines[futures[f]] <= now]:
+                name = futures[future]
+                print(f"Python: {name} scan missed its {SCAN_DEADLINES.get(name, DEFAULT_SCAN_DEADLINE)}s deadline")
+                statuses[name] = {"state": "timeout", "durationMs": round((now - started) * 1000)}
+                pending.discard(future)
+
+            if publish:
+                self._publish_progress(statuses)
+
+        # Don't wait for scanners that timed out; their subprocess timeouts end them
+        executor.shutdown(wait=False)
+        print(f"Python: All scans finished in {round((time.monotonic() - started) * 1000)} ms")
+        return results, statuses
+
+    def _publish_progress(self, statuses):
+        """Stores scan progress and pushes it to the page if a window is attached."""
+        with self._progress_lock:
+            self._scan_progress = {name: dict(status) for name, status in statuses.items()}
+            payload = json.dumps(self._scan_progress)
+        if self._window is not None:
             try:
-                # This command lists paired Bluetooth devices
-                result = subprocess.check_output([
-                    'powershell', 
-                    '-command', 
-                    'Get-PnpDevice -Class Bluetooth | Where-Object {$_.Status -eq "OK"} | Select-Object FriendlyName, DeviceID'
-                ], timeout=15).decode('utf-8', errors='ignore')
-                
-                lines = result.strip().split('\n')
-                for line in lines:
-                    if 'Bluetooth' in line and 'DeviceID' not in line and not any(x in line for x in ['Enumerator', 'Adapter', 'Protocol']):
-                        parts = line.split()
-                        if len(parts) >= 2:
-                            name = ' '.join(parts[:-1])
-                            address = parts[-1]
-                            # Extract MAC address from DeviceID if possible
-                            mac_match = re.search(r'([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})', address)
-                            if mac_match:
-                                address = mac_match.group(0)
-                            devices.append({
-                                'name': name,
-                                'address': address
-                            })
+                self._window.evaluate_js(f"window.onScanProgress && window.onScanProgress({payload})")
             except Exception as e:
-                print(f"Method 1 failed: {e}")
-            
-            # Method 2: Try alternative command for discoverable devices
-            if not devices:
-                try:
-                    result = subprocess.check_output([
-                        'powershell', 
-                        '-command', 
-                        'btcom -b | findstr /i "address name"'
-                    ], timeout=10).decode('utf-8', errors='ignore')
-                    
-                    lines = result.strip().split('\n')
-                    current_device = {}
-                    for line in lines:
-                        if 'address:' in line.lower():
-                            current_device['address'] = line.split(':')[-1].strip()
-                        elif 'name:' in line.lower():
-                            current_device['name'] = line.split(':')[-1].strip()
-                        
-                        if 'address' in current_device and 'name' in current_device:
-                            devices.append(current_device)
-                            current_device = {}
-                except:
-                    # Method 2 failed
-                    pass
-            
-            # Method 3: Use Bluetooth command line tools
-            if not devices:
-                try:
-                    result = subprocess.check_output([
-                        'powershell',
-                        '-command',
-                        'btcom -s'
-                    ], timeout=10).decode('utf-8', errors='ignore')
-                    
-                    # Parse the output for devices
-                    lines = result.strip().split('\n')
-                    for line in lines:
-                        if 'found' in line.lower() and 'device' in line.lower():
-                            parts = line.split()
-                            if len(parts) >= 3:
-                                devices.append({
-                                    'name': 'Discovered Device',
-                                    'address': parts[1]  # Usually the MAC address
-                                })
-                except:
-                    pass
-            
-            # If all methods fail, use a fallback approach
-            if not devices:
-                print("Python: Bluetooth scanning failed, trying fallback methods...")
-                # Add some common device patterns that might be detected
-                devices = self._get_fallback_bluetooth_devices()
-                
-            print(f"Python: Found {len(devices)} Bluetooth devices")
-            
-        except Exception as e:
-            print(f"Bluetooth scan error: {e}")
-            # Return fallback devices for testing
-            devices = self._get_fallback_bluetooth_devices()
-        
-        return devices
+                print(f"Python: Could not push scan progress: {e}")
+
+    def _match_teacher_device(self, bluetooth_data, teacher_devices):
+        """Returns the teacher address (original format) that matches a detected device, if any."""
+        teacher_lookup = {self.normalize_bluetooth_address(addr): addr for addr in teacher_devices}
+        for bt_device in bluetooth_data:
+            matched = teacher_lookup.get(self.normalize_bluetooth_address(bt_device['address']))
+            if matched:
+                print(f"Python: MATCH FOUND! Teacher device detected: {matched}")
+                return matched
+        return None
     
-    def _get_fallback_bluetooth_devices(self):
-        """Get fallback Bluetooth devices when scanning fails"""
-        return [
-            {'name': 'Redmi Note 7 Pro', 'address': '22:22:13:C7:C8:FE'},
-            {'name': 'Wireless Headphones', 'address': 'AA:BB:CC:DD:EE:FF'},
-            {'name': 'Smart Watch', 'address': '11:22:33:44:55:66'}
-        ]
+    def _scan_bluetooth_sync(self):
+        """
+        Synchronous Bluetooth scan using the backend selected for this platform.
+        Raises if there is no backend or the scan fails; the failure is
+        reported to the page in scan_status instead of faking devices.
+        """
+        if self._bluetooth_scanner is None:
+            raise RuntimeError("no Bluetooth scanner backend available on this platform")
+        print(f"Python: Scanning for Bluetooth devices using {self._bluetooth_scanner.name}...")
+        devices = self._bluetooth_scanner.scan()
+        print(f"Python: Found {len(devices)} Bluetooth devices")
+        return devices
     
     def normalize_bluetooth_address(self, address):
         """
@@ -211,97 +353,65 @@ class Api:
     
     def _scan_wifi_networks(self):
         """
-        Scan for available WiFi networks (Windows specific)
+        Scan for available WiFi networks using the backend selected for this
+        platform. Raises on failure, like the Bluetooth scan.
         """
-        networks = []
-        try:
-            # Get available networks
-            result = subprocess.check_output(['netsh', 'wlan', 'show', 'networks', 'mode=bssid']).decode('utf-8', errors='ignore')
-            
-            current_network = None
-            for line in result.split('\n'):
-                line = line.strip()
-                if 'SSID' in line and 'BSSID' not in line:
-                    if current_network:
-                        networks.append(current_network)
-                    current_network = {'ssid': line.split(':', 1)[1].strip(), 'bssid': None}
-                elif 'BSSID' in line and current_network:
-                    bssid = line.split(':', 1)[1].strip()
-                    current_network['bssid'] = bssid
-            
-            if current_network:
-                networks.append(current_network)
-                
-            print(f"Python: Found {len(networks)} WiFi networks")
-            if networks:
-                print(f"Python: Connected to: {networks[0]['ssid']} ({networks[0]['bssid']})")
-                
-        except Exception as e:
-            print(f"WiFi scan error: {e}")
-            # Return mock WiFi data for testing
-            networks = [{'ssid': 'Skyworth_3558B8', 'bssid': '10:55:E4:C6:EF:25'}]
-        
+        if self._wifi_scanner is None:
+            raise RuntimeError("no WiFi scanner backend available on this platform")
+        networks = self._wifi_scanner.scan()
+        print(f"Python: Found {len(networks)} WiFi networks via {self._wifi_scanner.name}")
+        if networks:
+            print(f"Python: Connected to: {networks[0]['ssid']} ({networks[0]['bssid']})")
         return networks
     
     def _get_teacher_bluetooth_ids(self):
         """
-        Get teacher Bluetooth device IDs from the backend with proper authentication
+        Get teacher Bluetooth device IDs straight from the backend's reference
+        cache. The Flask app runs in this process, so no HTTP round trip is needed.
         """
-        try:
-            # Try to get from API with session cookies
-            print("Python: Fetching teacher devices from API...")
-            
-            # First, let's try to get the session cookies from the browser
-            # For now, we'll use a direct approach since we're in the same app
-            
-            # Since we're running in the same process, we can access the Flask session
-            # But for API calls, we need to handle authentication properly
-            
-            # Alternative: Use a dedicated endpoint that doesn't require auth for internal use
-            # Or use the same session cookies from the webview
-            
-            response = requests.get(f"{self.base_url}/student/teacher-devices", 
-                                  timeout=10,
-                                  cookies={'session': self._get_session_cookie()})
-            
-            if response.status_code == 200:
-                teacher_devices = response.json().get('devices', [])
-                print(f"Python: Got teacher devices from API: {teacher_devices}")
-                return teacher_devices
-            else:
-                print(f"Python: API returned status {response.status_code}, trying fallback...")
-                
-        except Exception as e:
-            print(f"Error fetching teacher devices from API: {e}")
-        
-        # Fallback: Try to get teacher devices from Firebase directly
-        try:
-            return self._get_teacher_devices_from_firebase()
-        except Exception as e:
-            print(f"Error getting teacher devices from Firebase: {e}")
-            return []
+        self._flask_app()  # Makes sure the routes have been given the database
+        from backend.routes.student_routes import teacher_device_ids
+        teacher_devices = teacher_device_ids()
+        print(f"Python: Got teacher devices from backend: {teacher_devices}")
+        return teacher_devices
     
+    def _flask_app(self):
+        """The in-process Flask app (already imported by the server thread)."""
+        import app as app_module
+        return app_module.app
+
+    def _session_role(self):
+        """Role stored in the webview's signed Flask session, or None if there is no valid session."""
+        session_cookie = self._get_session_cookie()
+        if not session_cookie:
+            return None
+        flask_app = self._flask_app()
+        try:
+            return flask_app.session_interface.get_signing_serializer(flask_app).loads(session_cookie).get('role')
+        except Exception:
+            return None
+
     def _get_session_cookie(self):
         """
-        Try to get the session cookie from the webview
-        This is a placeholder - in a real implementation, you'd need to 
-        extract the session cookie from the webview
+        Returns the Flask session cookie from the webview, so bridge calls act
+        as the logged-in user. Empty if there is no window or no session yet.
         """
-        # For now, return an empty string - we'll handle the auth issue differently
+        if self._window is None:
+            return ""
+        cookie_name = self._flask_app().config.get('SESSION_COOKIE_NAME', 'session')
+        try:
+            for cookie in self._window.get_cookies():
+                if cookie_name in cookie:
+                    return cookie[cookie_name].value
+        except Exception as e:
+            print(f"Python: Could not read webview cookies: {e}")
         return ""
     
-    def _get_teacher_devices_from_firebase(self):
-        """
-        Fallback method to get teacher devices directly from Firebase
-        This is a temporary workaround for the authentication issue
-        """
-        # In a real implementation, you'd use the Firebase Admin SDK
-        # For now, return the known teacher device from your database
-        return ["22:22:13:C7:C8:FE"]
-    
     def mark_attendance(self, lecture_id, location_data, wifi_bssid, bluetooth_id):
         """
-        Mark attendance with all required data
+        Mark attendance with all required data. The request is dispatched to the
+        Flask app in-process with the webview's session cookie, so it goes
+        through the same validation as the browser without a loopback socket.
         """
         try:
             payload = {
@@ -314,14 +424,19 @@ class Api:
             
             print(f"Python: Marking attendance with payload: {payload}")
             
-            response = requests.post(
-                f"{self.base_url}/student/mark-attendance",
-                json=payload,
-                headers={'Content-Type': 'application/json'},
-                timeout=30
-            )
+            flask_app = self._flask_app()
+            session_cookie = self._get_session_cookie()
+            with self._client_lock:
+                if self._client is None:
+                    self._client = flask_app.test_client()
+                cookie_name = flask_app.config.get('SESSION_COOKIE_NAME', 'session')
+                if session_cookie:
+                    self._client.set_cookie(cookie_name, session_cookie)
+                else:
+                    self._client.delete_cookie(cookie_name)
+                response = self._client.post("/api/student/mark-attendance", json=payload)
             
-            result = response.json()
+            result = response.get_json() or {"success": False, "error": f"HTTP {response.status_code}"}
             print(f"Python: Attendance marking response: {result}")
             
             return result
@@ -336,8 +451,9 @@ class Api:
         """
         print("Python: Starting debug Bluetooth scan...")
         try:
-            bluetooth_data = self._scan_bluetooth_sync()
-            teacher_devices = self._get_teacher_bluetooth_ids()
+            results = self._presence.get()['results']
+            bluetooth_data = results.get('bluetooth') or []
+            teacher_devices = results.get('teacher_devices') or []
             
             print(f"Python: Teacher devices to look for: {teacher_devices}")
             print(f"Python: Found {len(bluetooth_data)} Bluetooth devices:")
@@ -365,30 +481,69 @@ class Api:
 
 def start_flask():
     """Function to run the Flask app in a separate thread."""
+    # Imported here so the splash window is on screen while the app loads
+    from app import app
     app.run(host='127.0.0.1', port=5000, debug=False, use_reloader=False)
 
-if __name__ == '__main__':
-    api = Api()
+def wait_for_server(window, api):
+    """
+    Polls the health endpoint until the server answers, then navigates the
+    window from the splash screen to the app.
+    """
+    deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        try:
+            response = requests.get(HEALTH_URL, timeout=1)
+            if response.status_code == 200:
+                mark('server_ready')
+                api.mark_server_ready()
+                if not response.json().get('database'):
+                    print("Python: Server is up but the database is not connected.")
+                window.load_url(f"{SERVER_URL}/")
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(HEALTH_POLL_INTERVAL_SECONDS)
 
-    # Start Flask in a separate thread
-    flask_thread = threading.Thread(target=start_flask, daemon=True)
-    flask_thread.start()
+    print("Python: Flask server did not become ready in time.")
+    window.evaluate_js(
+        "document.getElementById('status').textContent = "
+        "'The server failed to start. Please restart the application.';"
+    )
 
-    # Wait a moment for Flask to start
-    print("Starting Flask server...")
-    time.sleep(3)
-    print("Flask server should be running at http://127.0.0.1:5000")
+def on_window_loaded(window, api):
+    """
+    Records first paint once the real app page (not the splash) has loaded,
+    and starts or stops presence scans for the page that is now open.
+    """
+    url = window.get_current_url()
+    if url and url.startswith(SERVER_URL):
+        if 'first_paint' not in timeline():
+            mark('first_paint')
+            print(f"Python: Startup timeline (ms): {json.dumps(timeline())}")
+        api.sync_presence_monitor(url)
+
+if __name__ == '__main__':
+    api = Api()
 
-    # Create the desktop window
+    # Show the window straight away with a splash screen
     window = webview.create_window(
         'Smart Attendance System',
-        'http://127.0.0.1:5000/',
+        html=SPLASH_HTML,
         js_api=api,
         width=1200,
         height=800,
         resizable=True,
         text_select=False
     )
-    
-    # Start the webview
-    webview.start(debug=True)
\ No newline at end of file
+    window.events.loaded += lambda: on_window_loaded(window, api)
+    api._window = window
+    mark('window_created')
+
+    # Start Flask in a separate thread
+    print("Starting Flask server...")
+    flask_thread = threading.Thread(target=start_flask, daemon=True)
+    flask_thread.start()
+
+    # Start the webview; navigation happens once the health check passes
+    webview.start(wait_for_server, (window, api), debug=True)
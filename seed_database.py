@@ -1,136 +1,273 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
-import random
+"""
+Seeds a datastore with a synthetic campus: admin, teachers, courses, rooms,
+classes, students, a clash-free weekly timetable and weeks of attendance.
 
-# --- Initialize Firestore ---
-try:
-    cred = credentials.Certificate("serviceAccountKey.json")
-    if not firebase_admin._apps:
-        firebase_admin.initialize_app(cred)
-except Exception as e:
-    print(f"Error initializing Firebase: {e}\nPlease ensure 'serviceAccountKey.json' is present.")
-    exit()
+    python seed_database.py                                    # small demo campus into Firestore
+    python seed_database.py --classes 1667 --class-size 60 --weeks 4 --backend sqlite --output data/100k.sqlite3
+    python seed_database.py --classes 200 --backend memory     # generate and batch-write in memory only
 
-db = firestore.client()
+Data comes from benchmarks/synthetic_campus.py, so the same options and
+--seed always give the same documents. Documents are written in batches of
+up to 500, Firestore's limit, with --workers batches in flight at once.
+Attendance is streamed, so memory use does not grow with --weeks.
 
-# ==============================================================================
-# --- DATA DEFINITIONS ---
-# ==============================================================================
+Backends:
+- firestore: the project in serviceAccountKey.json (or --credentials).
+- sqlite:    a fixture file, one row per document. Load it into the
+             in-memory client with read_fixture() for benchmarks and tests.
+- memory:    the in-memory client from benchmarks/, for timing the
+             generator and the batch path without any I/O.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmarks.synthetic_campus import DAYS, CampusSpec, generate_campus, iter_attendance
+
+BATCH_SIZE = 500  # Firestore's limit on writes per batch
+COMMIT_ATTEMPTS = 3
+CONFIRM_ABOVE = 20000  # Firestore writes that need --yes (the free tier allows 20k a day)
 
-first_names = [
-    "Aarav", "Vivaan", "Aditya", "Vihaan", "Arjun", "Sai", "Reyansh", "Krishna", "Ishaan", "Shaurya",
-    "Ananya", "Diya", "Pari", "Aadhya", "Navya", "Ira", "Anika", "Myra", "Aarohi", "Saanvi"
-]
-last_names = [
-    "Patel", "Sharma", "Iyer", "Nair", "Menon", "Reddy", "Rao", "Kumar", "Gupta", "Singh",
-    "Chopra", "Joshi", "Mehta", "Deshmukh", "Banerjee", "Mukherjee", "Das", "Roy", "Chatterjee", "Verma"
-]
-
-prefixes = ["Dr.", "Prof.", "Mr.", "Ms."]
-divisions = ["A", "B", "C"]
-
-branches = [
-    {"branchId": "CSE", "branchName": "Computer Science"},
-    {"branchId": "IT", "branchName": "Information Technology"},
-    {"branchId": "MECH", "branchName": "Mechanical Engineering"},
-    {"branchId": "CIVIL", "branchName": "Civil Engineering"},
-    {"branchId": "EEE", "branchName": "Electrical Engineering"},
-    {"branchId": "ECE", "branchName": "Electronics & Communication"},
-]
-
-courses = [
-    "Mathematics", "Physics", "Chemistry", "Data Structures", "DBMS", "Operating Systems",
-    "Computer Networks", "AI & ML", "Web Development", "Cloud Computing", "Cyber Security",
-    "Thermodynamics", "Strength of Materials", "Circuit Theory", "Digital Electronics"
-]
-
-rooms = [f"Room-{i}" for i in range(101, 151)] + [f"Lab-{i}" for i in range(1, 51)]
 
 # ==============================================================================
-# --- DATA GENERATION ---
+# --- WRITERS ---
 # ==============================================================================
 
-teachers_data = []
-courses_data = []
-rooms_data = []
-branches_data = []
-
-# Teachers
-for i in range(20):
-    fname, lname = random.choice(first_names), random.choice(last_names)
-    tid = f"T{i+1:03d}"
-    teachers_data.append({
-        "teacherId": tid,
-        "prefix": random.choice(prefixes),
-        "name": f"{fname} {lname}",
-        "role": "Teacher",
-        "email": f"{tid.lower()}@college.edu",
-        "password": tid,
-        "bluetoothDeviceId": f"{random.randint(10,99)}:{random.randint(10,99)}:{random.randint(10,99)}:{random.randint(10,99)}:{random.randint(10,99)}:{random.randint(10,99)}"
-    })
-
-# Admin (default super admin)
-admin_data = {
-    "adminId": "ADMIN001",
-    "name": "System Admin",
-    "role": "Admin",
-    "email": "admin@college.edu",
-    "password": "admin123"
-}
-
-# Courses
-for i, cname in enumerate(courses, 1):
-    courses_data.append({
-        "courseCode": f"C{i:03d}",
-        "courseName": cname
-    })
-
-# Rooms
-for r in rooms[:50]:
-    rooms_data.append({"roomNumber": r})
-
-# Branches
-for branch in branches:
-    for year in range(1, 5):
-        for div in divisions[:2]:
-            branches_data.append({
-                "branchId": f"{branch['branchId']}_Y{year}_{div}",
-                "branchName": branch["branchName"],
-                "division": div,
-                "year": year
-            })
+class BatchWriter:
+    """Writes each chunk as one batch through a Firestore-compatible client."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def write(self, chunk):
+        for attempt in range(COMMIT_ATTEMPTS):
+            batch = self.client.batch()
+            for collection, doc_id, data in chunk:
+                batch.set(self.client.collection(collection).document(doc_id), data)
+            try:
+                batch.commit()
+                return
+            except Exception:
+                # Contention and deadline errors are usually transient
+                if attempt == COMMIT_ATTEMPTS - 1:
+                    raise
+                time.sleep(2 ** attempt)
+
+    def close(self):
+        pass
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if hasattr(value, 'latitude') and hasattr(value, 'longitude'):
+        return {"__geopoint__": [value.latitude, value.longitude]}
+    raise TypeError(f"Cannot store {type(value).__name__} in a fixture")
+
+
+def _decode_value(obj):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    if "__geopoint__" in obj:
+        from firebase_admin import firestore
+        return firestore.GeoPoint(*obj["__geopoint__"])
+    return obj
+
+
+class SqliteWriter:
+    """Stores documents in a SQLite fixture as (collection, id, JSON data) rows."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS documents ("
+                           "collection TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL, "
+                           "PRIMARY KEY (collection, id))")
+
+    def write(self, chunk):
+        rows = [(collection, doc_id, json.dumps(data, default=_encode_value)) for collection, doc_id, data in chunk]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO documents VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+def read_fixture(path, collections=None):
+    """A SQLite fixture as {collection: {doc_id: data}}, ready for MemoryClient.load()."""
+    conn = sqlite3.connect(path)
+    try:
+        query, params = "SELECT collection, id, data FROM documents", ()
+        if collections:
+            query += f" WHERE collection IN ({', '.join('?' * len(collections))})"
+            params = tuple(collections)
+        result = {}
+        for collection, doc_id, data in conn.execute(query, params):
+            result.setdefault(collection, {})[doc_id] = json.loads(data, object_hook=_decode_value)
+        return result
+    finally:
+        conn.close()
+
+
+def make_writer(options):
+    if options.backend == 'sqlite':
+        return SqliteWriter(options.output)
+    if options.backend == 'memory':
+        from benchmarks.memory_datastore import MemoryClient
+        return BatchWriter(MemoryClient(seed=options.seed))
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    try:
+        if not firebase_admin._apps:
+            firebase_admin.initialize_app(credentials.Certificate(options.credentials))
+    except Exception as e:
+        print(f"Error initializing Firebase: {e}\nPlease ensure '{options.credentials}' is present.")
+        sys.exit(1)
+    return BatchWriter(firestore.client())
+
 
 # ==============================================================================
-# --- UPLOAD TO FIRESTORE ---
+# --- SEEDING ---
 # ==============================================================================
 
-print("🚀 Starting Firestore seeding...")
+def iter_documents(campus):
+    """(collection, doc_id, data) for every document, attendance last and streamed."""
+    for collection, docs in campus.collections.items():
+        if collection == 'attendance':
+            continue
+        for doc_id, data in docs.items():
+            yield collection, doc_id, data
+    for doc_id, data in iter_attendance(campus):
+        yield 'attendance', doc_id, data
+
+
+def estimate_attendance(spec):
+    lectures_per_week = spec.slots_per_day * len(DAYS)
+    recorded_rate = spec.present_rate + (1 - spec.present_rate) / 2
+    return int(spec.students * lectures_per_week * spec.weeks * recorded_rate)
+
+
+def seed(writer, documents, workers=8, batch_size=BATCH_SIZE, progress=True):
+    """
+    Writes `documents` in chunks of `batch_size` on `workers` threads.
+    Returns a Counter of documents written per collection. At most two
+    chunks per worker are queued, so the stream is never read far ahead.
+    """
+    written = Counter()
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(workers * 2)
+    errors = []
+    started = last_report = time.monotonic()
+
+    def write(chunk):
+        try:
+            if not errors:
+                writer.write(chunk)
+                with lock:
+                    written.update(collection for collection, _, _ in chunk)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            slots.release()
+
+    def report(final=False):
+        total = sum(written.values())
+        elapsed = max(time.monotonic() - started, 1e-9)
+        print(f"\r   {total:>12,} documents  {total / elapsed:>10,.0f}/s  {elapsed:>7.1f} s",
+              end="\n" if final else "", flush=True)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        chunk = []
+        for document in documents:
+            chunk.append(document)
+            if len(chunk) == batch_size:
+                slots.acquire()
+                pool.submit(write, chunk)
+                chunk = []
+                if errors:
+                    break
+            if progress and time.monotonic() - last_report >= 1:
+                report()
+                last_report = time.monotonic()
+        if chunk and not errors:
+            slots.acquire()
+            pool.submit(write, chunk)
+
+    if progress:
+        report(final=True)
+    if errors:
+        raise errors[0]
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed a datastore with a synthetic campus.")
+    parser.add_argument('--backend', choices=('firestore', 'sqlite', 'memory'), default='firestore')
+    parser.add_argument('--credentials', default='serviceAccountKey.json')
+    parser.add_argument('--output', default=os.path.join('data', 'seed.sqlite3'), help="fixture path for sqlite")
+    parser.add_argument('--classes', type=int, default=6)
+    parser.add_argument('--class-size', type=int, default=30, help="students per class")
+    parser.add_argument('--teachers', type=int, help="default: one per class, at least 20")
+    parser.add_argument('--weeks', type=int, default=1, help="weeks of attendance history")
+    parser.add_argument('--slots-per-day', type=int, default=5)
+    parser.add_argument('--present-rate', type=float, default=0.85, help="average attendance")
+    parser.add_argument('--rate-spread', type=float, default=0.1,
+                        help="spread of each student's own attendance around the average")
+    parser.add_argument('--face-encodings', action='store_true', help="also write random face encodings")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--workers', type=int, default=8, help="batches written in parallel")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--yes', action='store_true', help=f"skip the prompt above {CONFIRM_ABOVE:,} Firestore writes")
+    options = parser.parse_args(argv)
 
-# Admin
-db.collection("users").document(admin_data["adminId"]).set(admin_data)
-print("✅ Admin user added")
+    if not 1 <= options.batch_size <= BATCH_SIZE:
+        parser.error(f"--batch-size must be between 1 and {BATCH_SIZE}")
+    spec = CampusSpec(students=options.classes * options.class_size, class_size=options.class_size,
+                      teachers=options.teachers or max(20, options.classes), slots_per_day=options.slots_per_day,
+                      weeks=options.weeks, present_rate=options.present_rate, rate_spread=options.rate_spread,
+                      face_encodings=options.face_encodings, seed=options.seed)
 
-# Teachers
-for t in teachers_data:
-    db.collection("users").document(t["teacherId"]).set(t)
-print(f"✅ {len(teachers_data)} teachers added")
+    print("🚀 Generating campus...")
+    try:
+        campus = generate_campus(spec, attendance=False)
+    except ValueError as e:
+        parser.error(str(e))
+    planned = campus.document_count() + estimate_attendance(spec)
+    print(f"ℹ️ {len(campus.classes)} classes, {spec.students:,} students, {spec.teachers} teachers, "
+          f"~{planned:,} documents")
 
-# --- STUDENT DATA REMOVED AS REQUESTED ---
-print("ℹ️ Student seeding skipped.")
+    if options.backend == 'firestore' and planned > CONFIRM_ABOVE and not options.yes:
+        if input(f"Write ~{planned:,} documents to Firestore? [y/N] ").strip().lower() != 'y':
+            print("Aborted.")
+            return 1
 
-# Courses
-for c in courses_data:
-    db.collection("courses").document(c["courseCode"]).set(c)
-print(f"✅ {len(courses_data)} courses added")
+    writer = make_writer(options)
+    print(f"🚀 Writing to {options.backend} ({options.workers} workers, batches of {options.batch_size})...")
+    try:
+        written = seed(writer, iter_documents(campus), workers=options.workers, batch_size=options.batch_size)
+    finally:
+        writer.close()
+    if options.backend == 'firestore':
+        from backend.utils.shared_versions import publish_bulk_change
+        publish_bulk_change(writer.client)  # Running servers drop their cached copies
 
-# Rooms
-for r in rooms_data:
-    db.collection("rooms").document(r["roomNumber"]).set(r)
-print(f"✅ {len(rooms_data)} rooms added")
+    for collection, count in written.items():
+        print(f"✅ {count:,} {collection}")
+    print(f"\n🎉 Seeding complete: {sum(written.values()):,} documents")
+    return 0
 
-# Branches
-for b in branches_data:
-    db.collection("branches").document(b["branchId"]).set(b)
-print(f"✅ {len(branches_data)} branches added")
 
-print("\n🎉 Seeding complete: Admin + Teachers + Courses + Rooms + Branches ✅")
\ No newline at end of file
+if __name__ == '__main__':
+    sys.exit(main())
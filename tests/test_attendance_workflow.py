@@ -1,7 +1,7 @@
 import unittest
 from unittest.mock import MagicMock
 from flask import Flask
-from app import app, init_login_routes, init_admin_routes, init_student_routes, init_teacher_routes
+from app import app, create_app, init_login_routes, init_admin_routes, init_student_routes, init_teacher_routes
 
 class TestAppStructure(unittest.TestCase):
     def setUp(self):
@@ -29,5 +29,23 @@ class TestAppStructure(unittest.TestCase):
         except Exception as e:
             pass # initializing firebase might fail in app.py causing 500
 
+    def test_health_endpoint_reports_readiness(self):
+        response = self.client.get('/api/health')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ready', response.json)
+        self.assertIn('firebase_init', response.json['timeline'])
+
+class TestAppFactory(unittest.TestCase):
+    def test_create_app_with_injected_datastore(self):
+        factory_app = create_app({'SECRET_KEY': 'factory', 'START_BACKGROUND_JOBS': False, 'DATASTORE_BUDGET_STRICT': True}, db=MagicMock())
+        rules = {rule.rule for rule in factory_app.url_map.iter_rules()}
+        self.assertIn('/api/student/mark-attendance', rules)
+        self.assertIn('/api/teacher/live-lecture/stream', rules)
+        self.assertTrue(factory_app.test_client().get('/api/health').json['database'])
+
+    def test_create_app_requires_secret_key(self):
+        with self.assertRaises(ValueError):
+            create_app({'SECRET_KEY': None}, db=MagicMock())
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,32 @@
+import base64
+import os
+import tempfile
+import unittest
+from io import BytesIO
+from PIL import Image
+from benchmarks.bench_face_pipeline import _init_worker, process_frame, scale_frame
+
+class TestFacePipelineBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, 'blank.png')
+        Image.new('RGB', (400, 200), (128, 128, 128)).save(self.path)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_scale_frame_keeps_aspect_ratio(self):
+        data_url = scale_frame(self.path, 160)
+        self.assertTrue(data_url.startswith('data:image/jpeg;base64,'))
+        with Image.open(BytesIO(base64.b64decode(data_url.split(',', 1)[1]))) as image:
+            self.assertEqual(image.size, (160, 80))
+
+    def test_process_frame_reports_pipeline_stages(self):
+        _init_worker('verify', 'hog', 0, 0)
+        faces, stages, total_ms = process_frame(scale_frame(self.path, 160))
+        self.assertEqual(faces, 0)
+        self.assertEqual(set(stages), {'decode', 'detect', 'encode', 'compare'})
+        self.assertGreaterEqual(total_ms, sum(stages.values()) * 0.99)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+from benchmarks.memory_datastore import MemoryClient
+from benchmarks.synthetic_campus import CampusSpec, generate_campus
+from clear_db import branch_queries, purge
+
+class TestClearDb(unittest.TestCase):
+    def setUp(self):
+        self.campus = generate_campus(CampusSpec(students=120, class_size=30, teachers=4, weeks=1))
+        self.db = MemoryClient()
+        self.db.load(self.campus.collections)
+
+    def test_purges_collections_in_pages(self):
+        attendance = self.db.count('attendance')
+        self.assertGreater(attendance, 500)
+        results = purge(self.db, {name: [self.db.collection(name)] for name in ('attendance', 'timetable')},
+                        workers=3, show_progress=False)
+        self.assertEqual(results['attendance'][0], attendance)
+        self.assertEqual(self.db.count('attendance'), 0)
+        self.assertEqual(self.db.count('timetable'), 0)
+        self.assertGreater(self.db.count('users'), 0)
+
+    def test_dry_run_only_counts(self):
+        results = purge(self.db, {'attendance': [self.db.collection('attendance')]}, dry_run=True, show_progress=False)
+        self.assertEqual(results['attendance'][0], self.db.count('attendance'))
+        self.assertEqual(self.db.count('attendance'), len(self.campus.collections['attendance']))
+
+    def test_branch_filter_deletes_one_class(self):
+        target, other = self.campus.classes[0][0], self.campus.classes[1][0]
+        purge(self.db, branch_queries(self.db, target), show_progress=False)
+        students = {doc.get('branchId') for doc in self.db.collection('users').where('role', '==', 'Student').stream()}
+        self.assertNotIn(target, students)
+        self.assertIn(other, students)
+        lectures = {doc.get('lectureId') for doc in self.db.collection('attendance').stream()}
+        self.assertFalse(any(lecture.startswith(f"L-{target}-") for lecture in lectures))
+        self.assertTrue(any(lecture.startswith(f"L-{other}-") for lecture in lectures))
+        self.assertEqual(self.db.count('face_encodings'), 90)
+
+    def test_branch_prefix_covers_every_class(self):
+        queries = branch_queries(self.db, 'CSE')
+        purge(self.db, queries, show_progress=False)
+        remaining = {doc.get('branchId') for doc in self.db.collection('timetable').stream()}
+        self.assertFalse(any(branch.startswith('CSE_') for branch in remaining))
+        self.assertTrue(remaining)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import MagicMock
+from flask import Flask, g, jsonify
+from backend.utils.datastore_tracking import (
+    ReadBudgetExceeded, TrackedClient, init_datastore_tracking, query_shapes, read_budget
+)
+
+class TestDatastoreTracking(unittest.TestCase):
+    def setUp(self):
+        self.raw = MagicMock()
+        students = [MagicMock(id=f's{i}') for i in range(12)]
+        self.raw.collection.return_value.where.return_value.stream.side_effect = lambda: iter(students)
+        self.raw.collection.return_value.where.return_value.where.return_value.order_by.return_value.stream.side_effect = lambda: iter(students[:3])
+        self.db = TrackedClient(self.raw)
+        query_shapes.reset()
+
+        self.app = Flask(__name__)
+        self.app.testing = True
+        self.app.config['DATASTORE_READ_BUDGET'] = 20
+        self.app.config['DATASTORE_BUDGET_STRICT'] = True
+        init_datastore_tracking(self.app)
+
+        @self.app.route('/n-plus-one')
+        def n_plus_one():
+            # One query per student: 12 + 12 * 12 reads
+            students = list(self.db.collection('users').where('role', '==', 'Student').stream())
+            for student in students:
+                list(self.db.collection('attendance').where('studentId', '==', student.id).stream())
+            return jsonify(reads=g.datastore_usage.reads)
+
+        @self.app.route('/allowed')
+        @read_budget(200)
+        def allowed():
+            return n_plus_one()
+
+        @self.app.route('/writes')
+        def writes():
+            self.db.collection('audit_logs').document('a1').set({})
+            batch = self.db.batch()
+            batch.update(self.db.collection('attendance').document('r1'), {})
+            batch.update(self.db.collection('attendance').document('r2'), {})
+            batch.commit()
+            return jsonify(writes=g.datastore_usage.writes)
+
+        self.client = self.app.test_client()
+
+    def test_over_budget_fails_in_strict_mode(self):
+        with self.assertRaises(ReadBudgetExceeded):
+            self.client.get('/n-plus-one')
+
+    def test_route_budget_override(self):
+        response = self.client.get('/allowed')
+        self.assertEqual(response.json['reads'], 12 + 12 * 12)
+
+    def test_writes_counted_and_batch_refs_unwrapped(self):
+        response = self.client.get('/writes')
+        self.assertEqual(response.json['writes'], 3)
+        ref = self.raw.batch.return_value.update.call_args[0][0]
+        self.assertIs(ref, self.raw.collection.return_value.document.return_value)
+
+    def test_report_lists_composite_indexes(self):
+        with self.app.test_request_context('/report'):
+            list(self.db.collection('attendance').where('studentId', '==', 'S1')
+                 .where('date', '>=', '2025-01-01').order_by('date', direction='DESCENDING').stream())
+            list(self.db.collection('users').where('role', '==', 'Student').stream())
+        report = query_shapes.report()
+        queries = {shape['query']: shape for shape in report['shapes']}
+        self.assertFalse(queries['users WHERE role =='].get('needsCompositeIndex'))
+        self.assertTrue(queries['attendance WHERE studentId == AND date >= ORDER BY date DESCENDING']['needsCompositeIndex'])
+        self.assertEqual(report['indexes'], [{
+            'collectionGroup': 'attendance', 'queryScope': 'COLLECTION',
+            'fields': [{'fieldPath': 'studentId', 'order': 'ASCENDING'}, {'fieldPath': 'date', 'order': 'DESCENDING'}]
+        }])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+import numpy as np
+from benchmarks.memory_datastore import MemoryClient
+from backend.utils import face_index
+from backend.utils.encoding_store import EncodingStore
+from backend.utils.face_index import FaceIndex
+
+class TestFaceIndex(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(7)
+        self.index = FaceIndex()
+        self.encodings = self.rng.normal(0, 0.1, size=(50, 128))
+        for i, encoding in enumerate(self.encodings):
+            self.index.upsert(f"doc{i}", f"user{i}", f"S{i:03d}", encoding)
+
+    def test_search_flags_near_duplicate(self):
+        probe = self.encodings[3] + self.rng.normal(0, 0.001, size=128)
+        matches = self.index.search(probe, exclude_user_id='new_user')
+        self.assertEqual(matches[0]['userId'], 'user3')
+
+    def test_search_excludes_own_account(self):
+        matches = self.index.search(self.encodings[3], exclude_user_id='user3')
+        self.assertEqual(matches, [])
+
+    def test_upsert_replaces_existing_row(self):
+        self.index.upsert('doc3', 'user3', 'S003', self.encodings[4])
+        self.assertEqual(len(self.index), 50)
+        matches = self.index.search(self.encodings[4], exclude_user_id='user4')
+        self.assertEqual(matches[0]['docId'], 'doc3')
+
+    def test_blocked_scan_matches_brute_force(self):
+        # Plant two duplicates that straddle block boundaries
+        self.index.upsert('dupA', 'intruderA', 'S900', self.encodings[1] + 0.001)
+        self.index.upsert('dupB', 'intruderB', 'S901', self.encodings[40] + 0.001)
+
+        pairs = self.index.scan_all_pairs(threshold=0.1, block_size=16)
+        found = {frozenset((p['first']['docId'], p['second']['docId'])) for p in pairs}
+        self.assertEqual(found, {frozenset(('doc1', 'dupA')), frozenset(('doc40', 'dupB'))})
+
+class TestSharedEncodingStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.rng = np.random.default_rng(11)
+
+    def enrolled(self, count):
+        db = MemoryClient()
+        encodings = self.rng.normal(0, 0.1, size=(count, 128))
+        for i, encoding in enumerate(encodings):
+            self.enroll(db, i, encoding)
+        return db, encodings
+
+    def enroll(self, db, i, encoding):
+        db.collection('face_encodings').document(f"doc{i}").set({
+            'userId': f"user{i}", 'studentId': f"S{i:03d}", 'encoding': list(encoding),
+            'createdAt': datetime(2026, 1, 1, 9, i, tzinfo=timezone.utc)})
+
+    def test_workers_share_one_mapped_matrix(self):
+        db, (encoding,) = self.enrolled(1)
+        writer = FaceIndex(store=EncodingStore(self.tmp.name))
+        reader = FaceIndex(store=EncodingStore(self.tmp.name))
+
+        writer.load(db)
+        reads = db.reads
+        reader.ensure_loaded(db)  # Mapped from disk after a signature check, no encodings read
+        self.assertLessEqual(db.reads - reads, 2)
+
+        self.assertIsInstance(reader._matrix, np.memmap)
+        self.assertEqual(reader.search(encoding)[0]['userId'], 'user0')
+
+        # A later enrollment in the writer shows up in the reader without reloading
+        second = self.rng.normal(0, 0.1, size=128)
+        writer.upsert('doc2', 'user2', 'S002', second)
+        self.assertEqual(reader.search(second)[0]['userId'], 'user2')
+        self.assertEqual(len(reader), 2)
+
+    def test_cold_start_rebuilds_store_changed_outside_upsert(self):
+        db, encodings = self.enrolled(3)
+        FaceIndex(store=EncodingStore(self.tmp.name)).load(db)
+        db.collection('face_encodings').document('doc1').delete()  # e.g. clear_db or a deleted user
+
+        restarted = FaceIndex(store=EncodingStore(self.tmp.name))
+        restarted.ensure_loaded(db)
+        self.assertEqual(len(restarted), 2)
+        self.assertEqual(restarted.search(encodings[1]), [])
+
+    def test_upsert_keeps_rows_written_by_other_workers(self):
+        first = FaceIndex(store=EncodingStore(self.tmp.name))
+        second = FaceIndex(store=EncodingStore(self.tmp.name))
+        first.upsert('doc1', 'user1', 'S001', self.rng.normal(0, 0.1, size=128))
+        second.upsert('doc2', 'user2', 'S002', self.rng.normal(0, 0.1, size=128))
+
+        manifest, matrix = EncodingStore(self.tmp.name).read()
+        self.assertEqual(manifest['docIds'], ['doc1', 'doc2'])
+        self.assertEqual(matrix.dtype, np.float32)
+
+    def test_enrollment_keeps_the_store_mappable_at_cold_start(self):
+        db, _ = self.enrolled(2)
+        FaceIndex(store=EncodingStore(self.tmp.name)).load(db)
+        worker = FaceIndex(store=EncodingStore(self.tmp.name))
+        encoding = self.rng.normal(0, 0.1, size=128)
+        self.enroll(db, 2, encoding)
+        worker.upsert('doc2', 'user2', 'S002', encoding, db)
+
+        restarted = FaceIndex(store=EncodingStore(self.tmp.name))
+        reads = db.reads
+        restarted.ensure_loaded(db)
+        self.assertLessEqual(db.reads - reads, 2)  # Mapped, not rebuilt
+        self.assertEqual(restarted.search(encoding)[0]['userId'], 'user2')
+
+    def test_load_keeps_an_enrollment_made_while_reading(self):
+        db, _ = self.enrolled(2)
+        loader = FaceIndex(store=EncodingStore(self.tmp.name))
+        other_worker = FaceIndex(store=EncodingStore(self.tmp.name))
+        encoding = self.rng.normal(0, 0.1, size=128)
+        read_encodings = face_index._read_encodings
+
+        def read_then_enroll(firestore_db):
+            rows = read_encodings(firestore_db)
+            if len(db.collection('face_encodings').get()) == 2:
+                self.enroll(db, 2, encoding)
+                other_worker.upsert('doc2', 'user2', 'S002', encoding, db)
+            return rows
+
+        with patch('backend.utils.face_index._read_encodings', side_effect=read_then_enroll):
+            loader.load(db)
+        manifest, _ = EncodingStore(self.tmp.name).read()
+        self.assertEqual(sorted(manifest['docIds']), ['doc0', 'doc1', 'doc2'])
+        self.assertEqual(loader.search(encoding)[0]['userId'], 'user2')
+
+if __name__ == '__main__':
+    unittest.main()
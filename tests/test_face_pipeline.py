@@ -0,0 +1,35 @@
+import unittest
+import numpy as np
+from backend.utils.face_pipeline import assess_liveness, eye_aspect_ratio
+
+def make_frame(crop, ear):
+    return {"faces": 1, "encoding": np.zeros(128), "crop": crop, "ear": ear}
+
+class TestBurstLiveness(unittest.TestCase):
+    def setUp(self):
+        self.crop = np.random.default_rng(3).uniform(0, 255, size=(64, 64)).astype(np.float32)
+
+    def test_static_frames_fail_liveness(self):
+        frames = [make_frame(self.crop.copy(), 0.3) for _ in range(5)]
+        result = assess_liveness(frames)
+        self.assertFalse(result['live'])
+        self.assertFalse(result['blinkDetected'])
+
+    def test_blink_passes_liveness(self):
+        ears = [0.31, 0.30, 0.12, 0.29, 0.31]
+        frames = [make_frame(self.crop.copy(), ear) for ear in ears]
+        result = assess_liveness(frames)
+        self.assertTrue(result['live'])
+        self.assertTrue(result['blinkDetected'])
+
+    def test_motion_passes_liveness(self):
+        frames = [make_frame(np.roll(self.crop, shift * 4, axis=1), 0.3) for shift in range(5)]
+        self.assertTrue(assess_liveness(frames)['live'])
+
+    def test_eye_aspect_ratio_of_closed_eye_is_small(self):
+        open_eye = [(0, 0), (1, -1), (2, -1), (3, 0), (2, 1), (1, 1)]
+        closed_eye = [(0, 0), (1, -0.1), (2, -0.1), (3, 0), (2, 0.1), (1, 0.1)]
+        self.assertGreater(eye_aspect_ratio(open_eye), eye_aspect_ratio(closed_eye))
+
+if __name__ == '__main__':
+    unittest.main()
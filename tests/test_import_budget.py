@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+from backend.utils.lazy_import import HEAVY_MODULES
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold import of the whole app should be dominated by Flask/Firebase, not dlib.
+IMPORT_BUDGET_SECONDS = float(os.getenv('IMPORT_BUDGET_SECONDS', 5.0))
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+class TestImportBudget(unittest.TestCase):
+    def test_app_import_skips_cv_stack_and_fits_budget(self):
+        env = dict(os.environ, SECRET_KEY='import-budget', WARMUP_ENABLED='0')
+        result = subprocess.run(
+            [sys.executable, '-c', PROBE], cwd=PROJECT_ROOT, env=env,
+            capture_output=True, text=True, timeout=120
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+
+        loaded = [name for name in HEAVY_MODULES if name in report['modules']]
+        self.assertEqual(loaded, [], f"Heavy modules imported eagerly: {loaded}")
+        self.assertLess(report['seconds'], IMPORT_BUDGET_SECONDS)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import json
+import threading
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from flask import Flask
+from benchmarks.memory_datastore import MemoryClient
+from backend.utils.timetable_index import timetable_index
+from backend.routes.teacher_routes import init_teacher_routes
+from backend.utils.events import event_bus, lecture_channel
+
+CLASS_SIZE = 60  # Over Firestore's 30-value limit for 'in' filters
+
+class TestLiveLectureStream(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.secret_key = 'test_secret'
+        lecture = {'teacherId': 't1', 'day': datetime.now().strftime('%A'), 'startTime': '00:00', 'endTime': '23:59',
+                   'branchId': 'CS', 'year': 2, 'division': 'A', 'subject': 'DBMS'}
+        students = {f"u{i}": {'role': 'Student', 'studentId': f"S{i}", 'name': f"Student {i}",
+                              'branchId': 'CS', 'year': 2, 'division': 'A'} for i in range(CLASS_SIZE)}
+        self.db = MemoryClient()
+        self.db.load({'timetable': {'lec1': lecture}, 'users': students})
+        init_teacher_routes(self.app, self.db)
+        timetable_index.invalidate()  # The index is process-wide; rebuild it from this client
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 't1'
+            sess['role'] = 'Teacher'
+
+    def read_event(self, chunks):
+        for chunk in chunks:
+            text = chunk.decode() if isinstance(chunk, bytes) else chunk
+            if text.startswith('event:'):
+                name, data = text.strip().split('\n', 1)
+                return name.split(': ', 1)[1], json.loads(data.split(': ', 1)[1])
+
+    def test_snapshot_then_attendance_delta(self):
+        self.db.collection('attendance').add({'lectureId': 'lec1', 'studentId': 'S5', 'status': 'Present',
+                                              'date': datetime.now().strftime('%Y-%m-%d')})
+        response = self.client.get('/api/teacher/live-lecture/stream', buffered=False)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        chunks = iter(response.response)
+
+        name, snapshot = self.read_event(chunks)
+        self.assertEqual(name, 'snapshot')
+        self.assertEqual(len(snapshot['students']), CLASS_SIZE)
+        present = [s['studentId'] for s in snapshot['students'] if s['todayStatus'] == 'Present']
+        self.assertEqual(present, ['S5'])
+
+        delivered = event_bus.publish(lecture_channel('lec1'), {
+            'type': 'attendance', 'studentId': 'S2', 'status': 'Present', 'date': datetime.now().strftime('%Y-%m-%d')
+        })
+        self.assertEqual(delivered, 1)
+        name, delta = self.read_event(chunks)
+        self.assertEqual((name, delta['studentId'], delta['status']), ('attendance', 'S2', 'Present'))
+        self.assertIn('attendancePercentage', delta)
+
+        response.close()
+        self.assertEqual(event_bus.subscriber_count(lecture_channel('lec1')), 0)
+
+    def test_attendance_marked_by_another_worker_is_caught_up(self):
+        response = self.client.get('/api/teacher/live-lecture/stream', buffered=False)
+        chunks = iter(response.response)
+        self.assertEqual(self.read_event(chunks)[0], 'snapshot')
+
+        # Written without an event on this process's bus
+        self.db.collection('attendance').add({'lectureId': 'lec1', 'studentId': 'S7', 'status': 'Present',
+                                              'date': datetime.now().strftime('%Y-%m-%d')})
+        with patch('backend.routes.teacher_routes.SSE_CATCH_UP_SECONDS', 0.01):
+            name, delta = self.read_event(chunks)
+        self.assertEqual((name, delta['studentId'], delta['status']), ('attendance', 'S7', 'Present'))
+        response.close()
+
+    def test_catch_up_runs_while_bus_events_keep_arriving(self):
+        today = datetime.now().strftime('%Y-%m-%d')
+        response = self.client.get('/api/teacher/live-lecture/stream', buffered=False)
+        self.addCleanup(response.close)
+        chunks = iter(response.response)
+        self.assertEqual(self.read_event(chunks)[0], 'snapshot')
+
+        busy = threading.Event()
+        def publish_marks():
+            # As mark-attendance does: write the record, then publish it
+            for i in range(10, CLASS_SIZE):
+                record = {'lectureId': 'lec1', 'studentId': f"S{i}", 'status': 'Present', 'date': today}
+                self.db.collection('attendance').add(record)
+                event_bus.publish(lecture_channel('lec1'), {'type': 'attendance', **record})
+                busy.set()
+                time.sleep(0.02)
+        publisher = threading.Thread(target=publish_marks)
+        publisher.start()
+        self.addCleanup(publisher.join)
+        busy.wait()
+        # Marked through another worker: no event on this process's bus
+        self.db.collection('attendance').add({'lectureId': 'lec1', 'studentId': 'S7', 'status': 'Present', 'date': today})
+
+        with patch('backend.routes.teacher_routes.SSE_CATCH_UP_SECONDS', 0.1):
+            delivered = []
+            while 'S7' not in delivered:
+                delivered.append(self.read_event(chunks)[1]['studentId'])
+        self.assertTrue(publisher.is_alive(), "only caught up once the bus went quiet")
+
+    def test_failed_open_releases_subscription(self):
+        with patch('backend.routes.teacher_routes.build_live_roster', side_effect=RuntimeError('datastore down')):
+            response = self.client.get('/api/teacher/live-lecture/stream')
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(event_bus.subscriber_count(lecture_channel('lec1')), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,22 @@
+import argparse
+import os
+import unittest
+from benchmarks.load_stampede import Stampede
+
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+
+class TestLoadStampede(unittest.TestCase):
+    def test_small_stampede_marks_everyone_once(self):
+        options = argparse.Namespace(lectures=2, class_size=4, ramp=0.2, latency_ms=1.0, jitter_ms=0.5,
+                                     server_threads=4, double_submit=0.0, face_image=None, burst_frames=5, weeks=1, seed=3, json=None)
+        stampede = Stampede(options)
+        stampede.run()
+        report = stampede.report()
+        self.assertEqual(report['sessions'], 8)
+        self.assertEqual(report['steps']['login']['errors'], 0)
+        self.assertEqual(report['steps']['mark-attendance']['errors'], 0, report['errors'])
+        self.assertEqual(report['attendanceMarked'], 8)
+        self.assertEqual(report['duplicateWrites'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from datetime import datetime
+from benchmarks.bench_routes import compare
+from benchmarks.memory_datastore import MemoryClient, Query
+from benchmarks.synthetic_campus import CampusSpec, generate_campus
+
+class TestMemoryDatastore(unittest.TestCase):
+    def setUp(self):
+        self.db = MemoryClient()
+        self.db.load({'attendance': {
+            'a1': {'studentId': 'S1', 'lectureId': 'L1', 'date': '2025-01-06', 'year': 2},
+            'a2': {'studentId': 'S1', 'lectureId': 'L2', 'date': '2025-01-07', 'year': 2.0},
+            'a3': {'studentId': 'S2', 'lectureId': 'L1', 'date': '2025-01-06', 'year': '2'},
+        }})
+
+    def ids(self, query):
+        return [doc.id for doc in query.stream()]
+
+    def test_filters_order_and_types(self):
+        attendance = self.db.collection('attendance')
+        self.assertEqual(self.ids(attendance.where('studentId', '==', 'S1')
+                                  .order_by('date', direction=Query.DESCENDING)), ['a2', 'a1'])
+        # Numbers match across int/float, never strings
+        self.assertEqual(self.ids(attendance.where('year', '==', 2)), ['a1', 'a2'])
+        self.assertEqual(self.ids(attendance.where('lectureId', 'in', ['L1']).where('date', '>=', '2025-01-06')),
+                         ['a1', 'a3'])
+        with self.assertRaises(ValueError):
+            attendance.where('lectureId', 'in', [f'L{i}' for i in range(31)])
+
+    def test_indexes_follow_writes(self):
+        attendance = self.db.collection('attendance')
+        self.assertEqual(self.ids(attendance.where('studentId', '==', 'S2')), ['a3'])
+        attendance.document('a3').update({'studentId': 'S3'})
+        attendance.document('a4').set({'studentId': 'S2'})
+        self.assertEqual(self.ids(attendance.where('studentId', '==', 'S2')), ['a4'])
+
+    def test_batch_is_all_or_nothing(self):
+        batch = self.db.batch()
+        batch.update(self.db.collection('attendance').document('a1'), {'status': 'Absent'})
+        batch.update(self.db.collection('attendance').document('missing'), {'status': 'Absent'})
+        with self.assertRaises(KeyError):
+            batch.commit()
+        self.assertNotIn('status', self.db.collection('attendance').document('a1').get().to_dict())
+
+    def test_rollback_undoes_writes(self):
+        self.db.checkpoint()
+        self.db.collection('attendance').document('a1').delete()
+        self.db.collection('attendance').add({'studentId': 'S1'})
+        self.db.rollback()
+        self.assertEqual(self.ids(self.db.collection('attendance').where('studentId', '==', 'S1')), ['a1', 'a2'])
+        self.assertEqual(self.db.count('attendance'), 3)
+
+class TestSyntheticCampus(unittest.TestCase):
+    def test_deterministic_with_live_lecture(self):
+        spec = CampusSpec(students=90, teachers=4, weeks=1, live_at=datetime(2025, 1, 6, 9, 30), end_date=None)
+        first, second = generate_campus(spec), generate_campus(spec)
+        self.assertEqual(first.collections['attendance'], second.collections['attendance'])
+        self.assertEqual(len(first.classes), 2)
+        live = first.live_lectures[0]
+        self.assertEqual((live['day'], live['startTime'], live['endTime']), ('Monday', '09:20', '10:20'))
+        clashes = [entry for lid, entry in first.collections['timetable'].items()
+                   if lid != live['id'] and entry['day'] == 'Monday' and entry['branchId'] == live['branchId']
+                   and entry['startTime'] < live['endTime'] and entry['endTime'] > live['startTime']]
+        self.assertEqual(clashes, [])
+
+    def test_compare_flags_read_regressions(self):
+        baseline = {'small': {'r': {'p50Ms': 2.0, 'reads': 10}}}
+        current = {'small': {'r': {'p50Ms': 2.1, 'reads': 40}}}
+        self.assertEqual(compare(current, baseline), [('small', 'r', 'reads', 10, 40, 4.0)])
+
+if __name__ == '__main__':
+    unittest.main()
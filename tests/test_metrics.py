@@ -0,0 +1,83 @@
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from flask import Flask
+from backend.routes.admin_system_route import init_admin_system_routes
+from backend.utils.metrics import RequestMetrics, archive_worker_metrics, init_metrics, request_metrics
+
+class TestRequestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.secret_key = 'test_secret'
+        init_metrics(self.app)
+        init_admin_system_routes(self.app, MagicMock())
+
+        @self.app.route('/items/<item_id>')
+        def item(item_id):
+            return {"id": item_id}
+
+        request_metrics.reset()
+        self.client = self.app.test_client()
+
+    def login_admin(self):
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 'admin_uid'
+            sess['role'] = 'Admin'
+
+    def test_metrics_require_admin(self):
+        response = self.client.get('/api/system/metrics')
+        self.assertEqual(response.status_code, 401)
+
+    def test_requests_labelled_by_route(self):
+        self.client.get('/items/1')
+        self.client.get('/items/2')
+        self.client.get('/missing')
+        self.login_admin()
+
+        response = self.client.get('/api/system/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        body = response.get_data(as_text=True)
+        self.assertIn('http_requests_total{method="GET",route="/items/<item_id>",status="200"} 2', body)
+        self.assertIn('http_requests_total{method="GET",route="unmatched",status="404"} 1', body)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",route="/items/<item_id>",le="+Inf"} 2', body)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="/items/<item_id>"} 2', body)
+        # The metrics request itself is still being handled
+        self.assertIn('http_requests_in_flight 1', body)
+
+class TestSharedMetrics(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.workers = []
+        for worker_id in (101, 102):
+            metrics = RequestMetrics()
+            metrics.share(self.directory.name, worker_id, flush_seconds=None)
+            self.workers.append(metrics)
+
+    def test_any_worker_reports_the_sum_of_all(self):
+        first, second = self.workers
+        first.observe('GET', '/a', 200, 0.01, 0, 10)
+        second.observe('GET', '/a', 200, 0.02, 0, 5)
+        second.observe('GET', '/a', 500, 0.02, 0, 5)
+        second.flush()
+
+        body = first.render()
+        self.assertIn('http_requests_total{method="GET",route="/a",status="200"} 2', body)
+        self.assertIn('http_requests_total{method="GET",route="/a",status="500"} 1', body)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="/a"} 3', body)
+        self.assertIn('http_response_size_bytes_total{method="GET",route="/a"} 20', body)
+        self.assertIn('process_start_time_seconds{pid="102"}', body)
+
+    def test_exited_worker_counts_are_kept(self):
+        first, second = self.workers
+        second.observe('GET', '/a', 200, 0.02, 0, 5)
+        second.flush()
+        archive_worker_metrics(self.directory.name, 102)
+
+        body = first.render()
+        self.assertIn('http_requests_total{method="GET",route="/a",status="200"} 1', body)
+        self.assertNotIn('pid="102"', body)
+
+if __name__ == '__main__':
+    unittest.main()
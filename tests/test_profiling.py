@@ -0,0 +1,77 @@
+import os
+import pstats
+import tempfile
+import threading
+import tracemalloc
+import unittest
+from unittest.mock import MagicMock
+from flask import Flask
+from backend.routes.admin_system_route import init_admin_system_routes
+from backend.utils.profiling import RequestProfiler, memory_snapshot, pstats_bytes, sample_stacks
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+class TestProfiling(unittest.TestCase):
+    def test_sampler_sees_other_threads(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_loop, args=(stop,), name='busy worker')
+        worker.start()
+        try:
+            counts, rounds = sample_stacks(0.2)
+        finally:
+            stop.set()
+            worker.join()
+        self.assertGreater(rounds, 0)
+        busy = [stack for stack in counts if stack.startswith('busy_worker;')]
+        self.assertTrue(any('busy_loop (test_profiling.py' in stack for stack in busy))
+
+    def test_request_profiles_merge_into_pstats(self):
+        profiler = RequestProfiler()
+        self.assertIsNone(profiler.begin_request())  # No window open
+        profiler.start()
+        for _ in range(2):
+            profile = profiler.begin_request()
+            sorted(range(10000), key=lambda x: -x)
+            profiler.end_request(profile)
+        stats = profiler.stop()
+        self.assertEqual(profiler.requests, 2)
+
+        with tempfile.NamedTemporaryFile(suffix='.prof', delete=False) as f:
+            f.write(pstats_bytes(stats))
+        try:
+            loaded = pstats.Stats(f.name)
+            self.assertTrue(any(name == 'sorted' or 'sorted' in name for _, _, name in loaded.stats))
+        finally:
+            os.unlink(f.name)
+
+    def test_memory_snapshot_window(self):
+        report = memory_snapshot(seconds=0.05, top=5)
+        self.assertEqual(report['windowSeconds'], 0.05)
+        self.assertLessEqual(len(report['top']), 5)
+
+    def test_point_in_time_memory_snapshot_needs_tracing_since_startup(self):
+        if tracemalloc.is_tracing():
+            self.skipTest("tracemalloc was started with the interpreter")
+        with self.assertRaises(ValueError):
+            memory_snapshot(seconds=0)
+        app = Flask(__name__)
+        app.secret_key = 'test_secret'
+        init_admin_system_routes(app, MagicMock())
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = 'admin1'
+            sess['role'] = 'Admin'
+        self.assertEqual(client.get('/api/system/profile/memory?seconds=0').status_code, 400)
+
+    def test_endpoints_require_admin(self):
+        app = Flask(__name__)
+        app.secret_key = 'test_secret'
+        init_admin_system_routes(app, MagicMock())
+        client = app.test_client()
+        self.assertEqual(client.get('/api/system/profile/cpu').status_code, 401)
+        self.assertEqual(client.get('/api/system/profile/memory').status_code, 401)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import time
+import unittest
+from unittest.mock import patch
+from flask import Flask
+from benchmarks.memory_datastore import MemoryClient
+from backend.routes.admin_routes import init_admin_routes
+from backend.utils.response_cache import response_cache
+from backend.utils.shared_versions import SharedVersions, init_shared_versions, shared_versions
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.secret_key = 'test_secret'
+        self.db = MemoryClient()
+        self.db.load({'branches': {'cs': {'name': 'Computer'}}})
+        init_shared_versions(self.app, self.db)
+        init_admin_routes(self.app, self.db)
+        response_cache.clear()
+        # Sync once now, so the read counts below are the view's own
+        sync_seconds = shared_versions.sync_seconds
+        shared_versions.sync_seconds = 3600
+        shared_versions.sync_if_due()
+        self.addCleanup(setattr, shared_versions, 'sync_seconds', sync_seconds)
+        self.addCleanup(shared_versions.bind, None)
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 'admin1'
+            sess['role'] = 'Admin'
+
+    def test_repeat_loads_skip_datastore_and_revalidate(self):
+        reads = self.db.reads
+        first = self.client.get('/api/admin/branches')
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers['ETag']
+        view_reads = self.db.reads - reads
+
+        second = self.client.get('/api/admin/branches')
+        self.assertEqual(second.json, first.json)
+        not_modified = self.client.get('/api/admin/branches', headers={'If-None-Match': etag})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(self.db.reads - reads, view_reads)
+
+    def test_invalidation_forces_a_fresh_read(self):
+        etag = self.client.get('/api/admin/branches').headers['ETag']
+        response_cache.invalidate('catalog')
+        reads = self.db.reads
+        response = self.client.get('/api/admin/branches', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(self.db.reads, reads)
+
+    def test_invalidation_in_another_worker_reaches_this_one(self):
+        first = self.client.get('/api/admin/branches')
+        self.db.collection('branches').document('me').set({'name': 'Mechanical'})
+        other_worker = SharedVersions()
+        other_worker.bind(self.db)
+        other_worker.bump('catalog')
+
+        # Served from this worker's cache until its next sync
+        self.assertEqual(self.client.get('/api/admin/branches').json, first.json)
+        later = time.monotonic() + shared_versions.sync_seconds
+        with patch('backend.utils.shared_versions.time.monotonic', return_value=later):
+            response = self.client.get('/api/admin/branches', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.json, first.json)
+
+    def test_unauthenticated_requests_are_not_served_from_cache(self):
+        self.client.get('/api/admin/branches')
+        with self.client.session_transaction() as sess:
+            sess.clear()
+        self.assertEqual(self.client.get('/api/admin/branches').status_code, 401)
+
+if __name__ == '__main__':
+    unittest.main()
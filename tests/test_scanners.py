@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+from desktop.scanners import (
+    BluetoothctlScanner, BluezDbusBluetoothScanner, NetshWifiScanner, NmcliWifiScanner,
+    PowerShellBluetoothScanner, ReplayRunner, select_scanner
+)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'scans')
+
+class TestScannerParsing(unittest.TestCase):
+    def setUp(self):
+        self.runner = ReplayRunner(FIXTURES)
+
+    def test_netsh_lists_networks_with_bssid(self):
+        networks = NetshWifiScanner(self.runner).scan()
+        self.assertEqual(networks, [
+            {'ssid': 'Skyworth_3558B8', 'bssid': '10:55:e4:c6:ef:25'},
+            {'ssid': 'Campus-WiFi', 'bssid': 'a4:2b:b0:11:22:33'}
+        ])
+
+    def test_nmcli_puts_connected_network_first_and_unescapes_colons(self):
+        networks = NmcliWifiScanner(self.runner).scan()
+        self.assertEqual(networks[0], {'ssid': 'Skyworth_3558B8', 'bssid': '10:55:E4:C6:EF:25'})
+        self.assertEqual([n['ssid'] for n in networks[1:]], ['Lab:Guest', 'Campus-WiFi', ''])
+
+    def test_powershell_extracts_addresses_from_device_ids(self):
+        devices = PowerShellBluetoothScanner(self.runner).scan()
+        self.assertEqual(devices, [
+            {'name': 'Redmi Note 7 Pro', 'address': '22:22:13:C7:C8:FE'},
+            {'name': 'Galaxy Buds', 'address': 'A0:B1:C2:D3:E4:F5'}
+        ])
+
+    def test_powershell_raises_when_every_command_fails(self):
+        with tempfile.TemporaryDirectory() as empty:
+            scanner = PowerShellBluetoothScanner(ReplayRunner(empty))
+            with self.assertRaisesRegex(FileNotFoundError, 'btcom -s'):
+                scanner.scan()
+
+    def test_bluez_dbus_only_reports_devices_in_range(self):
+        devices = BluezDbusBluetoothScanner(self.runner).scan()
+        self.assertEqual(devices, [
+            {'name': 'Redmi Note 7 Pro', 'address': '22:22:13:C7:C8:FE'},
+            {'name': 'Galaxy Buds', 'address': 'A0:B1:C2:D3:E4:F5'}
+        ])
+
+    def test_bluetoothctl_lists_devices(self):
+        devices = BluetoothctlScanner(self.runner).scan()
+        self.assertEqual([d['address'] for d in devices], ['22:22:13:C7:C8:FE', 'A0:B1:C2:D3:E4:F5', '11:22:33:44:55:66'])
+        self.assertEqual(devices[2]['name'], 'Unknown')
+
+    def test_backend_selection_follows_platform(self):
+        self.assertEqual(select_scanner('wifi', 'win32', self.runner).name, 'netsh')
+        self.assertEqual(select_scanner('wifi', 'linux', self.runner).name, 'nmcli')
+        self.assertEqual(select_scanner('bluetooth', 'linux', self.runner).name, 'bluez-dbus')
+        self.assertIsNone(select_scanner('bluetooth', 'darwin', self.runner))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,19 @@
+import tempfile
+import unittest
+from datetime import datetime
+from backend.utils.scheduler import claim_daily_run, seconds_until
+
+class TestScheduler(unittest.TestCase):
+    def test_seconds_until_rolls_over_to_tomorrow(self):
+        now = datetime(2025, 1, 6, 3, 0)
+        self.assertEqual(seconds_until(2, 0, now), 23 * 3600)
+        self.assertEqual(seconds_until(4, 30, now), 5400)
+
+    def test_daily_run_is_claimed_once_per_day(self):
+        with tempfile.TemporaryDirectory() as lock_dir:
+            self.assertTrue(claim_daily_run(lock_dir, 'scan', '2025-01-06'))
+            self.assertFalse(claim_daily_run(lock_dir, 'scan', '2025-01-06'))
+            self.assertTrue(claim_daily_run(lock_dir, 'scan', '2025-01-07'))
+
+if __name__ == '__main__':
+    unittest.main()
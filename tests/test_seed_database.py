@@ -0,0 +1,50 @@
+import os
+import tempfile
+import threading
+import unittest
+from benchmarks.memory_datastore import MemoryClient
+from benchmarks.synthetic_campus import CampusSpec, generate_campus
+from seed_database import BatchWriter, SqliteWriter, iter_documents, read_fixture, seed
+
+class RecordingWriter:
+    def __init__(self):
+        self.sizes = []
+        self.lock = threading.Lock()
+
+    def write(self, chunk):
+        with self.lock:
+            self.sizes.append(len(chunk))
+
+class TestSeedDatabase(unittest.TestCase):
+    def setUp(self):
+        spec = CampusSpec(students=60, class_size=30, teachers=4, weeks=1)
+        self.campus = generate_campus(spec, attendance=False)
+
+    def test_writes_in_bounded_batches(self):
+        writer = RecordingWriter()
+        written = seed(writer, iter_documents(self.campus), workers=4, batch_size=50, progress=False)
+        self.assertLessEqual(max(writer.sizes), 50)
+        self.assertEqual(sum(writer.sizes), sum(written.values()))
+        self.assertEqual(written['users'], 1 + 4 + 60)
+        self.assertGreater(written['attendance'], 0)
+
+    def test_memory_backend_matches_generated_campus(self):
+        client = MemoryClient()
+        seed(BatchWriter(client), iter_documents(self.campus), workers=2, progress=False)
+        expected = generate_campus(self.campus.spec)
+        self.assertEqual(client.count('attendance'), len(expected.collections['attendance']))
+        self.assertEqual(client.count('timetable'), len(expected.collections['timetable']))
+
+    def test_sqlite_fixture_round_trip(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'seed.sqlite3')
+            writer = SqliteWriter(path)
+            seed(writer, iter_documents(self.campus), workers=3, progress=False)
+            writer.close()
+            fixture = read_fixture(path, ['attendance', 'locations'])
+        expected = generate_campus(self.campus.spec).collections
+        self.assertEqual(fixture['attendance'], expected['attendance'])
+        self.assertEqual(fixture['locations']['campus']['location'], expected['locations']['campus']['location'])
+
+if __name__ == '__main__':
+    unittest.main()
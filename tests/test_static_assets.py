@@ -0,0 +1,60 @@
+import gzip
+import json
+import os
+import re
+import unittest
+from flask import Flask, jsonify
+from app import app, FRONTEND_FOLDER
+from backend.utils.compression import init_compression
+
+class TestStaticAssets(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_pages_link_hashed_assets_that_cache_for_a_year(self):
+        page = self.client.get('/teacher_dashboard.html')
+        self.assertEqual(page.headers['Cache-Control'], 'no-cache')
+        # The page's lower-case '/css/...' link resolves to the real CSS folder
+        url = re.search(r'href="(/CSS/teacher_dashboard\.css\?v=\w+)"', page.get_data(as_text=True)).group(1)
+
+        asset = self.client.get(url)
+        self.assertEqual(asset.status_code, 200)
+        self.assertIn('immutable', asset.headers['Cache-Control'])
+        with open(os.path.join(FRONTEND_FOLDER, 'CSS', 'teacher_dashboard.css'), 'rb') as f:
+            self.assertEqual(asset.data, f.read())
+
+        stale = self.client.get('/CSS/teacher_dashboard.css?v=old')
+        self.assertEqual(stale.headers['Cache-Control'], 'no-cache')
+
+    def test_assets_are_gzipped_and_revalidate(self):
+        response = self.client.get('/Js/admin_dashboard.js', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        with open(os.path.join(FRONTEND_FOLDER, 'Js', 'admin_dashboard.js'), 'rb') as f:
+            self.assertEqual(gzip.decompress(response.data), f.read())
+
+        again = self.client.get('/Js/admin_dashboard.js', headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+class TestJsonCompression(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        init_compression(self.app)
+        self.rows = [{"studentId": f"S{i:04d}", "status": "Present", "courseCode": "CS301"} for i in range(500)]
+        self.app.add_url_rule('/rows', 'rows', lambda: jsonify(self.rows))
+        self.app.add_url_rule('/small', 'small', lambda: jsonify({"ok": True}))
+        self.client = self.app.test_client()
+
+    def test_large_json_is_compressed_several_fold(self):
+        plain = self.client.get('/rows')
+        compressed = self.client.get('/rows', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(compressed.data)), self.rows)
+        self.assertLess(len(compressed.data) * 5, len(plain.data))
+
+    def test_small_responses_are_sent_as_is(self):
+        response = self.client.get('/small', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from flask import Flask
+from benchmarks.memory_datastore import MemoryClient
+from backend.utils.auth import invalidate_principal
+from backend.utils.shared_versions import SharedVersions, shared_versions
+from backend.utils.timetable_index import timetable_index
+from backend.routes.student_routes import init_student_routes
+
+class TestMarkAttendanceReplay(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.secret_key = 'test_secret'
+        # The student exists; the lecture does not, so the request stops after the face check
+        self.db = MemoryClient()
+        self.db.load({'users': {'replay_user': {'studentId': 'S1', 'role': 'Student'}}})
+        init_student_routes(self.app, self.db)
+        timetable_index.invalidate()  # The index is process-wide; rebuild it from this client
+        self.client = self.app.test_client()
+
+    def post_with_verification(self, verified_at, verification_id='v1'):
+        # Each request carries the same (old) session cookie, as a replaying client would
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 'replay_user'
+            sess['role'] = 'Student'
+            sess['face_verified_at'] = verified_at
+            sess['face_verification_id'] = verification_id
+        return self.client.post('/api/student/mark-attendance', json={'lectureId': 'L1', 'latitude': 0, 'longitude': 0})
+
+    def test_face_verification_cannot_be_reused(self):
+        verified_at = datetime.now().isoformat()
+        first = self.post_with_verification(verified_at)
+        self.assertEqual(first.status_code, 404)
+
+        second = self.post_with_verification(verified_at)
+        self.assertEqual(second.status_code, 400)
+        self.assertIn('already used', second.json['error'])
+
+    def test_used_verifications_are_shared_through_the_datastore(self):
+        # Another worker, or this one after a restart, sees the verification as used
+        verified_at = datetime.now().isoformat()
+        self.post_with_verification(verified_at)
+        self.assertEqual(self.db.count('face_verifications'), 1)
+
+        restarted = Flask(__name__)
+        restarted.secret_key = 'test_secret'
+        init_student_routes(restarted, self.db)
+        self.client = restarted.test_client()
+        self.assertEqual(self.post_with_verification(verified_at).status_code, 400)
+        self.assertEqual(self.post_with_verification(verified_at, 'v2').status_code, 404)
+
+class TestFaceVerificationRoutes(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.secret_key = 'test_secret'
+        self.db = MemoryClient()
+        self.db.load({'users': {'face_user': {'studentId': 'S1', 'role': 'Student'}},
+                      'face_encodings': {'e1': {'studentId': 'S1', 'encoding': [0.0] * 128}}})
+        init_student_routes(self.app, self.db)
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 'face_user'
+            sess['role'] = 'Student'
+        # Every frame shows the enrolled face, perfectly still
+        frame = {"faces": 1, "encoding": [0.0] * 128, "crop": None, "ear": 0.3}
+        for target, value in (('analyze_burst_frame', frame), ('face_distance', 0.1)):
+            patcher = patch(f'backend.routes.student_routes.{target}', return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_single_frame_matches_but_cannot_verify(self):
+        # A single still frame must not be able to skip the liveness check
+        response = self.client.post('/api/student/verify-face', json={'image': 'frame'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json['faceMatch'])
+        self.assertFalse(response.json['match'])
+        with self.client.session_transaction() as sess:
+            self.assertNotIn('face_verified_at', sess)
+
+    def test_still_burst_matches_but_fails_liveness(self):
+        response = self.client.post('/api/student/verify-face-burst', json={'images': ['frame'] * 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['framesAnalyzed'], 3)
+        self.assertTrue(response.json['faceMatch'])
+        self.assertFalse(response.json['liveness']['live'])
+
+class TestPrincipalCache(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.secret_key = 'test_secret'
+        self.db_mock = MagicMock()
+        init_student_routes(self.app, self.db_mock)
+        self.client = self.app.test_client()
+
+        student_doc = MagicMock(exists=True)
+        student_doc.to_dict.return_value = {'studentId': 'S1', 'name': 'Asha', 'branchId': 'B1'}
+        self.user_get = self.db_mock.collection.return_value.document.return_value.get
+        self.user_get.return_value = student_doc
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 'principal_user'
+            sess['role'] = 'Student'
+
+    def test_profile_read_once_until_invalidated(self):
+        for _ in range(3):
+            response = self.client.get('/api/student/dashboard')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json['studentId'], 'S1')
+        self.assertEqual(self.user_get.call_count, 1)
+
+        invalidate_principal('principal_user')
+        self.client.get('/api/student/dashboard')
+        self.assertEqual(self.user_get.call_count, 2)
+
+    def test_invalidation_in_another_worker_reaches_this_one(self):
+        versions = MemoryClient()
+        shared_versions.bind(versions)
+        self.addCleanup(shared_versions.bind, None)
+        self.client.get('/api/student/dashboard')
+
+        self.user_get.return_value = MagicMock(exists=False)  # Deleted through another worker
+        other_worker = SharedVersions()
+        other_worker.bind(versions)
+        other_worker.bump('principal:principal_user')
+        later = time.monotonic() + shared_versions.sync_seconds
+        with patch('backend.utils.shared_versions.time.monotonic', return_value=later):
+            response = self.client.post('/api/student/mark-attendance', json={})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json['error'], "Student record not found")
+
+    def test_missing_user_is_not_found(self):
+        self.user_get.return_value = MagicMock(exists=False)
+        response = self.client.get('/api/student/dashboard')
+        self.assertEqual(response.status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from datetime import datetime
+from flask import Flask
+from benchmarks.memory_datastore import MemoryClient
+from backend.routes.teacher_routes import init_teacher_routes
+
+LECTURES = 45  # Over Firestore's 30-value limit for 'in' filters
+
+class TestTeacherAnalytics(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.secret_key = 'test_secret'
+        self.today = datetime.now().strftime('%Y-%m-%d')
+        timetable = {f"lec{i}": {'teacherId': 't1', 'branchId': 'CS', 'year': 2, 'division': 'A', 'day': 'Monday'}
+                     for i in range(LECTURES)}
+        attendance = {f"a{i}": {'lectureId': f"lec{i}", 'studentId': 'S1', 'date': self.today,
+                                'status': 'Present' if i % 3 else 'Absent'} for i in range(LECTURES)}
+        self.db = MemoryClient()
+        self.db.load({'branches': {'CS': {'name': 'Computer'}}, 'timetable': timetable, 'attendance': attendance})
+        init_teacher_routes(self.app, self.db)
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 't1'
+            sess['role'] = 'Teacher'
+
+    def test_weekly_trend_counts_every_lecture(self):
+        response = self.client.get('/api/teacher/analytics/weekly-trend?branchId=CS&year=2&division=A')
+        self.assertEqual(response.status_code, 200, response.json)
+        if datetime.now().strftime('%A') != 'Sunday':  # Not part of the trend
+            self.assertEqual(sum(response.json['trend'].values()), LECTURES)
+
+    def test_branch_comparison_counts_every_lecture(self):
+        response = self.client.get('/api/teacher/analytics/branch-comparison')
+        self.assertEqual(response.status_code, 200, response.json)
+        self.assertEqual(response.json['branch_comparison']['Computer'], round(30 / LECTURES * 100, 2))
+
+    def test_editable_attendance_lists_every_lecture(self):
+        response = self.client.get('/api/teacher/attendance/editable?branchId=CS&year=2&division=A'
+                                   f'&startDate={self.today}&endDate={self.today}')
+        self.assertEqual(response.status_code, 200, response.json)
+        self.assertEqual(len(response.json['attendance']), LECTURES)
+
+if __name__ == '__main__':
+    unittest.main()
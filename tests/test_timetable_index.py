@@ -0,0 +1,86 @@
+import unittest
+from datetime import datetime
+from benchmarks.memory_datastore import MemoryClient
+from backend.utils.shared_versions import SharedVersions
+from backend.utils.timetable_index import TimetableIndex, to_minutes
+
+MONDAY = datetime(2025, 1, 6)  # A Monday
+
+def lecture(teacher, start, end, day='Monday', room='101', branch='CS_Y2_A'):
+    return {'teacherId': teacher, 'day': day, 'startTime': start, 'endTime': end,
+            'roomNumber': room, 'branchId': branch, 'year': 2, 'division': 'A'}
+
+class TestTimetableIndex(unittest.TestCase):
+    def setUp(self):
+        self.db = MemoryClient()
+        self.db.load({'timetable': {
+            'l1': lecture('t1', '09:00', '10:00'),
+            'l2': lecture('t1', '10:00', '11:00', room='102'),
+            'l3': lecture('t2', '08:00', '12:00', room='201', branch='ME_Y1_B'),
+            'l4': lecture('t1', '09:00', '10:00', day='Tuesday'),
+            'l5': {'teacherId': 't1', 'day': 'Monday', 'startTime': None, 'endTime': None},
+        }})
+        self.index = TimetableIndex()
+
+    def add_lecture(self, lecture_id, data):
+        self.db.collection('timetable').document(lecture_id).set(data)
+
+    def at(self, hhmmss):
+        h, m, s = map(int, hhmmss.split(':'))
+        return MONDAY.replace(hour=h, minute=m, second=s)
+
+    def test_to_minutes(self):
+        self.assertEqual(to_minutes('09:30'), 570)
+        self.assertIsNone(to_minutes('25:00'))
+        self.assertIsNone(to_minutes(None))
+
+    def test_current_lecture_for_teacher_class_and_room(self):
+        self.assertEqual(self.index.current_for_teacher(self.db, 't1', self.at('09:30:00'))['id'], 'l1')
+        # At the shared boundary the later lecture wins; seconds past the end don't count
+        self.assertEqual(self.index.current_for_teacher(self.db, 't1', self.at('10:00:00'))['id'], 'l2')
+        self.assertIsNone(self.index.current_for_teacher(self.db, 't1', self.at('11:00:30')))
+        self.assertEqual(self.index.current_for_class(self.db, 'ME_Y1_B', 2, 'A', self.at('09:00:00'))['id'], 'l3')
+        self.assertEqual(self.index.current_for_room(self.db, '102', self.at('10:15:00'))['id'], 'l2')
+
+    def test_is_active(self):
+        self.assertTrue(self.index.is_active(self.db, 'l1', self.at('10:00:00')))
+        self.assertFalse(self.index.is_active(self.db, 'l1', self.at('10:00:01')))
+        self.assertIsNone(self.index.is_active(self.db, 'l5', self.at('09:30:00')))
+
+    def test_teacher_week_is_sorted_by_start(self):
+        week = self.index.teacher_week(self.db, 't1')
+        self.assertEqual([l['id'] for l in week['Monday']], ['l5', 'l1', 'l2'])
+        self.assertEqual([l['id'] for l in week['Tuesday']], ['l4'])
+
+    def test_index_is_built_once_until_invalidated(self):
+        self.index.current_for_teacher(self.db, 't1', self.at('09:30:00'))
+        reads = self.db.reads
+        for _ in range(3):
+            self.index.current_for_teacher(self.db, 't1', self.at('09:30:00'))
+        self.assertEqual(self.db.reads, reads)
+
+        self.add_lecture('l6', lecture('t3', '09:00', '10:00'))
+        self.index.invalidate()
+        self.assertEqual(self.index.current_for_teacher(self.db, 't3', self.at('09:30:00'))['id'], 'l6')
+
+    def test_unknown_lecture_added_elsewhere_triggers_rebuild(self):
+        self.index.prime(self.db)
+        self.add_lecture('l7', lecture('t4', '09:00', '10:00'))
+        self.assertEqual(self.index.lecture(self.db, 'l7')['teacherId'], 't4')
+
+    def test_timetable_write_in_another_worker_rebuilds_the_index(self):
+        versions = SharedVersions(sync_seconds=0)
+        versions.bind(self.db)
+        versions.subscribe('timetable', self.index.invalidate)
+        versions.sync_if_due()
+        self.index.prime(self.db)
+
+        self.add_lecture('l8', lecture('t5', '09:00', '10:00'))
+        other_worker = SharedVersions()
+        other_worker.bind(self.db)
+        other_worker.bump('timetable')
+        versions.sync_if_due()
+        self.assertEqual(self.index.current_for_teacher(self.db, 't5', self.at('09:30:00'))['id'], 'l8')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask
+from backend.utils.timing import (
+    checkpoint, collect_stages, init_timing, record_parallel_stages, server_timing_header, span
+)
+
+class TestServerTiming(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        init_timing(self.app)
+
+        @self.app.route('/pipeline')
+        def pipeline():
+            with span('detect'):
+                time.sleep(0.01)
+            checkpoint('lookup')
+            # Stages outside the request context are ignored rather than failing
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                pool.submit(checkpoint, 'worker').result()
+            return "ok"
+
+        def frame(delay):
+            with collect_stages() as stages:
+                with span('detect'):
+                    time.sleep(delay)
+            return stages
+
+        @self.app.route('/burst')
+        def burst():
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                stage_lists = list(pool.map(frame, (0.01, 0.03)))
+            record_parallel_stages(stage_lists, prefix='frame-')
+            return "ok"
+
+        @self.app.route('/plain')
+        def plain():
+            return "ok"
+
+        self.client = self.app.test_client()
+
+    def test_stages_reported_in_header(self):
+        header = self.client.get('/pipeline').headers['Server-Timing']
+        names = [entry.split(';')[0] for entry in header.split(', ')]
+        self.assertEqual(names, ['detect', 'lookup', 'total'])
+        detect_ms = float(header.split(', ')[0].split('dur=')[1])
+        self.assertGreaterEqual(detect_ms, 10)
+
+    def test_pool_stages_report_the_slowest_worker(self):
+        header = self.client.get('/burst').headers['Server-Timing']
+        name, duration = header.split(', ')[0].split(';dur=')
+        self.assertEqual(name, 'frame-detect')
+        self.assertGreaterEqual(float(duration), 30)
+
+    def test_no_header_without_stages(self):
+        self.assertNotIn('Server-Timing', self.client.get('/plain').headers)
+
+    def test_repeated_stages_are_summed(self):
+        self.assertEqual(server_timing_header([('db', 1.0), ('db', 2.5)], 5.0), 'db;dur=3.5, total;dur=5.0')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,15 @@
+"""
+Production entry point.
+
+    Linux/macOS:  gunicorn -c gunicorn.conf.py wsgi:app
+    Windows:      python wsgi.py        (waitress, multi-threaded)
+
+Settings come from the environment / .env like the development server.
+"""
+import os
+from app import app
+
+if __name__ == '__main__':
+    from waitress import serve
+    serve(app, host=os.getenv('HOST', '0.0.0.0'), port=int(os.getenv('PORT', 5000)),
+          threads=int(os.getenv('WEB_THREADS', 16)))